@@ -0,0 +1,81 @@
+"""
+Cached roster of admin users
+Assignment dropdowns (AssignTicketForm, assign_work, edit_assignment and the
+bulk actions) read the admins from here instead of querying users on every
+request. The roster lives in the application cache under the 'admin_roster'
+tag, which is invalidated after any committed change to an admin's name,
+email, department or role, including new and deleted users. It is also
+reloaded every REFRESH_SECONDS in case a write bypassed the session.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from models import User
+import cache
+import metrics
+
+REFRESH_SECONDS = 60
+
+# User columns that change what the roster shows
+ROSTER_FIELDS = ('first_name', 'last_name', 'email', 'department', 'role', 'is_admin')
+
+AdminEntry = namedtuple('AdminEntry', 'id full_name department role email')
+
+ROSTER_TAG = 'admin_roster'
+
+
+def _load():
+    rows = db.session.execute(
+        select(User.id, User.first_name, User.last_name, User.department, User.role, User.email)
+        .where(User.is_admin.is_(True))
+        .order_by(User.id)
+    ).all()
+    metrics.incr('admin_roster.loads')
+    return tuple(AdminEntry(row.id, f"{row.first_name} {row.last_name}", row.department, row.role, row.email)
+                 for row in rows)
+
+
+def invalidate():
+    """Reload the roster on its next use"""
+    cache.invalidate(ROSTER_TAG)
+
+
+def admins():
+    """Every admin and super admin, by id"""
+    return cache.get_or_set(ROSTER_TAG, _load, REFRESH_SECONDS, (ROSTER_TAG,))
+
+
+def team(department=None):
+    """Regular admins, only those of a department when one is given"""
+    return [entry for entry in admins()
+            if entry.role == 'admin' and (department is None or entry.department == department)]
+
+
+def get(admin_id):
+    """Roster entry of an admin, or None"""
+    return next((entry for entry in admins() if entry.id == admin_id), None)
+
+
+def choices():
+    """(id, full name) pairs for assignment select fields"""
+    return [(entry.id, entry.full_name) for entry in admins()]
+
+
+def _changes_roster(obj):
+    state = inspect(obj)
+    if state.attrs.is_admin.history.has_changes():
+        return True
+    return bool(obj.is_admin) and any(state.attrs[key].history.has_changes() for key in ROSTER_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_roster_changes(session, flush_context):
+    changed = ([obj for obj in session.new if isinstance(obj, User) and obj.is_admin]
+               + [obj for obj in session.deleted if isinstance(obj, User) and obj.is_admin]
+               + [obj for obj in session.dirty if isinstance(obj, User) and _changes_roster(obj)])
+    if changed:
+        cache.invalidate_on_commit(session, ROSTER_TAG)
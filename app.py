@@ -5,6 +5,10 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+import db_routing
+import engine_profiles
+import log_files
+import write_queue
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -14,36 +18,58 @@ class Base(DeclarativeBase):
     pass
 
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={"class_": db_routing.RoutingSession})
 
 
-def get_database_uri():
-    """Get database URI - PostgreSQL primary, SQLite fallback for Replit"""
+def get_database_uri(db_config=None):
+    """Get database URI - DATABASE_URL, then enterprise config, SQLite fallback for Replit"""
     
     # PostgreSQL (primary database)
     postgres_url = os.environ.get("DATABASE_URL")
     if postgres_url:
         return postgres_url
 
+    # Database selected in the professional GUI launcher
+    if db_config:
+        return engine_profiles.build_database_uri(db_config)
+
     # SQLite fallback for Replit environment
     return "sqlite:///it_helpdesk.db"
 
 
+def get_read_database_uri(db_config=None):
+    """Get read replica URI - DATABASE_READ_URL, then enterprise config, None if not configured"""
+    read_url = os.environ.get("DATABASE_READ_URL")
+    if read_url:
+        return read_url
+    return (db_config or {}).get("read_url") or None
+
+
 # Create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET") or "it-helpdesk-dev-secret-key"
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
+# Rotating log file for the launcher's log viewer
+log_files.configure(app)
+
 # Configure the database - PostgreSQL primary database
-app.config["SQLALCHEMY_DATABASE_URI"] = get_database_uri()
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+database_config = engine_profiles.load_database_config()
+app.config["SQLALCHEMY_DATABASE_URI"] = get_database_uri(database_config)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_profiles.engine_options(
+    app.config["SQLALCHEMY_DATABASE_URI"], database_config)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Optional read replica for dashboards, reports and exports
+read_database_uri = get_read_database_uri(database_config)
+if read_database_uri:
+    replica_options = engine_profiles.engine_options(read_database_uri, database_config)
+    replica_options["url"] = read_database_uri
+    app.config["SQLALCHEMY_BINDS"] = {db_routing.REPLICA_BIND: replica_options}
+
 # Initialize the app with the extension
 db.init_app(app)
+db_routing.init_app(app, db)
 
 
 # Add custom Jinja2 filter for line breaks
@@ -53,9 +79,30 @@ def nl2br_filter(s):
     return s.replace('\n', '<br>\n') if s else s
 
 
+sqlite_production = (engine_profiles.is_sqlite_file(app.config["SQLALCHEMY_DATABASE_URI"])
+                     and engine_profiles.sqlite_mode(database_config) == "production")
+
 with app.app_context():
     # Make sure to import the models here or their tables won't be created
     import models  # noqa: F401
 
-    db.create_all()
-    logging.info("Database tables created")
+    # SQLite production mode: WAL and tuned PRAGMAs on every connection
+    if sqlite_production:
+        sqlite_pragmas = engine_profiles.sqlite_pragmas(database_config)
+        engine_profiles.apply_sqlite_pragmas(db.engine, sqlite_pragmas)
+        if read_database_uri and engine_profiles.is_sqlite_file(read_database_uri):
+            engine_profiles.apply_sqlite_pragmas(db.engines[db_routing.REPLICA_BIND], sqlite_pragmas)
+
+    # Tables live on the primary; a replica only ever receives reads
+    import migrations
+    schema_version = migrations.upgrade(db)
+    logging.info(f"Database tables ready (schema version {schema_version})")
+
+    # Publish connection pool statistics to the metrics layer
+    engine_profiles.instrument_engine(db.engine)
+    if read_database_uri:
+        engine_profiles.instrument_engine(db.engines[db_routing.REPLICA_BIND], name='db_replica_pool')
+
+    # Funnel ticket and comment writes through the group commit writer
+    if sqlite_production:
+        write_queue.start(db.engine.url, sqlite_pragmas)
@@ -0,0 +1,124 @@
+"""
+Archive tier for closed tickets
+Tickets closed for longer than DEFAULT_ARCHIVE_AFTER_DAYS are moved, together with
+their comments, into tickets_archive/ticket_comments_archive so the hot
+tickets table only holds active work. Their images move under the archive/
+prefix of the upload storage. Archived tickets stay readable through view_ticket and
+can be included in reports and exports.
+
+Run the mover with:  flask --app main archive-tickets [--days 180] [--batch-size 500]
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+import click
+from flask import abort
+from sqlalchemy import delete, func, insert, select
+
+from app import app, db
+from models import Ticket, TicketComment, TicketArchive, TicketCommentArchive
+import blob_storage
+import cache
+import metrics
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 180
+DEFAULT_BATCH_SIZE = 500
+
+TICKET_COLUMNS = [column.name for column in Ticket.__table__.columns]
+COMMENT_COLUMNS = [column.name for column in TicketComment.__table__.columns]
+
+
+def archive_closed_tickets(older_than_days=DEFAULT_ARCHIVE_AFTER_DAYS, batch_size=DEFAULT_BATCH_SIZE,
+                           max_batches=None):
+    """Move old closed tickets to the archive tables, one bounded transaction per batch"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    tickets = Ticket.__table__
+    comments = TicketComment.__table__
+    archived = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        rows = db.session.execute(
+            select(tickets.c.id, tickets.c.image_filename)
+            .where(tickets.c.status == 'Closed', tickets.c.updated_at < cutoff)
+            .order_by(tickets.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        ticket_ids = [row.id for row in rows]
+        try:
+            db.session.execute(insert(TicketArchive.__table__).from_select(
+                TICKET_COLUMNS,
+                select(*[tickets.c[name] for name in TICKET_COLUMNS]).where(tickets.c.id.in_(ticket_ids))))
+            db.session.execute(insert(TicketCommentArchive.__table__).from_select(
+                COMMENT_COLUMNS,
+                select(*[comments.c[name] for name in COMMENT_COLUMNS]).where(comments.c.ticket_id.in_(ticket_ids))))
+            db.session.execute(delete(comments).where(comments.c.ticket_id.in_(ticket_ids)))
+            db.session.execute(delete(tickets).where(tickets.c.id.in_(ticket_ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        cache.invalidate('tickets', *(cache.row_tag(Ticket, ticket_id) for ticket_id in ticket_ids))
+
+        # Files move only once their rows are safely archived
+        _archive_images([row.image_filename for row in rows if row.image_filename])
+
+        archived += len(ticket_ids)
+        batches += 1
+        metrics.incr('archive.tickets_moved', len(ticket_ids))
+        logging.info(f"Archived {len(ticket_ids)} closed tickets (batch {batches})")
+
+    return archived
+
+
+def _archive_images(filenames):
+    for filename in filenames:
+        try:
+            blob_storage.archive(filename)
+        except (OSError, blob_storage.BlobNotFound) as e:
+            logging.warning(f"Could not archive image {filename}: {e}")
+
+
+def get_ticket_or_404(ticket_id):
+    """Live ticket, falling back to the archive"""
+    ticket = db.session.get(Ticket, ticket_id)
+    if ticket is None:
+        ticket = db.session.get(TicketArchive, ticket_id)
+    if ticket is None:
+        abort(404)
+    return ticket
+
+
+def count_by(column_name, include_archived=False):
+    """Ticket counts grouped by a column, optionally including archived tickets"""
+    counts = {}
+    models = [Ticket, TicketArchive] if include_archived else [Ticket]
+    for model in models:
+        column = getattr(model, column_name)
+        for value, count in db.session.query(column, func.count()).group_by(column):
+            counts[value] = counts.get(value, 0) + count
+    return counts
+
+
+def all_tickets(include_archived=False):
+    """Every ticket for reports, newest first; archived ones when requested"""
+    tickets = Ticket.query.order_by(Ticket.created_at.desc()).all()
+    if include_archived:
+        tickets += TicketArchive.query.order_by(TicketArchive.created_at.desc()).all()
+        tickets.sort(key=lambda ticket: ticket.created_at or datetime.min, reverse=True)
+    return tickets
+
+
+@app.cli.command('archive-tickets')
+@click.option('--days', default=DEFAULT_ARCHIVE_AFTER_DAYS, show_default=True,
+              help='Archive tickets closed more than this many days ago.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True,
+              help='Tickets moved per transaction.')
+def archive_tickets_command(days, batch_size):
+    """Move old closed tickets into the archive tables"""
+    archived = archive_closed_tickets(older_than_days=days, batch_size=batch_size)
+    click.echo(f"Archived {archived} tickets closed more than {days} days ago.")
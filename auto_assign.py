@@ -0,0 +1,263 @@
+"""
+Load-aware ticket auto-assignment
+Each ticket category maps to an admin department through the category_teams
+table. An in-memory workload index keeps the number of Open and In Progress
+tickets per regular admin, with one min-heap per department, so the
+least-loaded eligible admin is found in O(log n).
+
+The index follows every committed assignment and status change through
+session events. Bulk updates and user changes mark it stale, and it is rebuilt
+from the database with one GROUP BY. Each gunicorn worker keeps its own index,
+so it is also rebuilt every REBUILD_SECONDS to pick up other workers' writes.
+The category-to-team map is read through the application cache; its tag is
+the table name, which the cache invalidates on every category_teams write.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from models import CategoryTeam, Ticket, User
+import cache
+import metrics
+
+# Ticket statuses that count as an admin's current load
+ACTIVE_STATUSES = ('Open', 'In Progress')
+
+# Seeded into category_teams when it is empty; other categories go to any admin
+DEFAULT_TEAMS = {
+    'Hardware': 'IT Hardware',
+    'Software': 'IT Software',
+}
+
+REBUILD_SECONDS = 60
+
+# Heap key for categories without a team: every regular admin is eligible
+ALL_ADMINS = None
+
+_UNKNOWN = object()
+
+
+class WorkloadIndex:
+    """Open + In Progress ticket counts per admin with per-team min-heaps"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loads = {}
+        self.departments = {}
+        self._heaps = {}
+        self.built_at = None
+        self.stale = True
+
+    def rebuild(self, admins, counts):
+        """Replace the index; admins maps admin id to department, counts id to load"""
+        with self._lock:
+            self.departments = dict(admins)
+            self.loads = {admin_id: counts.get(admin_id, 0) for admin_id in self.departments}
+            self._heaps = {}
+            for admin_id, department in self.departments.items():
+                for key in (department, ALL_ADMINS):
+                    self._heaps.setdefault(key, []).append((self.loads[admin_id], admin_id))
+            for heap in self._heaps.values():
+                heapq.heapify(heap)
+            self.built_at = time.monotonic()
+            self.stale = False
+
+    def adjust(self, admin_id, delta):
+        with self._lock:
+            if admin_id in self.loads:
+                self._set_load(admin_id, self.loads[admin_id] + delta)
+
+    def least_loaded(self, department=ALL_ADMINS, reserve=False):
+        """Least-loaded admin of a department (ties go to the lowest id), or None
+
+        With reserve=True the pick counts against the admin immediately, so
+        concurrent picks spread out before their tickets are committed.
+        """
+        with self._lock:
+            heap = self._heaps.get(department)
+            while heap:
+                load, admin_id = heap[0]
+                if self.loads.get(admin_id) == load:
+                    if reserve:
+                        self._set_load(admin_id, load + 1)
+                    return admin_id
+                # Entry left behind by a load change
+                heapq.heappop(heap)
+            return None
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.loads)
+
+    def _set_load(self, admin_id, load):
+        self.loads[admin_id] = max(load, 0)
+        department = self.departments[admin_id]
+        for key in (department, ALL_ADMINS):
+            heap = self._heaps[key]
+            heapq.heappush(heap, (self.loads[admin_id], admin_id))
+            # Drop stale entries once they outnumber the live ones
+            if len(heap) > 2 * len(self.loads) + 16:
+                members = [member for member, member_department in self.departments.items()
+                           if key is ALL_ADMINS or member_department == key]
+                heap[:] = [(self.loads[member], member) for member in members]
+                heapq.heapify(heap)
+
+
+workload = WorkloadIndex()
+
+TEAMS_TAG = 'category_teams'
+
+
+def is_enabled():
+    return os.environ.get("HELPDESK_AUTO_ASSIGN", "1") != "0"
+
+
+def seed_category_teams():
+    """Fill category_teams with the default mapping when it is empty"""
+    if db.session.query(CategoryTeam).first() is None:
+        for category, department in DEFAULT_TEAMS.items():
+            db.session.add(CategoryTeam(category=category, department=department))
+        db.session.commit()
+        logging.info("Default category teams created")
+
+
+def team_for(category):
+    """Department handling a category, or None when any admin may take it"""
+    return _team_map().get(category)
+
+
+def _team_map():
+    """{category: department}, cached until category_teams changes"""
+    return cache.get_or_set(TEAMS_TAG, lambda: {row.category: row.department
+                                                for row in db.session.query(CategoryTeam)},
+                            REBUILD_SECONDS, (TEAMS_TAG,))
+
+
+def refresh():
+    """Rebuild the workload index from the database"""
+    admins = db.session.execute(select(User.id, User.department).where(User.role == 'admin')).all()
+    counts = db.session.execute(
+        select(Ticket.assigned_to, func.count())
+        .where(Ticket.assigned_to.is_not(None), Ticket.status.in_(ACTIVE_STATUSES))
+        .group_by(Ticket.assigned_to)
+    ).all()
+    workload.rebuild({row.id: row.department for row in admins}, dict(counts))
+    metrics.incr('auto_assign.rebuilds')
+
+
+def mark_stale():
+    """Rebuild the index before its next use"""
+    workload.stale = True
+
+
+def _ensure_index():
+    if workload.stale or time.monotonic() - workload.built_at > REBUILD_SECONDS:
+        refresh()
+
+
+def choose_assignee(category, reserve=False):
+    """Least-loaded regular admin of the category's team, or None"""
+    _ensure_index()
+    return workload.least_loaded(_team_map().get(category, ALL_ADMINS), reserve=reserve)
+
+
+def reserve_assignee(category):
+    """Pick the admin for a ticket about to be created, or None
+
+    The pick counts against the admin straight away, so a burst of new
+    tickets spreads out before any of them is committed. Mark the ticket
+    with _workload_reserved so it is not counted twice, and call release()
+    if it is not saved.
+    """
+    if not is_enabled():
+        return None
+    admin_id = choose_assignee(category, reserve=True)
+    if admin_id is not None:
+        metrics.incr('auto_assign.assigned')
+    return admin_id
+
+
+def release(admin_id):
+    """Undo a reservation made by reserve_assignee"""
+    if admin_id is not None:
+        workload.adjust(admin_id, -1)
+
+
+def _change(obj, key):
+    """(old, new) value of an attribute in the current flush"""
+    attribute = inspect(obj).attrs[key]
+    history = attribute.history
+    if history.deleted:
+        return history.deleted[0], attribute.value
+    if history.added:
+        # Set without being loaded first; the previous value is unknown
+        return _UNKNOWN, history.added[0]
+    return attribute.value, attribute.value
+
+
+def _load_of(status, assignee):
+    return (assignee, 1) if assignee is not None and status in ACTIVE_STATUSES else None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_workload_changes(session, flush_context):
+    deltas = session.info.setdefault('workload_deltas', [])
+
+    for obj in session.new:
+        if isinstance(obj, Ticket) and not getattr(obj, '_workload_reserved', False):
+            if _load_of(obj.status, obj.assigned_to):
+                deltas.append((obj.assigned_to, 1))
+        elif isinstance(obj, User):
+            session.info['workload_stale'] = True
+
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(inspect(obj).attrs[key].history.has_changes()
+                                         for key in ('role', 'department', 'is_admin')):
+            session.info['workload_stale'] = True
+        if not isinstance(obj, Ticket) or not session.is_modified(obj):
+            continue
+        old_status, new_status = _change(obj, 'status')
+        old_assignee, new_assignee = _change(obj, 'assigned_to')
+        if old_status is _UNKNOWN or old_assignee is _UNKNOWN:
+            session.info['workload_stale'] = True
+            continue
+        before = _load_of(old_status, old_assignee)
+        after = _load_of(new_status, new_assignee)
+        if before != after:
+            if before:
+                deltas.append((before[0], -1))
+            if after:
+                deltas.append((after[0], 1))
+
+    for obj in session.deleted:
+        if isinstance(obj, Ticket) and _load_of(obj.status, obj.assigned_to):
+            deltas.append((obj.assigned_to, -1))
+        elif isinstance(obj, User):
+            session.info['workload_stale'] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_workload_changes(session):
+    for admin_id, delta in session.info.pop('workload_deltas', []):
+        workload.adjust(admin_id, delta)
+    if session.info.pop('workload_stale', False):
+        mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_workload_changes(session):
+    session.info.pop('workload_deltas', None)
+    session.info.pop('workload_stale', None)
+
+
+metrics.register_collector('auto_assign', lambda: {
+    'admins': len(workload.loads),
+    'active_tickets': sum(workload.loads.values()),
+})
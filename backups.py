@@ -0,0 +1,496 @@
+"""
+Backups for the professional launcher's Backup tab
+Each backup is a set directory under the backup directory:
+
+  helpdesk_backup_20260131_140509/
+    manifest.json       what was saved, sizes, SHA-256 sums and the verification result
+    database.sqlite3    SQLite, copied with the online backup API
+    database.dump       PostgreSQL, pg_dump custom format (compressed)
+    uploads.json        path, size, mtime and SHA-256 of every uploaded file
+
+Upload contents are stored once under objects/ in the backup directory, named
+by SHA-256 and shared by all sets, so an image that has not changed is never
+copied again. A file whose size and mtime match the previous set is not even
+re-read. The upload directory is the one blob_storage uses (storage_config);
+with the database backend the uploads live in blob_chunks, so the database
+copy covers them and the manifest says so.
+
+SQLite is copied PAGES_PER_STEP pages at a time with a short sleep between
+steps, so the running server is never locked out for long. Every new set is
+verified (PRAGMA integrity_check or pg_restore --list, then the hash of each
+file) before retention removes old sets and the objects nothing refers to.
+
+BackupWorker runs jobs one at a time on a background thread and reports
+progress through callbacks; nothing here touches Tk.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+
+import storage_config
+
+SET_PREFIX = 'helpdesk_backup_'
+MANIFEST = 'manifest.json'
+UPLOADS_MANIFEST = 'uploads.json'
+OBJECTS_DIR = 'objects'
+DEFAULT_SQLITE_PATH = 'it_helpdesk.db'
+
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.02
+MAX_RESTARTS = 3
+PG_COMPRESSION = 6
+HASH_CHUNK = 1024 * 1024
+
+DEFAULT_KEEP = 7
+DEFAULT_MAX_AGE_DAYS = 30
+INTERVALS = {'hourly': 3600, 'daily': 86400, 'weekly': 7 * 86400, 'monthly': 30 * 86400}
+
+# Share of the progress bar for each step of a backup
+DATABASE_SHARE = 0.6
+UPLOADS_SHARE = 0.3
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+class _CopyRestarting(Exception):
+    pass
+
+
+def _report(progress, fraction, message):
+    if progress:
+        progress(fraction, message)
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    # Write then rename, so a crash never leaves half a manifest
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def sqlite_database_path(db_config, base_dir):
+    """The file Flask-SQLAlchemy opens: relative paths live in the instance folder"""
+    path = db_config.get('sqlite_path') or DEFAULT_SQLITE_PATH
+    return path if os.path.isabs(path) else os.path.join(base_dir, 'instance', path)
+
+
+def _pg_command(tool, section):
+    executable = shutil.which(tool)
+    if executable is None:
+        raise BackupError(f"{tool} not found on PATH; install the PostgreSQL client tools")
+    command = [executable, '--host', section.get('host') or 'localhost',
+               '--username', section.get('username') or 'postgres', '--no-password']
+    if str(section.get('port') or '').strip():
+        command += ['--port', str(section['port']).strip()]
+    env = os.environ.copy()
+    if section.get('password'):
+        env['PGPASSWORD'] = section['password']
+    return command, env
+
+
+def _run_pg(command, env, progress, fraction):
+    """Run a PostgreSQL client tool, passing its --verbose lines on as progress"""
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               universal_newlines=True, encoding='utf-8', errors='replace')
+    tail = []
+    for line in process.stderr:
+        line = line.strip()
+        if line:
+            tail = (tail + [line])[-5:]
+            _report(progress, fraction, line)
+    if process.wait() != 0:
+        raise BackupError(f"{os.path.basename(command[0])} failed: {' / '.join(tail)}")
+
+
+def copy_sqlite(source_path, target_path, progress=None, share=1.0):
+    """Online copy of a live SQLite database, a few pages per step
+
+    A write by another connection restarts the copy from the first page. After
+    MAX_RESTARTS the rest is copied in a single step instead: one read
+    transaction, which in WAL mode does not hold up the server's writers.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    copied = [0, 0]  # pages done at the last step, restarts seen
+
+    def step(status, remaining, total):
+        done = total - remaining
+        if done < copied[0]:
+            copied[1] += 1
+            if copied[1] > MAX_RESTARTS:
+                raise _CopyRestarting()
+        copied[0] = done
+        _report(progress, (done / total if total else 1.0) * share,
+                f"Copying database: {done} of {total} pages")
+
+    try:
+        try:
+            source.backup(target, pages=PAGES_PER_STEP, progress=step, sleep=STEP_SLEEP)
+        except _CopyRestarting:
+            _report(progress, None, "Database is busy; copying it in one step")
+            source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def _backup_database(db_config, base_dir, set_dir, progress):
+    db_type = db_config.get('type', 'sqlite')
+    if db_type == 'sqlite':
+        source = sqlite_database_path(db_config, base_dir)
+        if not os.path.exists(source):
+            raise BackupError(f"SQLite database not found: {source}")
+        target = os.path.join(set_dir, 'database.sqlite3')
+        copy_sqlite(source, target, progress, DATABASE_SHARE)
+        # The copy inherits WAL mode; make it a single self-contained file
+        connection = sqlite3.connect(target)
+        try:
+            connection.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            connection.close()
+    elif db_type == 'postgresql':
+        section = db_config.get('postgresql') or {}
+        target = os.path.join(set_dir, 'database.dump')
+        command, env = _pg_command('pg_dump', section)
+        command += ['--format=custom', f'--compress={PG_COMPRESSION}', '--no-owner', '--verbose',
+                    '--file', target, section.get('database') or 'it_helpdesk']
+        _run_pg(command, env, progress, DATABASE_SHARE / 2)
+    else:
+        raise BackupError(f"Backups of {db_type} databases are not supported")
+    return {'type': db_type, 'file': os.path.basename(target),
+            'size': os.path.getsize(target), 'sha256': sha256_file(target)}
+
+
+def verify_database(db_type, path):
+    """Raise BackupError unless the database copy is readable and consistent"""
+    if db_type == 'sqlite':
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            connection.close()
+        if result != 'ok':
+            raise BackupError(f"Database integrity check failed: {result}")
+    else:
+        command = [shutil.which('pg_restore') or 'pg_restore', '--list', path]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except OSError as e:
+            raise BackupError(f"Cannot run pg_restore: {e}")
+        if result.returncode != 0:
+            raise BackupError(f"Dump is unreadable: {result.stderr.strip()}")
+
+
+def _object_path(backup_dir, sha256):
+    return os.path.join(backup_dir, OBJECTS_DIR, sha256[:2], sha256)
+
+
+def _store_object(backup_dir, source, expected=None):
+    """Copy source into the object store unless its content is there; returns (sha256, copied)"""
+    if expected and os.path.exists(_object_path(backup_dir, expected)):
+        return expected, False
+    sha256 = expected or sha256_file(source)
+    target = _object_path(backup_dir, sha256)
+    if os.path.exists(target):
+        return sha256, False
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = f"{target}.{os.getpid()}.tmp"
+    digest = hashlib.sha256()
+    with open(source, 'rb') as src, open(temporary, 'wb') as dst:
+        for chunk in iter(lambda: src.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+            dst.write(chunk)
+    copied = digest.hexdigest()
+    if copied != sha256:
+        # The upload changed while we read it; store what was actually copied
+        sha256, target = copied, _object_path(backup_dir, copied)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(temporary, target)
+    return sha256, True
+
+
+def upload_directory(base_dir):
+    """The configured upload directory, or None when uploads are kept in the database"""
+    root = storage_config.upload_root()
+    return None if root is None else os.path.join(base_dir, root)
+
+
+def _backup_uploads(backup_dir, base_dir, set_dir, previous, progress):
+    backend = storage_config.storage_backend()
+    upload_dir = upload_directory(base_dir)
+    if upload_dir is None:
+        _write_json(os.path.join(set_dir, UPLOADS_MANIFEST), [])
+        summary = {'backend': backend, 'count': 0, 'size': 0, 'copied': 0, 'copied_size': 0,
+                   'note': 'Uploads are stored in the database and covered by the database copy'}
+        return summary, set()
+    if backend == 'shared' and not os.path.isdir(upload_dir):
+        # An unmounted share would otherwise give a verified set without uploads
+        raise BackupError(f"Shared upload directory {upload_dir} not found")
+
+    known = {entry['path']: entry for entry in previous}
+    paths = []
+    for directory, _, files in os.walk(upload_dir):
+        paths.extend(os.path.join(directory, name) for name in files)
+
+    entries = []
+    copied = set()
+    copied_bytes = 0
+    for number, path in enumerate(sorted(paths), 1):
+        relative = os.path.relpath(path, upload_dir).replace(os.sep, '/')
+        stat = os.stat(path)
+        last = known.get(relative)
+        unchanged = last and last['size'] == stat.st_size and last['mtime_ns'] == stat.st_mtime_ns
+        sha256, new = _store_object(backup_dir, path, last['sha256'] if unchanged else None)
+        if new:
+            copied.add(sha256)
+            copied_bytes += stat.st_size
+        entries.append({'path': relative, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256})
+        _report(progress, DATABASE_SHARE + UPLOADS_SHARE * number / len(paths),
+                f"Uploads: {number} of {len(paths)} ({len(copied)} new)")
+
+    _write_json(os.path.join(set_dir, UPLOADS_MANIFEST), entries)
+    summary = {'backend': backend, 'directory': os.path.abspath(upload_dir), 'count': len(entries),
+               'size': sum(entry['size'] for entry in entries), 'copied': len(copied), 'copied_size': copied_bytes}
+    return summary, copied
+
+
+def list_backups(backup_dir):
+    """Manifests of every backup set, newest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    manifests = []
+    for name in os.listdir(backup_dir):
+        if name.startswith(SET_PREFIX):
+            manifest = _read_json(os.path.join(backup_dir, name, MANIFEST))
+            if manifest:
+                manifests.append(manifest)
+    return sorted(manifests, key=lambda manifest: manifest['created'], reverse=True)
+
+
+def _load_set(backup_dir, name):
+    set_dir = os.path.join(backup_dir, name)
+    manifest = _read_json(os.path.join(set_dir, MANIFEST))
+    if not manifest:
+        raise BackupError(f"Backup {name} has no manifest")
+    return set_dir, manifest
+
+
+def _verify_set(backup_dir, set_dir, manifest, progress, start=0.0, objects=None):
+    """Check the database copy and the stored uploads (only those in objects when given)"""
+    database = manifest['database']
+    path = os.path.join(set_dir, database['file'])
+    _report(progress, start, "Verifying database copy")
+    if not os.path.exists(path) or sha256_file(path) != database['sha256']:
+        raise BackupError(f"{database['file']} is missing or does not match its checksum")
+    verify_database(database['type'], path)
+
+    entries = _read_json(os.path.join(set_dir, UPLOADS_MANIFEST), [])
+    if objects is not None:
+        entries = [entry for entry in entries if entry['sha256'] in objects]
+    for number, entry in enumerate(entries, 1):
+        stored = _object_path(backup_dir, entry['sha256'])
+        if not os.path.exists(stored) or sha256_file(stored) != entry['sha256']:
+            raise BackupError(f"Upload {entry['path']} is missing or corrupt in the backup")
+        _report(progress, start + (1 - start) * number / len(entries), f"Verified {number} of {len(entries)} uploads")
+
+
+def create_backup(backup_dir, db_config, base_dir, progress=None):
+    """Back up the database and uploads into a new set; returns its manifest"""
+    created = datetime.now()
+    name = f"{SET_PREFIX}{created:%Y%m%d_%H%M%S}"
+    number = 1
+    while os.path.exists(os.path.join(backup_dir, name)):
+        number += 1
+        name = f"{SET_PREFIX}{created:%Y%m%d_%H%M%S}_{number}"
+    set_dir = os.path.join(backup_dir, name)
+    os.makedirs(set_dir)
+    manifest = {'name': name, 'created': created.isoformat(timespec='seconds'), 'status': 'running'}
+    _write_json(os.path.join(set_dir, MANIFEST), manifest)
+
+    # Hashes of the newest good set let unchanged uploads skip re-reading
+    previous = next((m for m in list_backups(backup_dir) if m['status'] == 'verified'), None)
+    previous_uploads = _read_json(os.path.join(backup_dir, previous['name'], UPLOADS_MANIFEST), []) if previous else []
+
+    started = time.monotonic()
+    try:
+        manifest['database'] = _backup_database(db_config, base_dir, set_dir, progress)
+        manifest['uploads'], copied = _backup_uploads(backup_dir, base_dir, set_dir, previous_uploads, progress)
+        # Older objects were checked when they were stored
+        _verify_set(backup_dir, set_dir, manifest, progress, DATABASE_SHARE + UPLOADS_SHARE, copied)
+    except Exception as e:
+        manifest.update(status='failed', error=str(e))
+        _write_json(os.path.join(set_dir, MANIFEST), manifest)
+        raise
+    manifest.update(status='verified', verified_at=datetime.now().isoformat(timespec='seconds'),
+                    seconds=round(time.monotonic() - started, 1))
+    _write_json(os.path.join(set_dir, MANIFEST), manifest)
+    _report(progress, 1.0, f"Backup {name} completed and verified")
+    return manifest
+
+
+def verify_backup(backup_dir, name, progress=None):
+    """Recheck a set's checksums and database integrity"""
+    set_dir, manifest = _load_set(backup_dir, name)
+    if 'database' not in manifest:
+        raise BackupError(f"Backup {name} did not complete")
+    try:
+        _verify_set(backup_dir, set_dir, manifest, progress)
+    except BackupError as e:
+        manifest.update(status='corrupt', error=str(e))
+        _write_json(os.path.join(set_dir, MANIFEST), manifest)
+        raise
+    manifest.update(status='verified', verified_at=datetime.now().isoformat(timespec='seconds'))
+    manifest.pop('error', None)
+    _write_json(os.path.join(set_dir, MANIFEST), manifest)
+    _report(progress, 1.0, f"Backup {name} verified")
+    return manifest
+
+
+def restore_backup(backup_dir, name, db_config, base_dir, progress=None):
+    """Verify a set, then restore its database and any missing or changed uploads"""
+    set_dir, manifest = _load_set(backup_dir, name)
+    verify_backup(backup_dir, name, lambda fraction, message: _report(progress, fraction * 0.3, message))
+    database = manifest['database']
+    source = os.path.join(set_dir, database['file'])
+
+    entries = _read_json(os.path.join(set_dir, UPLOADS_MANIFEST), [])
+    upload_dir = upload_directory(base_dir)
+    if entries and upload_dir is None:
+        raise BackupError(f"Backup {name} holds upload files, but uploads are now stored in the database; "
+                          f"set HELPDESK_STORAGE to a file backend to restore it")
+    if database['type'] != db_config.get('type', 'sqlite'):
+        raise BackupError(f"Backup {name} is a {database['type']} backup; the configured database "
+                          f"is {db_config.get('type', 'sqlite')}")
+    if database['type'] == 'sqlite':
+        copy_sqlite(source, sqlite_database_path(db_config, base_dir),
+                    lambda fraction, message: _report(progress, 0.3 + fraction * 0.4, message))
+    else:
+        section = db_config.get('postgresql') or {}
+        command, env = _pg_command('pg_restore', section)
+        command += ['--clean', '--if-exists', '--no-owner', '--verbose',
+                    '--dbname', section.get('database') or 'it_helpdesk', source]
+        _run_pg(command, env, progress, 0.5)
+
+    restored = 0
+    for number, entry in enumerate(entries, 1):
+        target = os.path.join(upload_dir, *entry['path'].split('/'))
+        if not os.path.exists(target) or os.path.getsize(target) != entry['size'] \
+                or sha256_file(target) != entry['sha256']:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(_object_path(backup_dir, entry['sha256']), target)
+            restored += 1
+        _report(progress, 0.7 + 0.3 * number / len(entries), f"Uploads: {number} of {len(entries)}")
+    _report(progress, 1.0, f"Restored {name}: database and {restored} uploads")
+    return restored
+
+
+def apply_retention(backup_dir, keep=DEFAULT_KEEP, max_age_days=DEFAULT_MAX_AGE_DAYS, progress=None):
+    """Remove sets beyond the newest keep that are older than max_age_days, and
+    failed sets older than the newest good one; then unreferenced objects"""
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    removed = []
+    good = 0
+    newest_good = None
+    for manifest in list_backups(backup_dir):
+        created = datetime.fromisoformat(manifest['created'])
+        if manifest['status'] == 'verified':
+            good += 1
+            newest_good = newest_good or created
+            expired = good > keep and created < cutoff
+        else:
+            # Jobs run one at a time, so a set still marked running was interrupted
+            expired = newest_good is not None
+        if expired:
+            shutil.rmtree(os.path.join(backup_dir, manifest['name']), ignore_errors=True)
+            removed.append(manifest['name'])
+            _report(progress, None, f"Removed {manifest['name']}")
+
+    # Objects are shared, so only those no remaining set lists can go
+    referenced = set()
+    for manifest in list_backups(backup_dir):
+        entries = _read_json(os.path.join(backup_dir, manifest['name'], UPLOADS_MANIFEST), [])
+        referenced.update(entry['sha256'] for entry in entries)
+    freed = 0
+    for directory, _, files in os.walk(os.path.join(backup_dir, OBJECTS_DIR)):
+        for name in files:
+            if name not in referenced:
+                path = os.path.join(directory, name)
+                freed += os.path.getsize(path)
+                os.remove(path)
+    _report(progress, 1.0, f"Removed {len(removed)} backups, freed {freed / 1024 / 1024:.1f} MB of uploads")
+    return removed
+
+
+def is_due(backup_dir, interval):
+    """True when the newest good set is older than the named interval"""
+    latest = next((m for m in list_backups(backup_dir) if m['status'] == 'verified'), None)
+    if latest is None:
+        return True
+    age = datetime.now() - datetime.fromisoformat(latest['created'])
+    return age.total_seconds() >= INTERVALS.get(interval, INTERVALS['daily'])
+
+
+class BackupWorker:
+    """Runs backup jobs one at a time on a background thread"""
+
+    def __init__(self, on_progress=None, on_done=None):
+        # on_progress(fraction or None, message); on_done(title, result, error)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.busy = False
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='backup-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, title, function, *args):
+        self.busy = True
+        self._jobs.put((title, function, args))
+
+    def stop(self):
+        self._jobs.put(None)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            title, function, args = job
+            result = error = None
+            try:
+                result = function(*args, progress=self.on_progress)
+            except Exception as e:
+                error = e
+            self.busy = not self._jobs.empty()
+            if self.on_done:
+                try:
+                    self.on_done(title, result, error)
+                except Exception:
+                    # The window may be closing
+                    pass
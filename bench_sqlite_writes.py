@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+SQLite concurrency benchmark for the IT Helpdesk server
+Compares ticket/comment style write throughput (with concurrent readers) for:
+  journal         - rollback journal, synchronous=FULL, one commit per request
+  wal             - production PRAGMAs (WAL, synchronous=NORMAL), one commit per request
+  wal+group       - production PRAGMAs with the group commit writer
+  wal-full        - WAL with synchronous=FULL (an fsync on every commit)
+  wal-full+group  - the same with the group commit writer sharing each fsync
+
+Usage: python bench_sqlite_writes.py [--writers 16] [--writes 200] [--readers 4]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import (Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text,
+                        create_engine, func, insert, select, update)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+import engine_profiles
+import write_queue
+
+metadata = MetaData()
+
+tickets = Table(
+    'tickets', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('updated_at', DateTime),
+)
+
+ticket_comments = Table(
+    'ticket_comments', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('ticket_id', Integer, ForeignKey('tickets.id'), nullable=False),
+    Column('comment', Text, nullable=False),
+    Column('created_at', DateTime),
+)
+
+# Rollback-journal settings matching an untuned SQLite file
+JOURNAL_PRAGMAS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "busy_timeout": 5000,
+}
+
+
+def write_request(conn_or_session, worker, n):
+    """One create_ticket + add_comment sized unit of work"""
+    ticket_id = conn_or_session.execute(insert(tickets).values(
+        title=f"Ticket {worker}-{n}",
+        description="Printer on floor 2 is not responding",
+        status='Open',
+        updated_at=datetime.utcnow(),
+    )).inserted_primary_key[0]
+    conn_or_session.execute(insert(ticket_comments).values(
+        ticket_id=ticket_id, comment="Checked the cable", created_at=datetime.utcnow()))
+    conn_or_session.execute(update(tickets).where(tickets.c.id == ticket_id)
+                            .values(updated_at=datetime.utcnow()))
+
+
+def run_case(name, path, pragmas, group_commit, writers, writes, readers):
+    engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+    engine_profiles.apply_sqlite_pragmas(engine, pragmas)
+    metadata.create_all(engine)
+
+    writer = None
+    if group_commit:
+        writer = write_queue.GroupCommitWriter(write_queue.create_writer_engine(f"sqlite:///{path}", pragmas))
+
+    errors = []
+    reads = [0] * readers
+    stop_readers = threading.Event()
+
+    def write_worker(worker):
+        for n in range(writes):
+            try:
+                if writer is not None:
+                    writer.run(lambda session: write_request(session, worker, n))
+                else:
+                    with engine.begin() as conn:
+                        write_request(conn, worker, n)
+            except (OperationalError, sqlite3.OperationalError) as e:
+                errors.append(str(e))
+
+    def read_worker(index):
+        while not stop_readers.is_set():
+            with engine.connect() as conn:
+                conn.execute(select(tickets.c.status, func.count()).group_by(tickets.c.status)).all()
+            reads[index] += 1
+
+    reader_threads = [threading.Thread(target=read_worker, args=(i,)) for i in range(readers)]
+    writer_threads = [threading.Thread(target=write_worker, args=(i,)) for i in range(writers)]
+    for thread in reader_threads:
+        thread.start()
+
+    start = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stop_readers.set()
+    for thread in reader_threads:
+        thread.join()
+    if writer is not None:
+        writer.stop()
+    engine.dispose()
+
+    completed = writers * writes - len(errors)
+    print(f"{name:<15} {completed / elapsed:>10.0f} {sum(reads) / elapsed:>10.0f} "
+          f"{len(errors):>8} {elapsed:>8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite write concurrency benchmark")
+    parser.add_argument("--writers", type=int, default=16, help="Concurrent writer threads")
+    parser.add_argument("--writes", type=int, default=200, help="Write requests per writer")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent dashboard readers")
+    args = parser.parse_args()
+
+    full_sync_pragmas = dict(engine_profiles.SQLITE_PRAGMAS, synchronous="FULL")
+    cases = [
+        ("journal", JOURNAL_PRAGMAS, False),
+        ("wal", engine_profiles.SQLITE_PRAGMAS, False),
+        ("wal+group", engine_profiles.SQLITE_PRAGMAS, True),
+        ("wal-full", full_sync_pragmas, False),
+        ("wal-full+group", full_sync_pragmas, True),
+    ]
+
+    print(f"{args.writers} writers x {args.writes} writes, {args.readers} readers")
+    print(f"{'mode':<15} {'writes/s':>10} {'reads/s':>10} {'errors':>8} {'elapsed':>9}")
+    # Keep the files next to the real database so fsync costs are realistic
+    with tempfile.TemporaryDirectory(dir=os.getcwd()) as tmp:
+        for name, pragmas, group_commit in cases:
+            path = os.path.join(tmp, f"{name.replace('+', '_')}.db")
+            run_case(name, path, pragmas, group_commit, args.writers, args.writes, args.readers)
+
+
+if __name__ == "__main__":
+    main()
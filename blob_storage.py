@@ -0,0 +1,389 @@
+"""
+Pluggable storage for uploaded ticket images
+Uploads are saved and read through one of these backends, chosen with
+HELPDESK_STORAGE:
+  local     files under static/uploads on this node (the default)
+  shared    files under HELPDESK_UPLOAD_PATH, a network share every node mounts
+  database  content split into CHUNK_SIZE rows of blob_chunks, so every node
+            sees every upload without shared storage
+Whatever the backend, the blobs table records the size and SHA-256 of each
+upload. Reads and writes are streamed a chunk at a time.
+
+The shared and database backends are read through a cache on each node:
+files named by their SHA-256 under HELPDESK_BLOB_CACHE_DIR, evicted least
+recently used first beyond HELPDESK_BLOB_CACHE_MB. The cache is filled only
+after the content has been checked against the recorded hash.
+
+Archiving renames an upload to ARCHIVE_PREFIX + key.
+  flask --app main import-uploads   copy local uploads into the configured backend
+  flask --app main verify-blobs     recheck every stored hash
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+
+import click
+from flask import send_file
+from sqlalchemy import delete, insert, select, update
+
+from app import app, db
+from models import Blob, BlobChunk
+from storage_config import UPLOAD_DIR, storage_backend, upload_root
+import metrics
+
+CHUNK_SIZE = 256 * 1024
+ARCHIVE_PREFIX = 'archive/'
+DEFAULT_CACHE_MB = 256
+
+BlobInfo = namedtuple('BlobInfo', 'key size sha256 content_type')
+
+
+class BlobNotFound(LookupError):
+    pass
+
+
+class BlobIntegrityError(RuntimeError):
+    pass
+
+
+def _read_chunks(stream):
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _record(conn, backend, info, chunk_count=0):
+    blobs = Blob.__table__
+    conn.execute(delete(blobs).where(blobs.c.key == info.key))
+    conn.execute(insert(blobs).values(key=info.key, backend=backend, size=info.size, sha256=info.sha256,
+                                      content_type=info.content_type, chunk_count=chunk_count))
+
+
+class FileStorage:
+    """Uploads as files under a directory, local or on a network share"""
+
+    def __init__(self, root, name='local', cacheable=False):
+        self.root = os.path.abspath(root)
+        self.name = name
+        # Files on a network share are worth copying to the node's cache
+        self.cacheable = cacheable
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise BlobNotFound(key)
+        return path
+
+    def save(self, key, stream, content_type=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        # Written under a temporary name so readers never see half a file
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in _read_chunks(stream):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        info = BlobInfo(key, size, digest.hexdigest(), content_type)
+        with db.engine.begin() as conn:
+            _record(conn, self.name, info)
+        return info
+
+    def open(self, key):
+        path = self.path(key)
+        if not os.path.exists(path):
+            raise BlobNotFound(key)
+        with open(path, 'rb') as f:
+            yield from _read_chunks(f)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def rename(self, key, new_key):
+        new_path = self.path(new_key)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(self.path(key), new_path)
+        blobs = Blob.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(blobs).where(blobs.c.key == new_key))
+            conn.execute(update(blobs).where(blobs.c.key == key).values(key=new_key))
+
+    def delete(self, key):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+        with db.engine.begin() as conn:
+            conn.execute(delete(Blob.__table__).where(Blob.__table__.c.key == key))
+
+
+class DatabaseStorage:
+    """Uploads as CHUNK_SIZE rows of blob_chunks in the main database"""
+
+    name = 'database'
+    cacheable = True
+
+    def save(self, key, stream, content_type=None):
+        chunks = BlobChunk.__table__
+        digest = hashlib.sha256()
+        size = 0
+        count = 0
+        with db.engine.begin() as conn:
+            conn.execute(delete(chunks).where(chunks.c.key == key))
+            for chunk in _read_chunks(stream):
+                digest.update(chunk)
+                size += len(chunk)
+                conn.execute(insert(chunks).values(key=key, seq=count, data=chunk))
+                count += 1
+            info = BlobInfo(key, size, digest.hexdigest(), content_type)
+            _record(conn, self.name, info, chunk_count=count)
+        return info
+
+    def open(self, key):
+        chunks = BlobChunk.__table__
+        with db.engine.connect() as conn:
+            count = conn.execute(select(Blob.__table__.c.chunk_count)
+                                 .where(Blob.__table__.c.key == key)).scalar()
+            if count is None:
+                raise BlobNotFound(key)
+            # One chunk per query keeps memory flat whatever the upload size
+            for seq in range(count):
+                data = conn.execute(select(chunks.c.data).where(chunks.c.key == key, chunks.c.seq == seq)).scalar()
+                if data is None:
+                    raise BlobIntegrityError(f"Chunk {seq} of {key} is missing")
+                yield data
+
+    def exists(self, key):
+        return info(key) is not None
+
+    def rename(self, key, new_key):
+        chunks = BlobChunk.__table__
+        blobs = Blob.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(chunks).where(chunks.c.key == new_key))
+            conn.execute(delete(blobs).where(blobs.c.key == new_key))
+            conn.execute(update(chunks).where(chunks.c.key == key).values(key=new_key))
+            conn.execute(update(blobs).where(blobs.c.key == key).values(key=new_key))
+
+    def delete(self, key):
+        with db.engine.begin() as conn:
+            conn.execute(delete(BlobChunk.__table__).where(BlobChunk.__table__.c.key == key))
+            conn.execute(delete(Blob.__table__).where(Blob.__table__.c.key == key))
+
+
+class BlobCache:
+    """Node-local copies of blobs named by SHA-256, evicted least recently used first"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.part'):
+                os.remove(path)
+            elif os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+
+    def get(self, sha256):
+        """Path of a cached copy, or None"""
+        path = os.path.join(self.directory, sha256)
+        with self._lock:
+            if sha256 not in self._entries:
+                return None
+            if not os.path.exists(path):
+                # Evicted by another worker sharing the directory
+                self._size -= self._entries.pop(sha256)
+                return None
+            self._entries.move_to_end(sha256)
+        return path
+
+    def fill(self, storage, info):
+        """Copy a blob into the cache, checking its hash; returns the cached path"""
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in storage.open(info.key):
+                    digest.update(chunk)
+                    f.write(chunk)
+            if digest.hexdigest() != info.sha256:
+                metrics.incr('blob_storage.integrity_errors')
+                raise BlobIntegrityError(f"{info.key} does not match its recorded SHA-256")
+            path = os.path.join(self.directory, info.sha256)
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+        with self._lock:
+            if info.sha256 not in self._entries:
+                self._entries[info.sha256] = info.size
+                self._size += info.size
+            self._entries.move_to_end(info.sha256)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                evicted, size = self._entries.popitem(last=False)
+                self._size -= size
+                try:
+                    os.remove(os.path.join(self.directory, evicted))
+                except OSError:
+                    pass
+                metrics.incr('blob_storage.cache_evictions')
+        return path
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'max_bytes': self.max_bytes}
+
+
+_storage = None
+_cache = None
+_lock = threading.Lock()
+
+
+def create_storage(name=None):
+    name = name or storage_backend()
+    if name == 'local':
+        return FileStorage(upload_root(name))
+    if name == 'shared':
+        return FileStorage(upload_root(name), name='shared', cacheable=True)
+    if name == 'database':
+        return DatabaseStorage()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_storage():
+    """The configured backend for this process"""
+    global _storage, _cache
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                storage = create_storage()
+                if storage.cacheable:
+                    directory = (os.environ.get("HELPDESK_BLOB_CACHE_DIR")
+                                 or os.path.join(app.instance_path, 'blob_cache'))
+                    max_mb = int(os.environ.get("HELPDESK_BLOB_CACHE_MB", DEFAULT_CACHE_MB))
+                    _cache = BlobCache(directory, max_mb * 1024 * 1024)
+                    metrics.register_collector('blob_cache', _cache.stats)
+                _storage = storage
+    return _storage
+
+
+def info(key):
+    """BlobInfo recorded for a key, or None"""
+    row = db.session.execute(select(Blob.key, Blob.size, Blob.sha256, Blob.content_type)
+                             .where(Blob.key == key)).first()
+    return BlobInfo(*row) if row is not None else None
+
+
+def save(key, stream, content_type=None):
+    """Stream an upload into the configured backend; returns its BlobInfo"""
+    result = get_storage().save(key, stream, content_type)
+    metrics.incr('blob_storage.writes')
+    metrics.incr('blob_storage.bytes_written', result.size)
+    return result
+
+
+def archive(key):
+    """Move an upload under ARCHIVE_PREFIX"""
+    get_storage().rename(key, ARCHIVE_PREFIX + key)
+
+
+def send_blob(key):
+    """Response streaming a stored upload, or None when the key is unknown"""
+    storage = get_storage()
+    blob = info(key)
+    mimetype = (blob.content_type if blob else None) or mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+    if not storage.cacheable:
+        try:
+            path = storage.path(key)
+        except BlobNotFound:
+            return None
+        if not os.path.exists(path):
+            return None
+        # Uploads from before the blobs table have no recorded hash
+        return send_file(path, mimetype=mimetype, etag=blob.sha256 if blob else True, conditional=True)
+
+    if blob is None:
+        return None
+    path = _cache.get(blob.sha256)
+    if path is None:
+        metrics.incr('blob_storage.cache_misses')
+        try:
+            path = _cache.fill(storage, blob)
+        except BlobNotFound:
+            return None
+    else:
+        metrics.incr('blob_storage.cache_hits')
+    return send_file(path, mimetype=mimetype, etag=blob.sha256, conditional=True,
+                     download_name=os.path.basename(key))
+
+
+@app.cli.command('import-uploads')
+@click.option('--source', default=UPLOAD_DIR, show_default=True, help='Directory holding existing uploads.')
+def import_uploads_command(source):
+    """Copy uploads from a local directory into the configured backend"""
+    storage = get_storage()
+    imported = 0
+    for directory, _, files in os.walk(source):
+        for name in files:
+            path = os.path.join(directory, name)
+            key = os.path.relpath(path, source).replace(os.sep, '/')
+            if isinstance(storage, FileStorage) and os.path.abspath(path) == storage.path(key):
+                # Already in place: only record its hash
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256()
+                    for chunk in _read_chunks(f):
+                        digest.update(chunk)
+                with db.engine.begin() as conn:
+                    _record(conn, storage.name, BlobInfo(key, os.path.getsize(path), digest.hexdigest(),
+                                                         mimetypes.guess_type(name)[0]))
+            else:
+                with open(path, 'rb') as f:
+                    storage.save(key, f, mimetypes.guess_type(name)[0])
+            imported += 1
+    click.echo(f"Imported {imported} uploads into {storage.name} storage.")
+
+
+@app.cli.command('verify-blobs')
+def verify_blobs_command():
+    """Recompute the SHA-256 of every stored upload and report mismatches"""
+    storage = get_storage()
+    checked = bad = 0
+    for row in db.session.execute(select(Blob.key, Blob.sha256).where(Blob.backend == storage.name)):
+        digest = hashlib.sha256()
+        try:
+            for chunk in storage.open(row.key):
+                digest.update(chunk)
+            ok = digest.hexdigest() == row.sha256
+        except (BlobNotFound, BlobIntegrityError):
+            ok = False
+        checked += 1
+        if not ok:
+            bad += 1
+            logging.error(f"Upload {row.key} is missing or does not match its SHA-256")
+    click.echo(f"Checked {checked} uploads, {bad} damaged or missing.")
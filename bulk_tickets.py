@@ -0,0 +1,116 @@
+"""
+Bulk ticket operations for super admins
+Applies one status, priority and/or assignee change to a set of live tickets
+with set-based UPDATE ... WHERE id IN (...) statements, one per chunk of IDs,
+all in a single transaction. resolved_at and updated_at follow the same rules
+as edit_ticket and assign_ticket.
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, case, literal, select, update
+
+from app import db
+from coded_enums import Status, TICKET_PRIORITIES, TICKET_STATUSES
+from models import Ticket, User
+import auto_assign
+import cache
+import metrics
+import notifications
+import sla
+import ticket_history
+import write_queue
+
+# IDs per UPDATE statement; keeps every statement well below driver parameter limits
+DEFAULT_CHUNK_SIZE = 500
+
+# Value of the assignee field that clears the assignment, as in edit_assignment
+UNASSIGN = 0
+
+
+def bulk_update_tickets(ticket_ids, status=None, priority=None, assigned_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE):
+    """Apply the given changes to every listed ticket; returns the number updated
+
+    assigned_to=UNASSIGN clears the assignee, None leaves it unchanged.
+    """
+    if status is not None and status not in TICKET_STATUSES:
+        raise ValueError(f"Unknown status: {status}")
+    if priority is not None and priority not in TICKET_PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+    if assigned_to not in (None, UNASSIGN):
+        assignee = db.session.get(User, assigned_to)
+        if assignee is None or not assignee.is_admin:
+            raise ValueError("Tickets can only be assigned to admins")
+
+    ticket_ids = sorted(set(ticket_ids))
+    values = _update_values(status, priority, assigned_to)
+    if not ticket_ids or values is None:
+        return 0
+
+    tickets = Ticket.__table__
+    actor_id = notifications.current_actor()
+
+    def apply_changes(session):
+        updated = 0
+        for start in range(0, len(ticket_ids), chunk_size):
+            chunk = ticket_ids[start:start + chunk_size]
+            before = session.execute(select(tickets.c.id, tickets.c.title, tickets.c.user_id, tickets.c.status,
+                                            tickets.c.priority, tickets.c.assigned_to)
+                                     .where(tickets.c.id.in_(chunk))).all()
+            notifications.record_bulk_changes(session, before, status, assigned_to, actor_id)
+            ticket_history.record_bulk_changes(session, before, status, priority, assigned_to, actor_id)
+            result = session.execute(update(tickets).where(tickets.c.id.in_(chunk)).values(values))
+            updated += result.rowcount
+            if priority is not None:
+                sla.recompute_deadlines(session, chunk)
+        return updated
+
+    updated = write_queue.run_write(db.session, apply_changes)
+    # Set-based updates bypass the session events that track workload and SLA
+    # deadlines and the cache tags; notifications and history are recorded above
+    auto_assign.mark_stale()
+    cache.invalidate('tickets', *(cache.row_tag(Ticket, ticket_id) for ticket_id in ticket_ids))
+    sla.reschedule(ticket_ids)
+    metrics.incr('bulk_tickets.updates')
+    metrics.incr('bulk_tickets.tickets', updated)
+    logging.info(f"Bulk update of {updated} tickets: status={status} priority={priority} "
+                 f"assigned_to={assigned_to}")
+    return updated
+
+
+def _update_values(status, priority, assigned_to):
+    """SET clause for the requested changes, or None when nothing changes"""
+    tickets = Ticket.__table__
+    now = datetime.utcnow()
+    values = {}
+
+    if priority is not None:
+        values['priority'] = priority
+
+    if status is not None:
+        values['status'] = status
+        if status == 'Resolved':
+            # Tickets that were already resolved keep their original resolution time
+            values['resolved_at'] = case((tickets.c.status == 'Resolved', tickets.c.resolved_at), else_=now)
+        else:
+            values['resolved_at'] = None
+
+    if assigned_to is not None:
+        values['assigned_to'] = assigned_to or None
+        if status is None and assigned_to:
+            # Assigning picks up open tickets, as assign_ticket does
+            values['status'] = case((tickets.c.status == 'Open', literal('In Progress', Status)),
+                                    else_=tickets.c.status)
+
+    if values.get('status') is not None and status != 'Open':
+        # Leaving Open counts as the SLA response
+        values['first_response_at'] = case(
+            (and_(tickets.c.status == 'Open', tickets.c.first_response_at.is_(None)), now),
+            else_=tickets.c.first_response_at)
+
+    if not values:
+        return None
+    values['updated_at'] = now
+    return values
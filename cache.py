@@ -0,0 +1,416 @@
+"""
+Application cache
+One cache for the hot lookups: the logged-in user, the admin roster,
+dashboard statistics and the category-to-team map. Use get_or_set() or the
+cached() decorator; values are pickled, so callers always get their own copy.
+
+Backends, chosen with HELPDESK_CACHE:
+  memory  per-process TTL + LRU store within HELPDESK_CACHE_MB (default);
+          other gunicorn workers only see invalidations once entries expire
+  sqlite  one SQLite file shared by every worker on the host
+          (HELPDESK_CACHE_PATH, default instance/cache.sqlite3); put it on
+          /dev/shm to keep it in shared memory
+
+Entries are tagged. Committed writes to tickets, users and category teams
+bump the version of their table tag ('tickets') and row tag ('tickets:42');
+an entry stored under an older version is treated as a miss. Versions are
+read before a value is computed, so a write that commits while it is being
+computed still invalidates it. Set-based updates call invalidate() directly.
+
+get_or_set() computes a missing value once: other threads wait for it, and
+with the sqlite backend other workers wait on a short lease as well.
+"""
+
+import functools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import app, db
+from models import CategoryTeam, Ticket, User
+import metrics
+
+DEFAULT_BACKEND = 'memory'
+DEFAULT_TTL = 300
+DEFAULT_MAX_MB = 64
+
+# How long another worker may spend computing a value before we compute it too
+LEASE_SECONDS = 5
+LEASE_POLL_SECONDS = 0.05
+
+# Writes to these models invalidate their table and row tags
+TAGGED_MODELS = (Ticket, User, CategoryTeam)
+
+_MISSING = object()
+
+
+class MemoryBackend:
+    """TTL + LRU store of pickled entries within a byte budget"""
+
+    name = 'memory'
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, data)
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def store(self, key, data, ttl):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.time() + ttl, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                metrics.incr('cache.evictions')
+
+    def delete(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def acquire(self, key):
+        # Threads of this process already wait on each other in get_or_set()
+        return True
+
+    def release(self, key):
+        pass
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'tags': len(self._versions)}
+
+
+class SQLiteBackend:
+    """Entries, tag versions and leases in one SQLite file shared by all workers"""
+
+    name = 'sqlite'
+
+    # Reads refresh an entry's LRU position at most this often, to keep hits read-only
+    TOUCH_SECONDS = 10
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                         "size INTEGER NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tag_versions (tag TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def load(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT data, expires_at, used_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data, expires_at, used_at = row
+        if expires_at <= now:
+            conn.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?", (key, now))
+            return None
+        if now - used_at > self.TOUCH_SECONDS:
+            conn.execute("UPDATE entries SET used_at = ? WHERE key = ?", (now, key))
+        return data
+
+    def store(self, key, data, ttl):
+        if len(data) > self.max_bytes:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO entries (key, data, size, expires_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                     (key, sqlite3.Binary(data), len(data), now + ttl, now))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        # Expired entries first, then least recently used down to 90% of the budget
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY used_at").fetchall()
+        total = sum(size for _, size in rows)
+        victims = []
+        for key, size in rows:
+            if total <= self.max_bytes * 0.9:
+                break
+            victims.append((key,))
+            total -= size
+        if victims:
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            metrics.incr('cache.evictions', len(victims))
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def versions(self, tags):
+        rows = self._connect().execute(
+            f"SELECT tag, version FROM tag_versions WHERE tag IN ({', '.join('?' * len(tags))})", tags).fetchall()
+        found = dict(rows)
+        return [found.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        self._connect().executemany(
+            "INSERT INTO tag_versions (tag, version) VALUES (?, 1) "
+            "ON CONFLICT(tag) DO UPDATE SET version = version + 1", [(tag,) for tag in tags])
+
+    def acquire(self, key):
+        conn = self._connect()
+        now = time.time()
+        if conn.execute("INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)",
+                        (key, now + LEASE_SECONDS)).rowcount:
+            return True
+        # Take over a lease its worker never released
+        return bool(conn.execute("UPDATE leases SET expires_at = ? WHERE key = ? AND expires_at <= ?",
+                                 (now + LEASE_SECONDS, key, now)).rowcount)
+
+    def release(self, key):
+        self._connect().execute("DELETE FROM leases WHERE key = ?", (key,))
+
+    def stats(self):
+        entries, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'entries': entries, 'bytes': size, 'path': self.path}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _default_ttl():
+    return int(os.environ.get("HELPDESK_CACHE_TTL", DEFAULT_TTL))
+
+
+def get_backend():
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("HELPDESK_CACHE", DEFAULT_BACKEND)
+                max_bytes = int(float(os.environ.get("HELPDESK_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+                if name == 'memory':
+                    backend = MemoryBackend(max_bytes)
+                elif name == 'sqlite':
+                    path = os.environ.get("HELPDESK_CACHE_PATH") or os.path.join(app.instance_path, 'cache.sqlite3')
+                    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                    backend = SQLiteBackend(path, max_bytes)
+                else:
+                    raise ValueError(f"Unknown cache backend: {name}")
+                metrics.register_collector('cache', lambda: dict(backend.stats(), backend=backend.name,
+                                                                 max_bytes=backend.max_bytes))
+                logging.info(f"Application cache: {name} backend, {max_bytes // (1024 * 1024)} MB")
+                _backend = backend
+    return _backend
+
+
+def _lookup(key):
+    backend = get_backend()
+    data = backend.load(key)
+    if data is None:
+        return _MISSING
+    tags, versions, value = pickle.loads(data)
+    if tags and backend.versions(tags) != versions:
+        metrics.incr('cache.stale')
+        return _MISSING
+    return value
+
+
+def _store(key, value, ttl, tags, versions):
+    get_backend().store(key, pickle.dumps((tags, versions, value), pickle.HIGHEST_PROTOCOL),
+                        _default_ttl() if ttl is None else ttl)
+
+
+def get(key, default=None):
+    """Cached value of key, or default"""
+    value = _lookup(key)
+    if value is _MISSING:
+        metrics.incr('cache.misses')
+        return default
+    metrics.incr('cache.hits')
+    return value
+
+
+def put(key, value, ttl=None, tags=()):
+    """Cache value under key for ttl seconds, until one of its tags is invalidated"""
+    tags = list(tags)
+    _store(key, value, ttl, tags, get_backend().versions(tags) if tags else [])
+
+
+def delete(key):
+    get_backend().delete(key)
+
+
+def invalidate(*tags):
+    """Drop every entry stored under any of the tags, in all workers sharing the backend"""
+    if tags:
+        get_backend().bump(list(tags))
+        metrics.incr('cache.invalidations', len(tags))
+
+
+def _flight_lock(key):
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is None:
+            flight = _flights[key] = [threading.Lock(), 0]
+        flight[1] += 1
+    return flight
+
+
+def _land(key, flight):
+    with _flights_lock:
+        flight[1] -= 1
+        if not flight[1]:
+            del _flights[key]
+
+
+def get_or_set(key, func, ttl=None, tags=()):
+    """Cached value of key, computing and storing func() once when it is missing"""
+    value = _lookup(key)
+    if value is not _MISSING:
+        metrics.incr('cache.hits')
+        return value
+
+    flight = _flight_lock(key)
+    try:
+        with flight[0]:
+            # Another thread may have filled it while we waited
+            value = _lookup(key)
+            if value is not _MISSING:
+                metrics.incr('cache.flight_waits')
+                return value
+
+            backend = get_backend()
+            leased = backend.acquire(key)
+            if not leased:
+                deadline = time.monotonic() + LEASE_SECONDS
+                while time.monotonic() < deadline:
+                    time.sleep(LEASE_POLL_SECONDS)
+                    value = _lookup(key)
+                    if value is not _MISSING:
+                        metrics.incr('cache.flight_waits')
+                        return value
+            try:
+                metrics.incr('cache.misses')
+                tags = list(tags)
+                versions = backend.versions(tags) if tags else []
+                value = func()
+                _store(key, value, ttl, tags, versions)
+                return value
+            finally:
+                if leased:
+                    backend.release(key)
+    finally:
+        _land(key, flight)
+
+
+def cached(ttl=None, tags=()):
+    """Decorator caching a function's result per arguments
+
+    The wrapper's invalidate(*args, **kwargs) drops one result.
+    """
+    def decorator(func):
+        prefix = f"{func.__module__}.{func.__qualname__}"
+
+        def key_for(args, kwargs):
+            return f"{prefix}:{args!r}:{sorted(kwargs.items())!r}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_set(key_for(args, kwargs), lambda: func(*args, **kwargs), ttl, tags)
+
+        wrapper.invalidate = lambda *args, **kwargs: delete(key_for(args, kwargs))
+        return wrapper
+    return decorator
+
+
+def row_tag(model, ident):
+    return f"{model.__tablename__}:{ident}"
+
+
+def get_instance(model, ident, ttl=None):
+    """db.session.get() through the cache
+
+    The cached copy is merged into the session without a query, so it can be
+    changed and committed like a loaded instance.
+    """
+    tag = row_tag(model, ident)
+    obj = get_or_set(tag, lambda: db.session.get(model, ident), ttl, (tag,))
+    if obj is None:
+        return None
+    return db.session.merge(obj, load=False)
+
+
+def invalidate_on_commit(session, *tags):
+    """Invalidate tags once the session's transaction commits"""
+    session.info.setdefault('cache_tags', set()).update(tags)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tags(session, flush_context):
+    changed = (list(session.new) + list(session.deleted)
+               + [obj for obj in session.dirty if session.is_modified(obj)])
+    tags = []
+    for obj in changed:
+        if isinstance(obj, TAGGED_MODELS):
+            identity = inspect(obj).identity
+            tags.append(obj.__tablename__)
+            if identity:
+                tags.append(row_tag(obj, identity[0]))
+    if tags:
+        invalidate_on_commit(session, *tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_tags(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        invalidate(*sorted(tags))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tags(session):
+    session.info.pop('cache_tags', None)
@@ -0,0 +1,90 @@
+"""
+Coded enumerations for ticket and user columns
+Status, priority, category and role are stored as small integers. The ORM maps
+them to and from their names, so application code and templates keep working
+with 'Open', 'High', 'admin' and so on, while rows and indexes only hold a
+SMALLINT and comparisons are integer compares. Writing a name that is not in
+the list raises instead of silently creating a new value.
+
+Codes are part of the stored data: only ever append new names to a list.
+"""
+
+from sqlalchemy import CheckConstraint, SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+# Ordered so that integer order is meaningful (priority codes sort by severity)
+TICKET_STATUSES = ('Open', 'In Progress', 'Resolved', 'Closed')
+TICKET_PRIORITIES = ('Low', 'Medium', 'High', 'Critical')
+# 'Other' holds legacy values found by the migration; forms never offer it
+TICKET_CATEGORIES = ('Hardware', 'Software', 'Other')
+USER_ROLES = ('user', 'admin', 'super_admin')
+
+
+class CodedEnum(TypeDecorator):
+    """SMALLINT column exposed to Python as one of a fixed list of names"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, names):
+        super().__init__()
+        self.names = tuple(names)
+        self._codes = {name: code for code, name in enumerate(self.names, start=1)}
+
+    def code_for(self, name):
+        try:
+            return self._codes[name]
+        except KeyError:
+            raise ValueError(f"{name!r} is not one of {', '.join(self.names)}") from None
+
+    def name_for(self, code):
+        return self.names[code - 1]
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.code_for(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.name_for(value)
+
+    def check_constraint(self, column_name, table_name):
+        """CHECK constraint limiting the column to the known codes"""
+        codes = ', '.join(str(code) for code in self._codes.values())
+        return CheckConstraint(f"{column_name} IN ({codes})", name=f"ck_{table_name}_{column_name}")
+
+
+Status = CodedEnum(TICKET_STATUSES)
+Priority = CodedEnum(TICKET_PRIORITIES)
+Category = CodedEnum(TICKET_CATEGORIES)
+Role = CodedEnum(USER_ROLES)
+
+# Name of every enum in the enum_codes lookup table, with the value the
+# migration uses for legacy strings that match none of the names
+ENUMS = {
+    'ticket_status': (Status, 'Open'),
+    'ticket_priority': (Priority, 'Medium'),
+    'ticket_category': (Category, 'Other'),
+    'user_role': (Role, 'user'),
+}
+
+
+def ticket_constraints(table_name):
+    """CHECK constraints for a table holding ticket status/priority/category"""
+    return (
+        Status.check_constraint('status', table_name),
+        Priority.check_constraint('priority', table_name),
+        Category.check_constraint('category', table_name),
+    )
+
+
+def lookup_rows():
+    """Rows of the enum_codes lookup table"""
+    return [
+        {'enum_name': enum_name, 'code': code, 'name': name}
+        for enum_name, (coded, fallback) in ENUMS.items()
+        for code, name in enumerate(coded.names, start=1)
+    ]
+
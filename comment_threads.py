@@ -0,0 +1,61 @@
+"""
+Paginated comment threads
+view_ticket shows the newest COMMENTS_PAGE_SIZE comments and fetches older
+pages as JSON. Pages are read newest first by keyset on
+(ticket_id, created_at, id), so a page costs the same however long the
+thread is, and the authors of a page are loaded with one IN query.
+"""
+
+from datetime import datetime
+
+from flask import render_template
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import selectinload
+
+from app import db
+from models import TicketComment, TicketCommentArchive
+
+COMMENTS_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def comment_page(ticket, before=None, limit=COMMENTS_PAGE_SIZE):
+    """Comments of a ticket older than the before=(created_at, id) cursor
+
+    Returns (comments oldest first, cursor of the next older page or None).
+    """
+    model = TicketCommentArchive if ticket.is_archived else TicketComment
+    query = (select(model).where(model.ticket_id == ticket.id)
+             .options(selectinload(model.user))
+             .order_by(model.created_at.desc(), model.id.desc())
+             .limit(limit + 1))
+    if before is not None:
+        created_at, comment_id = before
+        query = query.where(or_(model.created_at < created_at,
+                                and_(model.created_at == created_at, model.id < comment_id)))
+
+    comments = db.session.execute(query).scalars().all()
+    more = len(comments) > limit
+    comments = comments[:limit]
+    cursor = (comments[-1].created_at, comments[-1].id) if more else None
+    comments.reverse()
+    return comments, cursor
+
+
+def parse_cursor(before, before_id):
+    """Cursor from request arguments, or None when they are missing or malformed"""
+    if not before or before_id is None:
+        return None
+    try:
+        return datetime.fromisoformat(before), before_id
+    except ValueError:
+        return None
+
+
+def cursor_args(cursor):
+    return {'before': cursor[0].isoformat(), 'before_id': cursor[1]} if cursor else None
+
+
+def render_comments(comments):
+    """HTML of a page of comments, as view_ticket renders them"""
+    return ''.join(render_template('_comment.html', comment=comment) for comment in comments)
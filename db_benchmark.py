@@ -0,0 +1,235 @@
+"""
+Latency and throughput probe for the configured database
+  flask --app main benchmark-database [--label office-pg] [--output results.json]
+
+Measures, against whatever database the app is configured with:
+- connection setup: opening a new connection and running its first query
+- round trips: SELECT 1 on one open connection
+- commits: one-row INSERT transactions on a scratch table, then one large
+  multi-row INSERT for bulk throughput
+- dashboard queries: the queries behind the dashboards and reports, called
+  through the same helpers routes.py uses, with the cache bypassed
+
+Latencies are reported as p50/p95/p99/max in milliseconds. With --output,
+each run is appended to a JSON list together with the backend, host and
+label, so runs against different backends and hosts can be compared; the
+professional launcher's Database tab keeps its runs in
+instance/db_benchmarks.json and shows them side by side.
+"""
+
+import json
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, insert, text
+from sqlalchemy.pool import NullPool
+
+from app import app, db, database_config, sqlite_production
+from models import Ticket, User
+import archive
+import engine_profiles
+import rollups
+import sketches
+
+DEFAULT_PINGS = 200
+DEFAULT_CONNECTIONS = 20
+DEFAULT_COMMITS = 200
+DEFAULT_BULK_ROWS = 5000
+DEFAULT_QUERY_RUNS = 20
+HISTORY_KEEP = 50
+
+_scratch_metadata = MetaData()
+scratch = Table(
+    'benchmark_scratch', _scratch_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('payload', String(200), nullable=False),
+    Column('created_at', DateTime, nullable=False),
+)
+
+
+def percentiles(seconds):
+    """p50/p95/p99/max of a list of durations, in milliseconds"""
+    ordered = sorted(seconds)
+
+    def at(fraction):
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {'p50': at(0.5), 'p95': at(0.95), 'p99': at(0.99), 'max': round(ordered[-1] * 1000, 3)}
+
+
+def _timed(func, count):
+    durations = []
+    for _ in range(count):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def _latency(section, name, durations):
+    total = sum(durations)
+    return dict(section=section, name=name, count=len(durations), **percentiles(durations),
+                rate=round(len(durations) / total, 1) if total else None)
+
+
+def connection_engine():
+    """Engine that opens a new connection per checkout, set up like the app's"""
+    # Keep the profile's connect_args (timeouts, application name, init_command)
+    # but none of its pool settings, which NullPool does not take
+    options = engine_profiles.engine_options(db.engine.url, database_config)
+    engine = create_engine(db.engine.url, poolclass=NullPool, connect_args=options.get('connect_args', {}))
+    if sqlite_production:
+        engine_profiles.apply_sqlite_pragmas(engine, engine_profiles.sqlite_pragmas(database_config))
+    return engine
+
+
+def measure_connections(count):
+    """New connections without the pool, each with its first query and setup"""
+    engine = connection_engine()
+
+    def connect():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    try:
+        return _latency('Connection', 'Connect + first query', _timed(connect, count))
+    finally:
+        engine.dispose()
+
+
+def measure_pings(count):
+    with db.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        return _latency('Round trip', 'SELECT 1', _timed(lambda: conn.execute(text("SELECT 1")), count))
+
+
+def measure_commits(commits, bulk_rows):
+    """Single-row commit latency and bulk insert throughput on a scratch table"""
+    _scratch_metadata.drop_all(db.engine)
+    _scratch_metadata.create_all(db.engine)
+    payload = 'x' * 120
+    try:
+        def commit_one():
+            with db.engine.begin() as conn:
+                conn.execute(insert(scratch).values(payload=payload, created_at=datetime.utcnow()))
+
+        results = [_latency('Write', 'INSERT + COMMIT', _timed(commit_one, commits))]
+
+        rows = [{'payload': payload, 'created_at': datetime.utcnow()} for _ in range(bulk_rows)]
+        started = time.perf_counter()
+        with db.engine.begin() as conn:
+            conn.execute(insert(scratch), rows)
+        elapsed = time.perf_counter() - started
+        results.append(dict(section='Write', name=f'Bulk INSERT ({bulk_rows} rows)', count=1,
+                            p50=None, p95=None, p99=None, max=round(elapsed * 1000, 3),
+                            rate=round(bulk_rows / elapsed, 1) if elapsed else None))
+        return results
+    finally:
+        _scratch_metadata.drop_all(db.engine)
+
+
+def dashboard_queries():
+    """(name, function) for the query shapes behind the dashboards"""
+    # routes imports this module to register the command, so import it lazily
+    import routes
+
+    admin = User.query.filter(User.role.in_(('admin', 'super_admin'))).first()
+    user = User.query.filter_by(role='user').first() or admin
+    admin_id = admin.id if admin else 0
+    user_id = user.id if user else 0
+    end = datetime.utcnow().date()
+    return [
+        ('System stats (super admin)', routes.system_stats.__wrapped__),
+        ('Recent tickets', lambda: Ticket.query.order_by(Ticket.created_at.desc()).limit(10).all()),
+        ('Admin dashboard', lambda: (Ticket.query.filter_by(assigned_to=admin_id)
+                                     .order_by(Ticket.created_at.desc()).all(),
+                                     routes.assigned_stats.__wrapped__(admin_id))),
+        ('User dashboard', lambda: Ticket.query.filter_by(user_id=user_id)
+                                         .order_by(Ticket.created_at.desc()).all()),
+        ('Title search', lambda: Ticket.query.filter(Ticket.title.contains('printer'))
+                                       .order_by(Ticket.created_at.desc()).all()),
+        ('Report counts', lambda: [archive.count_by(column) for column in ('status', 'category', 'priority')]),
+        ('Resolution percentiles', lambda: sketches.percentiles('all')),
+        ('Trends (90 days)', lambda: rollups.series('day', 'all', end - timedelta(days=90), end)),
+    ]
+
+
+def measure_queries(runs):
+    results = []
+    for name, query in dashboard_queries():
+        def run():
+            query()
+            db.session.rollback()
+
+        run()  # warm up: the first call compiles and caches the statement
+        results.append(_latency('Dashboard', name, _timed(run, runs)))
+    return results
+
+
+def run_benchmark(pings=DEFAULT_PINGS, connections=DEFAULT_CONNECTIONS, commits=DEFAULT_COMMITS,
+                  bulk_rows=DEFAULT_BULK_ROWS, query_runs=DEFAULT_QUERY_RUNS, echo=click.echo):
+    """Every measurement against the configured database, as a list of result dicts"""
+    results = []
+    for title, measure in (('connection setup', lambda: [measure_connections(connections)]),
+                           ('round trips', lambda: [measure_pings(pings)]),
+                           ('commits', lambda: measure_commits(commits, bulk_rows)),
+                           ('dashboard queries', lambda: measure_queries(query_runs))):
+        echo(f"Measuring {title}...")
+        rows = measure()
+        for row in rows:
+            echo(format_result(row))
+        results.extend(rows)
+    return results
+
+
+def format_result(row):
+    latency = (f"p50 {row['p50']:.2f}  p95 {row['p95']:.2f}  p99 {row['p99']:.2f}  max {row['max']:.2f} ms"
+               if row['p50'] is not None else f"{row['max']:.2f} ms")
+    rate = f"  ({row['rate']:.0f}/s)" if row['rate'] else ''
+    return f"  {row['section']}: {row['name']}: {latency}{rate}"
+
+
+def save_run(path, run):
+    """Append a run to the JSON history file, keeping the newest HISTORY_KEEP"""
+    history = []
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            history = []
+    history = (history + [run])[-HISTORY_KEEP:]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+    os.replace(temporary, path)
+
+
+@app.cli.command('benchmark-database')
+@click.option('--pings', default=DEFAULT_PINGS, show_default=True, help='SELECT 1 round trips.')
+@click.option('--connections', default=DEFAULT_CONNECTIONS, show_default=True, help='New connections opened.')
+@click.option('--commits', default=DEFAULT_COMMITS, show_default=True, help='Single-row commits.')
+@click.option('--bulk-rows', default=DEFAULT_BULK_ROWS, show_default=True, help='Rows in the bulk insert.')
+@click.option('--query-runs', default=DEFAULT_QUERY_RUNS, show_default=True, help='Runs of each dashboard query.')
+@click.option('--label', default='', help='Name for this run in the history, e.g. the server it ran on.')
+@click.option('--output', type=click.Path(dir_okay=False), help='JSON file the run is appended to.')
+def benchmark_database_command(pings, connections, commits, bulk_rows, query_runs, label, output):
+    """Measure latency and throughput of the configured database"""
+    backend = db.engine.url.render_as_string()
+    click.echo(f"Benchmarking {backend}")
+    started = datetime.now()
+    results = run_benchmark(pings, connections, commits, bulk_rows, query_runs)
+    if output:
+        save_run(output, {
+            'time': started.isoformat(timespec='seconds'),
+            'host': socket.gethostname(),
+            'backend': backend,
+            'dialect': db.engine.dialect.name,
+            'label': label,
+            'results': results,
+        })
+        click.echo(f"Results saved to {output}")
@@ -0,0 +1,144 @@
+"""
+Read/write splitting for the IT Helpdesk server
+When a read replica is configured (DATABASE_READ_URL, or "read_url" in the
+enterprise config database section), SELECTs issued while serving GET/HEAD
+requests go to the replica; everything else, and every flush, uses the primary.
+
+A user who has just written something (any successful non-GET request) is
+pinned to the primary for STICKY_SECONDS so they always read their own writes.
+If the replica cannot be reached, reads fall back to the primary and the
+replica is retried after REPLICA_RETRY_SECONDS. A read that fails on the
+replica between health checks is retried once on the primary.
+"""
+
+import logging
+import threading
+import time
+
+from flask import g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.sql import Select
+
+import metrics
+
+# Bind key of the replica engine in SQLALCHEMY_BINDS
+REPLICA_BIND = "replica"
+# How long a user reads from the primary after their own write
+STICKY_SECONDS = 5
+# How often a healthy replica is pinged, and how long a failed one is skipped
+HEALTH_CHECK_INTERVAL = 5
+REPLICA_RETRY_SECONDS = 30
+
+READ_METHODS = ('GET', 'HEAD')
+STICKY_SESSION_KEY = '_primary_until'
+
+_state_lock = threading.Lock()
+_replica_down_until = 0.0
+_replica_checked_at = 0.0
+
+
+class RoutingSession(Session):
+    """Session sending request reads to the replica and writes to the primary"""
+
+    _replica_bound = False  # the last statement was sent to the replica
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_app_context() and g.get('db_read_replica')):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None and replica_available(replica):
+                metrics.incr('db_routing.replica_reads')
+                self._replica_bound = True
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def execute(self, statement, *args, **kwargs):
+        self._replica_bound = False
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except DBAPIError as e:
+            if not self._replica_bound or not (isinstance(e, OperationalError) or e.connection_invalidated):
+                raise
+            # The replica failed between health checks: finish the request on the primary
+            mark_replica_down(e.orig)
+            use_primary()
+            self.rollback()
+            metrics.incr('db_routing.replica_retries')
+            return super().execute(statement, *args, **kwargs)
+
+
+def mark_replica_down(error=None):
+    """Route reads to the primary until the replica retry interval passes"""
+    global _replica_down_until
+    now = time.monotonic()
+    with _state_lock:
+        was_down = now < _replica_down_until
+        _replica_down_until = now + REPLICA_RETRY_SECONDS
+    if not was_down:
+        metrics.incr('db_routing.replica_failures')
+        logging.warning(f"Read replica unavailable, using primary: {error}")
+
+
+def replica_available(engine):
+    """Cached health check for the replica engine"""
+    global _replica_checked_at
+    now = time.monotonic()
+    with _state_lock:
+        if now < _replica_down_until:
+            return False
+        if now - _replica_checked_at < HEALTH_CHECK_INTERVAL:
+            return True
+        _replica_checked_at = now
+
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+    except Exception as e:
+        mark_replica_down(e)
+        return False
+    return True
+
+
+def replica_status():
+    """Replica state for the metrics layer"""
+    with _state_lock:
+        down_for = _replica_down_until - time.monotonic()
+    return {
+        'available': down_for <= 0,
+        'retry_in_seconds': round(max(down_for, 0), 1),
+    }
+
+
+def use_primary():
+    """Send the remaining reads of the current request to the primary"""
+    g.db_read_replica = False
+
+
+def init_app(app, db):
+    """Install request hooks deciding which engine serves each request"""
+    if REPLICA_BIND not in app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+
+    with app.app_context():
+        replica = db.engines[REPLICA_BIND]
+
+    @event.listens_for(replica, "handle_error")
+    def replica_error(context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            mark_replica_down(context.original_exception)
+
+    @app.before_request
+    def choose_read_engine():
+        g.db_read_replica = (request.method in READ_METHODS
+                             and session.get(STICKY_SESSION_KEY, 0) < time.time())
+
+    @app.after_request
+    def pin_writer_to_primary(response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            session[STICKY_SESSION_KEY] = time.time() + STICKY_SECONDS
+        return response
+
+    metrics.register_collector('db_replica', replica_status)
+    logging.info("Read replica routing enabled")
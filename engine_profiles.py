@@ -0,0 +1,241 @@
+"""
+Database engine profiles for the IT Helpdesk server
+Builds the SQLAlchemy URI from the enterprise configuration written by the
+professional GUI launcher and applies pool settings tuned per backend
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+import metrics
+
+# Same file the professional launcher saves; HELPDESK_CONFIG overrides the path
+DEFAULT_CONFIG_FILE = "helpdesk_enterprise_config.json"
+DEFAULT_SQLITE_PATH = "it_helpdesk.db"
+DEFAULT_APPLICATION_NAME = "it-helpdesk"
+
+# Pool tuning per backend (timeouts in seconds, statement_timeout in ms)
+ENGINE_PROFILES = {
+    "postgresql": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "statement_timeout": 30000,
+    },
+    "mysql": {
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        # Stay below the server's default wait_timeout
+        "pool_recycle": 280,
+        "statement_timeout": 30000,
+    },
+}
+
+# PRAGMAs applied to every connection of a file-backed SQLite database in
+# production mode; the database section may override them via "sqlite_pragmas"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    # Negative cache_size is in KiB (~20 MB page cache per connection)
+    "cache_size": -20000,
+    "mmap_size": 268435456,
+}
+
+# Keys a backend section of the config file may use to override its profile
+POOL_OVERRIDE_KEYS = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle", "statement_timeout")
+
+DRIVER_NAMES = {
+    "postgresql": "postgresql",
+    "mysql": "mysql+pymysql",
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._wait_lock:
+                self.wait_count += 1
+                self.wait_total += elapsed
+                if elapsed > self.wait_max:
+                    self.wait_max = elapsed
+
+
+def config_file_path():
+    """Location of the enterprise configuration file"""
+    return os.environ.get("HELPDESK_CONFIG", DEFAULT_CONFIG_FILE)
+
+
+def load_database_config(path=None):
+    """Return the 'database' section of the enterprise config, or None"""
+    path = path or config_file_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read database configuration from {path}: {e}")
+        return None
+    database = config.get("database")
+    return database if isinstance(database, dict) else None
+
+
+def build_database_uri(db_config):
+    """Build a SQLAlchemy URI from a launcher database section"""
+    db_type = db_config.get("type", "sqlite")
+
+    if db_type == "sqlite":
+        return f"sqlite:///{db_config.get('sqlite_path') or DEFAULT_SQLITE_PATH}"
+
+    if db_type not in DRIVER_NAMES:
+        raise ValueError(f"Unsupported database type: {db_type}")
+
+    section = db_config.get(db_type) or {}
+    port = str(section.get("port") or "").strip()
+    url = URL.create(
+        DRIVER_NAMES[db_type],
+        username=section.get("username") or None,
+        password=section.get("password") or None,
+        host=section.get("host") or "localhost",
+        port=int(port) if port else None,
+        database=section.get("database") or None,
+    )
+    return url.render_as_string(hide_password=False)
+
+
+def is_sqlite_file(uri):
+    """True when the URI points at an on-disk SQLite database"""
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def sqlite_mode(db_config=None):
+    """SQLite operating mode: 'production' (WAL + group commit) or 'compat'"""
+    mode = os.environ.get("HELPDESK_SQLITE_MODE") or (db_config or {}).get("sqlite_mode")
+    return mode or "production"
+
+
+def sqlite_pragmas(db_config=None):
+    """PRAGMAs for production mode, with overrides from the config"""
+    pragmas = dict(SQLITE_PRAGMAS)
+    pragmas.update((db_config or {}).get("sqlite_pragmas") or {})
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run the given PRAGMAs on every new connection of an engine"""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def engine_options(uri, db_config=None):
+    """SQLAlchemy engine options for the backend behind the given URI"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # One shared connection, otherwise every checkout sees an empty database
+            return {
+                "poolclass": StaticPool,
+                "connect_args": {"check_same_thread": False},
+            }
+        # File connections are cheap to open, pooling only holds file locks.
+        # Every request reads on its own connection; under WAL readers never
+        # wait for the writer
+        return {"poolclass": NullPool}
+
+    if backend not in ENGINE_PROFILES:
+        return {
+            "pool_recycle": 300,
+            "pool_pre_ping": True,
+        }
+
+    profile = dict(ENGINE_PROFILES[backend])
+    section = (db_config or {}).get(backend) or {}
+    for key in POOL_OVERRIDE_KEYS:
+        if str(section.get(key, "")).strip():
+            profile[key] = int(section[key])
+
+    application_name = section.get("application_name") or DEFAULT_APPLICATION_NAME
+    statement_timeout = profile.pop("statement_timeout")
+
+    if backend == "postgresql":
+        connect_args = {
+            "application_name": application_name,
+            "options": f"-c statement_timeout={statement_timeout}",
+        }
+    else:
+        # max_execution_time only bounds SELECTs, which is what runs away on MySQL
+        connect_args = {
+            "program_name": application_name,
+            "init_command": f"SET SESSION max_execution_time={statement_timeout}",
+        }
+
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_pre_ping": True,
+        "connect_args": connect_args,
+    }
+    options.update(profile)
+    return options
+
+
+def pool_stats(engine):
+    """Current pool statistics for an engine"""
+    pool = engine.pool
+    stats = {
+        'backend': engine.url.get_backend_name(),
+        'pool_class': type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            # overflow() counts up from -pool_size until the pool is full
+            'overflow': max(pool.overflow(), 0),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._wait_lock:
+            count, total, worst = pool.wait_count, pool.wait_total, pool.wait_max
+        stats.update({
+            'checkouts': count,
+            'wait_avg_ms': round(total / count * 1000, 3) if count else 0.0,
+            'wait_max_ms': round(worst * 1000, 3),
+        })
+    return stats
+
+
+def instrument_engine(engine, name='db_pool'):
+    """Expose an engine's pool statistics to the metrics registry"""
+    metrics.register_collector(name, lambda: pool_stats(engine))
@@ -3,6 +3,7 @@ from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, SubmitField, EmailField, BooleanField
 from wtforms.validators import DataRequired, Email, Length, EqualTo
 from models import User
+import admin_roster
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=80)])
@@ -83,4 +84,4 @@ class AssignTicketForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(AssignTicketForm, self).__init__(*args, **kwargs)
-        self.assigned_to.choices = [(user.id, user.full_name) for user in User.query.filter_by(is_admin=True).all()]
+        self.assigned_to.choices = admin_roster.choices()
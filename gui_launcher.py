@@ -11,7 +11,6 @@ from tkinter import ttk, messagebox, scrolledtext
 import threading
 import subprocess
 import psutil
-import requests
 import os
 import sys
 import json
@@ -20,6 +19,9 @@ from pathlib import Path
 import webbrowser
 from datetime import datetime
 
+from health_poller import HealthPoller
+from log_console import DEFAULT_MAX_LINES, LogConsole
+
 class HelpDeskLauncher:
     def __init__(self):
         self.root = tk.Tk()
@@ -70,7 +72,8 @@ class HelpDeskLauncher:
             },
             "server": {
                 "host": "0.0.0.0",
-                "port": "5000"
+                "port": "5000",
+                "console_lines": DEFAULT_MAX_LINES
             }
         }
         
@@ -79,6 +82,12 @@ class HelpDeskLauncher:
         self.create_widgets()
         self.update_status()
         
+        # Health checks run off the Tk thread; results come back through root.after
+        self.last_health = None
+        self.health = HealthPoller(lambda: f"http://localhost:{self.config['server']['port']}",
+                                   lambda status: self.root.after(0, self.apply_health, status))
+        self.health.start()
+        
     def setup_styles(self):
         """Setup professional ttk styles"""
         self.style = ttk.Style()
@@ -476,10 +485,16 @@ class HelpDeskLauncher:
                                                   relief='flat')
         self.logs_text.pack(fill=tk.BOTH, expand=True)
         
+        # Lines are shown in batches and capped at server.console_lines
+        self.log_console = LogConsole(self.root, self.logs_text,
+                                      self.config["server"].get("console_lines", DEFAULT_MAX_LINES))
+        
         # Log controls
         log_controls = ttk.Frame(container)
         log_controls.pack(fill=tk.X)
         
+        self.log_console.create_controls(log_controls)
+        
         clear_btn = ttk.Button(log_controls, text="🗑️ Clear Logs", 
                               command=self.clear_logs,
                               style='Warning.TButton')
@@ -501,6 +516,12 @@ class HelpDeskLauncher:
                               font=('Segoe UI', 9))
         time_label.pack(side=tk.RIGHT, padx=(0, 10))
         
+        # Server health from /healthz and /readyz
+        self.health_var = tk.StringVar(value="Health: -")
+        health_label = ttk.Label(self.status_bar, textvariable=self.health_var,
+                                 font=('Segoe UI', 9))
+        health_label.pack(side=tk.RIGHT, padx=(0, 20))
+        
         # Status message
         self.status_var = tk.StringVar(value="Ready")
         status_label = ttk.Label(self.status_bar, textvariable=self.status_var, 
@@ -638,11 +659,12 @@ class HelpDeskLauncher:
             self.root.after(2000, lambda: self.server_status_label.config(fg=self.colors['success']))
             self.root.after(2000, lambda: self.status_var.set("Server running successfully"))
             self.root.after(2000, lambda: self.log_message("✅ Server started successfully"))
+            self.root.after(2000, self.health.poll_now)
             
             # Read server output
             for line in iter(self.server_process.stdout.readline, ''):
-                if line:
-                    self.root.after(0, lambda msg=line.strip(): self.log_message(msg))
+                if line.strip():
+                    self.log_message(line.strip())
             
         except Exception as e:
             self.root.after(0, lambda: self.log_message(f"❌ Server error: {str(e)}"))
@@ -723,14 +745,26 @@ class HelpDeskLauncher:
                 stats.append(f"   Port: {self.config['server']['port']}")
                 stats.append(f"   URL: http://localhost:{self.config['server']['port']}")
                 
-                # Try to get server response
-                try:
-                    url = f"http://localhost:{self.config['server']['port']}"
-                    response = requests.get(url, timeout=5)
-                    stats.append(f"   Response Code: {response.status_code}")
-                    stats.append(f"   Response Time: {response.elapsed.total_seconds():.2f}s")
-                except:
-                    stats.append(f"   Response: ❌ Unable to connect")
+                # Latest result of the background health poller
+                health = self.health.latest
+                if health is None:
+                    stats.append(f"   Health: waiting for first check")
+                elif not health.alive:
+                    stats.append(f"   Health: ❌ Unable to connect ({health.error})")
+                else:
+                    stats.append(f"   Health: {'✅ Ready' if health.ready else '⚠️ Not ready'}")
+                    stats.append(f"   Response Time: {health.response_ms:.0f} ms")
+                    readiness = health.readiness or {}
+                    if 'db_ping_ms' in readiness:
+                        stats.append(f"   Database Ping: {readiness['db_ping_ms']:.0f} ms")
+                        stats.append(f"   Schema Version: {readiness['schema_version']} "
+                                     f"(latest {readiness['latest_schema_version']})")
+                    pool = readiness.get('pool', {})
+                    if 'checked_out' in pool:
+                        stats.append(f"   DB Connections: {pool['checked_out']} in use / {pool['pool_size']} pooled")
+                    if health.error:
+                        stats.append(f"   Problem: {health.error}")
+                    stats.append(f"   Checked: {health.checked_at.strftime('%H:%M:%S')}")
             else:
                 stats.append(f"   Status: ⏹️ STOPPED")
             stats.append("")
@@ -795,22 +829,33 @@ class HelpDeskLauncher:
         # Schedule next refresh
         self.root.after(30000, self.schedule_refresh)  # 30 seconds
     
+    def apply_health(self, status):
+        """Show a health poller result; runs on the Tk thread"""
+        previous, self.last_health = self.last_health, status
+        if not status.alive:
+            self.health_var.set("Health: no response")
+        elif status.ready:
+            self.health_var.set(f"Health: ready ({status.response_ms:.0f} ms)")
+        else:
+            self.health_var.set(f"Health: not ready ({status.error})")
+        
+        # Log changes only, and only while the server is supposed to be up
+        if self.is_server_running and previous is not None and (previous.alive, previous.ready) != (status.alive, status.ready):
+            if status.ready:
+                self.log_message("✅ Server is ready")
+            elif status.alive:
+                self.log_message(f"⚠️ Server is up but not ready: {status.error}")
+            else:
+                self.log_message(f"❌ Server stopped responding: {status.error}")
+    
     def log_message(self, message):
-        """Add message to logs with timestamp and emoji"""
+        """Add message to logs with timestamp and emoji; safe to call from any thread"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
-        
-        self.logs_text.insert(tk.END, log_entry)
-        self.logs_text.see(tk.END)
-        
-        # Limit log size
-        lines = self.logs_text.get("1.0", tk.END).count('\n')
-        if lines > 1000:
-            self.logs_text.delete("1.0", "100.0")
+        self.log_console.write(f"[{timestamp}] {message}")
     
     def clear_logs(self):
         """Clear the logs display"""
-        self.logs_text.delete(1.0, tk.END)
+        self.log_console.clear()
         self.log_message("🗑️ Logs cleared")
     
     def refresh_logs(self):
@@ -843,6 +888,7 @@ class HelpDeskLauncher:
     
     def on_closing(self):
         """Handle application closing"""
+        self.health.stop()
         if self.is_server_running:
             if messagebox.askokcancel("Quit Application", 
                                      "Server is currently running.\n\nDo you want to stop the server and quit?"):
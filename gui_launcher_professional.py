@@ -22,6 +22,20 @@ import sqlite3
 from PIL import Image, ImageTk
 import configparser
 
+from health_poller import HealthPoller
+from log_console import DEFAULT_MAX_LINES, LogConsole
+import log_files
+import log_tail
+import load_test
+import backups
+import engine_profiles
+import process_monitor
+import resource_history
+from sparkline import Sparkline
+
+BENCHMARK_RUNS_SHOWN = 6  # benchmark runs compared side by side
+
+
 class ProfessionalHelpDeskLauncher:
     def __init__(self):
         self.root = tk.Tk()
@@ -38,8 +52,9 @@ class ProfessionalHelpDeskLauncher:
         self.server_process = None
         self.server_thread = None
         self.is_server_running = False
-        self.monitoring_thread = None
-        self.stop_monitoring = False
+        self.resource_sampler = None
+        self.benchmark_window = None
+        self.load_generator = None
         
         # Enterprise color scheme
         self.colors = {
@@ -90,14 +105,20 @@ class ProfessionalHelpDeskLauncher:
                 "host": "0.0.0.0",
                 "port": "5000",
                 "debug": False,
-                "auto_start": False
+                "auto_start": False,
+                "console_lines": DEFAULT_MAX_LINES
             },
             "enterprise": {
                 "company_name": "IT Helpdesk Professional",
                 "admin_email": "admin@company.com",
                 "log_level": "INFO",
                 "backup_enabled": True,
-                "backup_interval": "daily"
+                "backup_interval": "daily",
+                "backup_dir": "./backups",
+                "backup_keep": backups.DEFAULT_KEEP,
+                "backup_max_age_days": backups.DEFAULT_MAX_AGE_DAYS,
+                "metrics_history": True,
+                "metrics_history_hours": 24
             },
             "security": {
                 "session_timeout": "30",
@@ -111,6 +132,11 @@ class ProfessionalHelpDeskLauncher:
         self.create_professional_interface()
         self.start_system_monitoring()
         
+        # Health checks run off the Tk thread; results come back through root.after
+        self.last_health = None
+        self.health = HealthPoller(self.health_url, lambda status: self.root.after(0, self.apply_health, status))
+        self.health.start()
+        
     def setup_icon(self):
         """Setup application icon"""
         try:
@@ -242,6 +268,7 @@ class ProfessionalHelpDeskLauncher:
         self.create_database_management_tab()
         self.create_server_control_tab()
         self.create_system_monitoring_tab()
+        self.create_load_test_tab()
         self.create_backup_management_tab()
         self.create_security_settings_tab()
         self.create_advanced_logs_tab()
@@ -492,13 +519,27 @@ Configuration File: {self.config_file}
                   command=self.test_database_connection,
                   style='Primary.TButton').pack(side=tk.LEFT, padx=(0, 10))
         
+        self.benchmark_button = ttk.Button(actions_frame, text="⏱ Benchmark",
+                                           command=self.benchmark_database,
+                                           style='Info.TButton')
+        self.benchmark_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(actions_frame, text="📊 Results",
+                   command=self.show_benchmark_results,
+                   style='Secondary.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        
         ttk.Button(actions_frame, text="💾 Save Configuration", 
                   command=self.save_database_config,
                   style='Success.TButton').pack(side=tk.LEFT, padx=(0, 10))
         
         ttk.Button(actions_frame, text="🔄 Initialize Database", 
                   command=self.initialize_database,
-                  style='Warning.TButton').pack(side=tk.LEFT)
+                  style='Warning.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.migrate_button = ttk.Button(actions_frame, text="📦 Migrate Data",
+                                         command=self.migrate_database,
+                                         style='Primary.TButton')
+        self.migrate_button.pack(side=tk.LEFT)
         
         # Connection status
         self.db_status_frame = ttk.LabelFrame(container, text=" Connection Status ",
@@ -668,12 +709,22 @@ Configuration File: {self.config_file}
                                      style='Professional.TLabelframe', padding=25)
         output_frame.pack(fill=tk.BOTH, expand=True)
         
+        output_controls = ttk.Frame(output_frame)
+        output_controls.pack(fill=tk.X, pady=(0, 10))
+        
         self.server_output = scrolledtext.ScrolledText(output_frame, height=12,
                                                       font=('Consolas', 9),
                                                       bg=self.colors['gray_900'],
                                                       fg=self.colors['gray_100'],
                                                       wrap=tk.WORD)
         self.server_output.pack(fill=tk.BOTH, expand=True)
+        
+        # Output is shown in batches and capped at server.console_lines
+        self.server_console = LogConsole(self.root, self.server_output,
+                                         self.config["server"].get("console_lines", DEFAULT_MAX_LINES))
+        self.server_console.create_controls(output_controls)
+        ttk.Button(output_controls, text="🗑️ Clear", command=self.server_console.clear,
+                  style='Secondary.TButton').pack(side=tk.LEFT)
     
     def create_system_monitoring_tab(self):
         """Create system monitoring interface"""
@@ -696,14 +747,15 @@ Configuration File: {self.config_file}
                                       style='Professional.TLabelframe', padding=25)
         process_frame.pack(fill=tk.BOTH, expand=True)
         
-        # Process list
-        self.process_tree = ttk.Treeview(process_frame, columns=('PID', 'CPU', 'Memory', 'Status'),
+        # Process list: the server and its workers by default, sampled off the Tk thread
+        self.process_tree = ttk.Treeview(process_frame, columns=('PID', 'CPU', 'RSS', 'Threads', 'Status'),
                                         show='tree headings', height=15)
         
         self.process_tree.heading('#0', text='Process Name')
         self.process_tree.heading('PID', text='PID')
         self.process_tree.heading('CPU', text='CPU %')
-        self.process_tree.heading('Memory', text='Memory %')
+        self.process_tree.heading('RSS', text='Memory (RSS)')
+        self.process_tree.heading('Threads', text='Threads')
         self.process_tree.heading('Status', text='Status')
         
         self.process_tree.pack(fill=tk.BOTH, expand=True)
@@ -714,6 +766,28 @@ Configuration File: {self.config_file}
         
         ttk.Button(process_controls, text="🔄 Refresh", 
                   command=self.refresh_process_list, style='Primary.TButton').pack(side=tk.LEFT)
+        
+        self.process_scope_var = tk.StringVar(value=process_monitor.SERVER)
+        ttk.Radiobutton(process_controls, text="Helpdesk server", value=process_monitor.SERVER,
+                       variable=self.process_scope_var,
+                       command=self.apply_process_filter).pack(side=tk.LEFT, padx=(15, 5))
+        ttk.Radiobutton(process_controls, text="All processes", value=process_monitor.ALL,
+                       variable=self.process_scope_var,
+                       command=self.apply_process_filter).pack(side=tk.LEFT, padx=(0, 15))
+        
+        ttk.Label(process_controls, text="Name:").pack(side=tk.LEFT)
+        self.process_name_var = tk.StringVar()
+        name_entry = ttk.Entry(process_controls, textvariable=self.process_name_var, width=20)
+        name_entry.pack(side=tk.LEFT, padx=(5, 15))
+        name_entry.bind('<Return>', lambda event: self.apply_process_filter())
+        
+        self.process_summary_var = tk.StringVar(value="Sampling...")
+        ttk.Label(process_controls, textvariable=self.process_summary_var).pack(side=tk.LEFT)
+        
+        self.process_rows = {}
+        self.process_sampler = process_monitor.ProcessSampler(
+            self.server_pids, lambda rows: self.root.after(0, self.apply_process_rows, rows))
+        self.process_sampler.start()
     
     def create_monitoring_displays(self, parent):
         """Create real-time monitoring displays"""
@@ -764,6 +838,161 @@ Configuration File: {self.config_file}
         # Configure grid weights
         for i in range(4):
             metrics_grid.columnconfigure(i, weight=1)
+        
+        # Resource history, one sparkline per series
+        history_grid = ttk.Frame(parent)
+        history_grid.pack(fill=tk.X, pady=(15, 0))
+        
+        colors = {'cpu': 'primary', 'memory': 'info', 'disk': 'warning', 'disk_read': 'warning',
+                  'disk_write': 'accent', 'net_recv': 'success', 'net_sent': 'success',
+                  'server_cpu': 'primary_dark', 'server_rss': 'secondary'}
+        self.sparklines = {}
+        for index, (name, label, unit) in enumerate(resource_history.SERIES):
+            cell = tk.Frame(history_grid, bg=self.colors['white'], relief=tk.SOLID, bd=1)
+            cell.grid(row=index // 3, column=index % 3, padx=10, pady=5, sticky="ew")
+            
+            tk.Label(cell, text=label, font=('Segoe UI', 9, 'bold'),
+                    bg=self.colors['white']).pack(anchor=tk.W, padx=5)
+            chart = Sparkline(cell, width=300, color=self.colors[colors[name]], background=self.colors['white'],
+                              maximum=100 if name in ('cpu', 'memory', 'disk') else None,
+                              minimum_scale={'%': 10, 'MB/s': 1, 'MB': 100}[unit],
+                              on_hover=lambda point, name=name: self.show_resource_point(name, point))
+            chart.canvas.pack(side=tk.LEFT, padx=5, pady=(0, 5))
+            value_label = tk.Label(cell, text="-", font=('Segoe UI', 10), width=12,
+                                  bg=self.colors['white'], fg=self.colors['gray_700'])
+            value_label.pack(side=tk.LEFT, padx=5)
+            self.sparklines[name] = (chart, value_label)
+        
+        for i in range(3):
+            history_grid.columnconfigure(i, weight=1)
+        
+        history_controls = ttk.Frame(parent)
+        history_controls.pack(fill=tk.X, pady=(10, 0))
+        
+        ttk.Button(history_controls, text="📤 Export History", command=self.export_resource_history,
+                  style='Secondary.TButton').pack(side=tk.LEFT)
+        self.resource_hover_var = tk.StringVar(value="Hover over a chart to read a sample")
+        ttk.Label(history_controls, textvariable=self.resource_hover_var).pack(side=tk.LEFT, padx=(15, 0))
+    
+    def create_load_test_tab(self):
+        """Create the load test interface"""
+        load_frame = ttk.Frame(self.notebook)
+        self.notebook.add(load_frame, text="🚦 Load Test")
+        
+        container = ttk.Frame(load_frame)
+        container.pack(fill=tk.BOTH, expand=True, padx=30, pady=30)
+        
+        # Target, ramp and action mix
+        settings_frame = ttk.LabelFrame(container, text=" Load Test Settings ",
+                                       style='Professional.TLabelframe', padding=25)
+        settings_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        settings_grid = ttk.Frame(settings_frame)
+        settings_grid.pack(fill=tk.X)
+        
+        tk.Label(settings_grid, text="Target URL:", font=('Segoe UI', 10, 'bold'),
+                bg=self.colors['white']).grid(row=0, column=0, sticky=tk.W, pady=5)
+        host = self.config["server"]["host"]
+        self.load_url_var = tk.StringVar(
+            value=f"http://{'127.0.0.1' if host in ('0.0.0.0', '') else host}:{self.config['server']['port']}")
+        ttk.Entry(settings_grid, textvariable=self.load_url_var, width=40).grid(
+            row=0, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        
+        tk.Label(settings_grid, text="Ramp:", font=('Segoe UI', 10, 'bold'),
+                bg=self.colors['white']).grid(row=1, column=0, sticky=tk.W, pady=5)
+        ramp_frame = ttk.Frame(settings_grid)
+        ramp_frame.grid(row=1, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        self.load_ramp_vars = {}
+        for key, before, default, limit in (('start_users', "Start with", load_test.DEFAULT_START_USERS, 1000),
+                                            ('step_users', "users, add", load_test.DEFAULT_STEP_USERS, 1000),
+                                            ('step_seconds', "every", load_test.DEFAULT_STEP_SECONDS, 3600),
+                                            ('max_users', "s up to", load_test.DEFAULT_MAX_USERS, 1000)):
+            ttk.Label(ramp_frame, text=before).pack(side=tk.LEFT)
+            var = tk.StringVar(value=str(default))
+            ttk.Spinbox(ramp_frame, from_=1, to=limit, textvariable=var, width=5).pack(side=tk.LEFT, padx=5)
+            self.load_ramp_vars[key] = var
+        ttk.Label(ramp_frame, text="users; think time").pack(side=tk.LEFT)
+        self.load_think_var = tk.StringVar(value=str(load_test.DEFAULT_THINK_TIME))
+        ttk.Spinbox(ramp_frame, from_=0, to=60, increment=0.5, textvariable=self.load_think_var,
+                   width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(ramp_frame, text="s").pack(side=tk.LEFT)
+        
+        tk.Label(settings_grid, text="Action Mix:", font=('Segoe UI', 10, 'bold'),
+                bg=self.colors['white']).grid(row=2, column=0, sticky=tk.W, pady=5)
+        mix_frame = ttk.Frame(settings_grid)
+        mix_frame.grid(row=2, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        self.load_mix_vars = {}
+        for name, label, weight in load_test.ACTIONS:
+            ttk.Label(mix_frame, text=label).pack(side=tk.LEFT)
+            var = tk.StringVar(value=str(weight))
+            ttk.Spinbox(mix_frame, from_=0, to=20, textvariable=var, width=4).pack(side=tk.LEFT, padx=(5, 15))
+            self.load_mix_vars[name] = var
+        
+        tk.Label(settings_grid, text="Test Accounts:", font=('Segoe UI', 10, 'bold'),
+                bg=self.colors['white']).grid(row=3, column=0, sticky=tk.W, pady=5)
+        accounts_frame = ttk.Frame(settings_grid)
+        accounts_frame.grid(row=3, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        self.seed_button = ttk.Button(accounts_frame, text="👥 Seed Accounts", command=self.seed_load_accounts,
+                                      style='Secondary.TButton')
+        self.seed_button.pack(side=tk.LEFT)
+        self.load_accounts_var = tk.StringVar()
+        ttk.Label(accounts_frame, textvariable=self.load_accounts_var).pack(side=tk.LEFT, padx=(10, 0))
+        self.show_load_accounts()
+        
+        # Controls
+        controls = ttk.Frame(container)
+        controls.pack(fill=tk.X, pady=(0, 20))
+        self.load_start_button = ttk.Button(controls, text="▶ Start Load Test", command=self.start_load_test,
+                                            style='Success.TButton')
+        self.load_start_button.pack(side=tk.LEFT, padx=(0, 10))
+        self.load_stop_button = ttk.Button(controls, text="⏹ Stop", command=self.stop_load_test,
+                                           style='Danger.TButton', state='disabled')
+        self.load_stop_button.pack(side=tk.LEFT, padx=(0, 10))
+        self.load_status_var = tk.StringVar(value="Idle")
+        ttk.Label(controls, textvariable=self.load_status_var).pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Live charts, one point per second
+        charts_frame = ttk.LabelFrame(container, text=" Live Results ",
+                                     style='Professional.TLabelframe', padding=25)
+        charts_frame.pack(fill=tk.X, pady=(0, 20))
+        charts_grid = ttk.Frame(charts_frame)
+        charts_grid.pack(fill=tk.X)
+        self.load_charts = {}
+        for index, (name, label, color, maximum, minimum_scale) in enumerate((
+                ('users', "Virtual users", 'secondary', None, 10),
+                ('rps', "Requests/s", 'primary', None, 10),
+                ('error_rate', "Error rate (%)", 'danger', 100, 10),
+                ('p50', "p50 latency (ms)", 'success', None, 100),
+                ('p95', "p95 latency (ms)", 'warning', None, 100),
+                ('p99', "p99 latency (ms)", 'accent', None, 100))):
+            cell = tk.Frame(charts_grid, bg=self.colors['white'], relief=tk.SOLID, bd=1)
+            cell.grid(row=index // 3, column=index % 3, padx=10, pady=5, sticky="ew")
+            tk.Label(cell, text=label, font=('Segoe UI', 9, 'bold'),
+                    bg=self.colors['white']).pack(anchor=tk.W, padx=5)
+            chart = Sparkline(cell, width=300, color=self.colors[color], background=self.colors['white'],
+                              maximum=maximum, minimum_scale=minimum_scale)
+            chart.canvas.pack(side=tk.LEFT, padx=5, pady=(0, 5))
+            value_label = tk.Label(cell, text="-", font=('Segoe UI', 10), width=10,
+                                  bg=self.colors['white'], fg=self.colors['gray_700'])
+            value_label.pack(side=tk.LEFT, padx=5)
+            self.load_charts[name] = (chart, value_label)
+        for i in range(3):
+            charts_grid.columnconfigure(i, weight=1)
+        
+        # Totals per action since the start
+        summary_frame = ttk.LabelFrame(container, text=" Results by Action ",
+                                      style='Professional.TLabelframe', padding=25)
+        summary_frame.pack(fill=tk.BOTH, expand=True)
+        self.load_tree = ttk.Treeview(summary_frame, columns=('Requests', 'Errors', 'p50', 'p95', 'p99'),
+                                     show='tree headings', height=6)
+        self.load_tree.heading('#0', text='Action')
+        for column, text in (('Requests', 'Requests'), ('Errors', 'Errors'), ('p50', 'p50 (ms)'),
+                             ('p95', 'p95 (ms)'), ('p99', 'p99 (ms)')):
+            self.load_tree.heading(column, text=text)
+            self.load_tree.column(column, width=100, anchor=tk.E)
+        for name, label, _ in load_test.ACTIONS:
+            self.load_tree.insert('', tk.END, iid=name, text=label, values=('0', '0', '-', '-', '-'))
+        self.load_tree.pack(fill=tk.BOTH, expand=True)
     
     def create_backup_management_tab(self):
         """Create backup management interface"""
@@ -785,7 +1014,7 @@ Configuration File: {self.config_file}
         tk.Label(settings_grid, text="Backup Directory:", font=('Segoe UI', 10, 'bold'),
                 bg=self.colors['white']).grid(row=0, column=0, sticky=tk.W, pady=5)
         
-        self.backup_dir_var = tk.StringVar(value="./backups")
+        self.backup_dir_var = tk.StringVar(value=self.config["enterprise"]["backup_dir"])
         dir_frame = ttk.Frame(settings_grid)
         dir_frame.grid(row=0, column=1, sticky="ew", padx=(10, 0), pady=5)
         
@@ -810,6 +1039,26 @@ Configuration File: {self.config_file}
                     values=intervals, state="readonly", width=15).grid(
             row=2, column=1, sticky=tk.W, padx=(10, 0), pady=5)
         
+        # Retention
+        tk.Label(settings_grid, text="Retention:", font=('Segoe UI', 10, 'bold'),
+                bg=self.colors['white']).grid(row=3, column=0, sticky=tk.W, pady=5)
+        
+        retention_frame = ttk.Frame(settings_grid)
+        retention_frame.grid(row=3, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        
+        self.backup_keep_var = tk.StringVar(value=str(self.config["enterprise"]["backup_keep"]))
+        ttk.Label(retention_frame, text="Keep at least").pack(side=tk.LEFT)
+        ttk.Spinbox(retention_frame, from_=1, to=365, textvariable=self.backup_keep_var,
+                   width=5).pack(side=tk.LEFT, padx=5)
+        self.backup_max_age_var = tk.StringVar(value=str(self.config["enterprise"]["backup_max_age_days"]))
+        ttk.Label(retention_frame, text="backups; remove older than").pack(side=tk.LEFT)
+        ttk.Spinbox(retention_frame, from_=1, to=3650, textvariable=self.backup_max_age_var,
+                   width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(retention_frame, text="days").pack(side=tk.LEFT)
+        
+        ttk.Button(settings_grid, text="💾 Save Settings", command=self.save_backup_settings,
+                  style='Secondary.TButton').grid(row=4, column=1, sticky=tk.W, padx=(10, 0), pady=(10, 0))
+        
         # Backup actions
         actions_frame = ttk.LabelFrame(container, text=" Backup Actions ",
                                       style='Professional.TLabelframe', padding=25)
@@ -824,9 +1073,18 @@ Configuration File: {self.config_file}
         ttk.Button(buttons_frame, text="📤 Restore Backup", 
                   command=self.restore_backup, style='Warning.TButton').pack(side=tk.LEFT, padx=(0, 10))
         
+        ttk.Button(buttons_frame, text="✅ Verify Backup", 
+                  command=self.verify_backup, style='Secondary.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        
         ttk.Button(buttons_frame, text="🗑️ Clean Old Backups", 
                   command=self.clean_backups, style='Danger.TButton').pack(side=tk.LEFT)
         
+        # Progress of the running backup job
+        self.backup_progress = ttk.Progressbar(actions_frame, mode='determinate', maximum=100)
+        self.backup_progress.pack(fill=tk.X, pady=(15, 5))
+        self.backup_status_var = tk.StringVar(value="Idle")
+        ttk.Label(actions_frame, textvariable=self.backup_status_var).pack(anchor=tk.W)
+        
         # Backup history
         history_frame = ttk.LabelFrame(container, text=" Backup History ",
                                       style='Professional.TLabelframe', padding=25)
@@ -841,6 +1099,14 @@ Configuration File: {self.config_file}
         self.backup_tree.heading('Status', text='Status')
         
         self.backup_tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Backups run on a worker thread; progress comes back through root.after
+        self.backup_worker = backups.BackupWorker(
+            on_progress=lambda fraction, message: self.root.after(0, self.show_backup_progress, fraction, message),
+            on_done=lambda title, result, error: self.root.after(0, self.backup_done, title, result, error))
+        self.refresh_backup_list()
+        self.auto_backup_retry_at = 0
+        self.root.after(60000, self.check_auto_backup)
     
     def create_security_settings_tab(self):
         """Create security settings interface"""
@@ -924,28 +1190,54 @@ Configuration File: {self.config_file}
                                        style='Professional.TLabelframe', padding=25)
         controls_frame.pack(fill=tk.X, pady=(0, 20))
         
-        # Log level selection
+        # Log level selection: the least severe level shown
         tk.Label(controls_frame, text="Log Level:", font=('Segoe UI', 10, 'bold'),
                 bg=self.colors['white']).grid(row=0, column=0, sticky=tk.W, pady=5)
         
         self.log_level_var = tk.StringVar(value=self.config["enterprise"]["log_level"])
         levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-        ttk.Combobox(controls_frame, textvariable=self.log_level_var, 
-                    values=levels, state="readonly", width=10).grid(
-            row=0, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        level_box = ttk.Combobox(controls_frame, textvariable=self.log_level_var, 
+                                values=levels, state="readonly", width=10)
+        level_box.grid(row=0, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        level_box.bind("<<ComboboxSelected>>", lambda event: self.apply_log_filter())
         
         # Auto-refresh
         self.auto_refresh_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(controls_frame, text="Auto-refresh logs", 
-                       variable=self.auto_refresh_var).grid(
+                       variable=self.auto_refresh_var,
+                       command=self.toggle_log_tailing).grid(
             row=0, column=2, sticky=tk.W, padx=(20, 0), pady=5)
         
+        # Text filter and jump to time
+        tk.Label(controls_frame, text="Search:", font=('Segoe UI', 10, 'bold'),
+                bg=self.colors['white']).grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.log_search_var = tk.StringVar()
+        search_entry = ttk.Entry(controls_frame, textvariable=self.log_search_var, width=30)
+        search_entry.grid(row=1, column=1, columnspan=2, sticky=tk.W, padx=(10, 0), pady=5)
+        search_entry.bind("<Return>", lambda event: self.apply_log_filter())
+        
+        tk.Label(controls_frame, text="Jump to:", font=('Segoe UI', 10, 'bold'),
+                bg=self.colors['white']).grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.log_jump_var = tk.StringVar()
+        jump_entry = ttk.Entry(controls_frame, textvariable=self.log_jump_var, width=20)
+        jump_entry.grid(row=2, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        jump_entry.bind("<Return>", lambda event: self.jump_logs())
+        tk.Label(controls_frame, text="YYYY-MM-DD HH:MM or HH:MM", font=('Segoe UI', 9),
+                fg=self.colors['gray_500'], bg=self.colors['white']).grid(
+            row=2, column=2, sticky=tk.W, padx=(10, 0), pady=5)
+        
         # Log actions
         actions_frame = ttk.Frame(controls_frame)
-        actions_frame.grid(row=1, column=0, columnspan=3, pady=(10, 0))
+        actions_frame.grid(row=3, column=0, columnspan=3, pady=(10, 0))
+        
+        ttk.Button(actions_frame, text="🔍 Apply Filter", 
+                  command=self.apply_log_filter, style='Primary.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(actions_frame, text="🕒 Jump", 
+                  command=self.jump_logs, style='Info.TButton').pack(side=tk.LEFT, padx=(0, 10))
         
-        ttk.Button(actions_frame, text="🔄 Refresh", 
-                  command=self.refresh_logs, style='Primary.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(actions_frame, text="🔄 Live", 
+                  command=self.refresh_logs, style='Success.TButton').pack(side=tk.LEFT, padx=(0, 10))
         
         ttk.Button(actions_frame, text="💾 Export Logs", 
                   command=self.export_logs, style='Secondary.TButton').pack(side=tk.LEFT, padx=(0, 10))
@@ -953,11 +1245,19 @@ Configuration File: {self.config_file}
         ttk.Button(actions_frame, text="🗑️ Clear Logs", 
                   command=self.clear_logs, style='Danger.TButton').pack(side=tk.LEFT)
         
+        self.log_status_var = tk.StringVar(value=f"Log file: {self.log_file_path()}")
+        tk.Label(controls_frame, textvariable=self.log_status_var, font=('Segoe UI', 9),
+                fg=self.colors['gray_600'], bg=self.colors['white']).grid(
+            row=4, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
+        
         # Log display
         log_display_frame = ttk.LabelFrame(container, text=" System Logs ",
                                           style='Professional.TLabelframe', padding=25)
         log_display_frame.pack(fill=tk.BOTH, expand=True)
         
+        log_view_controls = ttk.Frame(log_display_frame)
+        log_view_controls.pack(fill=tk.X, pady=(0, 10))
+        
         self.log_text = scrolledtext.ScrolledText(log_display_frame, height=20,
                                                  font=('Consolas', 9),
                                                  bg=self.colors['gray_900'],
@@ -965,8 +1265,14 @@ Configuration File: {self.config_file}
                                                  wrap=tk.WORD)
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
-        # Initialize logs
-        self.refresh_logs()
+        # The server's log file is tailed, filtered and searched on a background thread
+        self.log_console = LogConsole(self.root, self.log_text, log_tail.WINDOW_LINES * 2)
+        self.log_console.create_controls(log_view_controls)
+        self.log_viewer = log_tail.LogViewer(
+            self.log_file_path(), self.log_console,
+            on_status=lambda text: self.root.after(0, self.log_status_var.set, text))
+        self.apply_log_filter()
+        self.log_viewer.start()
     
     def create_enterprise_status_bar(self):
         """Create enterprise status bar"""
@@ -1004,25 +1310,151 @@ Configuration File: {self.config_file}
         self.update_time()
     
     def start_system_monitoring(self):
-        """Start system monitoring thread"""
-        self.monitoring_thread = threading.Thread(target=self.monitor_system, daemon=True)
-        self.monitoring_thread.start()
+        """Start the background resource sampler and show the history it kept"""
+        enterprise = self.config["enterprise"]
+        hours = float(enterprise.get("metrics_history_hours", 24))
+        self.resource_sampler = resource_history.ResourceSampler(
+            self.server_pids, lambda sample: self.root.after(0, self.apply_resource_sample, sample),
+            path=self.metrics_history_path() if enterprise.get("metrics_history") else None,
+            file_capacity=max(int(hours * 3600 / resource_history.DEFAULT_INTERVAL), 1))
+        
+        history = self.resource_sampler.history()
+        for name, (chart, _) in self.sparklines.items():
+            chart.load([(sample.time, getattr(sample, name)) for sample in history[-chart.points.maxlen:]])
+        if self.resource_sampler.error:
+            self.resource_hover_var.set(self.resource_sampler.error)
+        
+        self.resource_sampler.start()
     
-    def monitor_system(self):
-        """Monitor system resources"""
-        while not self.stop_monitoring:
-            try:
-                if hasattr(self, 'cpu_label'):
-                    cpu_percent = psutil.cpu_percent(interval=1)
-                    memory = psutil.virtual_memory()
-                    disk = psutil.disk_usage('/')
-                    
-                    self.root.after(0, self.update_monitoring_display, 
-                                   cpu_percent, memory.percent, disk.percent)
-                
-                time.sleep(5)  # Update every 5 seconds
-            except Exception:
-                break
+    def metrics_history_path(self):
+        """On-disk resource history written by resource_history.HistoryFile"""
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "metrics_history.bin")
+    
+    def apply_resource_sample(self, sample):
+        """Add one sample to the sparklines and the summary cards"""
+        try:
+            for name, label, unit in resource_history.SERIES:
+                chart, value_label = self.sparklines[name]
+                chart.add(sample.time, getattr(sample, name))
+                value_label.config(text=f"{getattr(sample, name):.1f} {unit}")
+            self.update_monitoring_display(sample.cpu, sample.memory, sample.disk)
+            self.network_label.config(text=f"↓{sample.net_recv:.2f} ↑{sample.net_sent:.2f} MB/s")
+        except tk.TclError:
+            pass
+    
+    def show_resource_point(self, name, point):
+        """Show the time and value under the mouse"""
+        if point is None:
+            self.resource_hover_var.set("Hover over a chart to read a sample")
+            return
+        _, label, unit = next(series for series in resource_history.SERIES if series[0] == name)
+        when, value = point
+        self.resource_hover_var.set(f"{datetime.fromtimestamp(when):%Y-%m-%d %H:%M:%S}  {label}: {value:.1f} {unit}")
+    
+    def export_resource_history(self):
+        """Export the recorded resource history as CSV"""
+        filename = filedialog.asksaveasfilename(
+            title="Export Resource History",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if filename:
+            threading.Thread(target=self._export_resource_history, args=(filename,), daemon=True).start()
+    
+    def _export_resource_history(self, filename):
+        try:
+            written = self.resource_sampler.export_csv(filename)
+            self.root.after(0, messagebox.showinfo, "Success", f"Exported {written} samples.")
+        except Exception as e:
+            self.root.after(0, messagebox.showerror, "Export Error", f"Failed to export history: {e}")
+    
+    def load_accounts_path(self):
+        return os.path.join(self.app_directory(), 'instance', 'load_test_users.json')
+    
+    def show_load_accounts(self):
+        try:
+            usernames, _ = load_test.load_accounts(self.load_accounts_path())
+            self.load_accounts_var.set(f"{len(usernames)} accounts ({usernames[0]} ...)" if usernames
+                                       else "No accounts")
+        except (OSError, ValueError, KeyError):
+            self.load_accounts_var.set("No accounts yet: seed them first")
+    
+    def seed_load_accounts(self):
+        """Create the test accounts in the configured database with the seed-load-users command"""
+        try:
+            count = int(self.load_ramp_vars['max_users'].get())
+        except ValueError:
+            messagebox.showerror("Error", "Ramp values must be whole numbers")
+            return
+        if not messagebox.askyesno("Seed Accounts", f"Create or reset {count} load test accounts "
+                                                    f"(loadtest001 ...) in the configured database?"):
+            return
+        self.load_status_var.set("Seeding accounts...")
+        self.run_database_command(
+            ["seed-load-users", "--count", str(count), "--output", self.load_accounts_path()], None,
+            self.seed_button, "✅ Test accounts ready", "❌ Seeding accounts failed",
+            extra_env={'HELPDESK_CONFIG': os.path.abspath(self.config_file)},
+            on_success=self.show_load_accounts, log=self.load_status_var.set)
+    
+    def start_load_test(self):
+        """Start ramping virtual users against the target URL"""
+        if self.load_generator is not None and self.load_generator.running:
+            return
+        try:
+            usernames, password = load_test.load_accounts(self.load_accounts_path())
+        except (OSError, ValueError, KeyError):
+            messagebox.showerror("Error", "No test accounts: click Seed Accounts first")
+            return
+        try:
+            ramp = {key: int(var.get()) for key, var in self.load_ramp_vars.items()}
+            mix = {name: int(var.get()) for name, var in self.load_mix_vars.items()}
+            self.load_generator = load_test.LoadGenerator(
+                self.load_url_var.get(), usernames, password, mix=mix, think_time=float(self.load_think_var.get()),
+                **ramp)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid load test settings: {e}")
+            return
+        
+        for chart, value_label in self.load_charts.values():
+            chart.load([])
+            value_label.config(text="-")
+        self.load_generator.start()
+        self.load_start_button.config(state='disabled')
+        self.load_stop_button.config(state='normal')
+        self.load_status_var.set(f"Ramping up to {ramp['max_users']} users...")
+        self.root.after(1000, self.poll_load_test, self.load_generator)
+    
+    def stop_load_test(self):
+        if self.load_generator is not None:
+            self.load_generator.stop()
+        self.load_start_button.config(state='normal')
+        self.load_stop_button.config(state='disabled')
+    
+    def poll_load_test(self, generator):
+        """Chart the last second of the running load test"""
+        if generator is not self.load_generator:
+            return
+        interval = generator.snapshot()
+        try:
+            for name, chart_and_label in self.load_charts.items():
+                chart, value_label = chart_and_label
+                value = getattr(interval, name)
+                chart.add(interval.time, value)
+                value_label.config(text=f"{value:.0f}" if name in ('users', 'rps') else f"{value:.1f}")
+            for totals in generator.stats.totals():
+                self.load_tree.item(totals.action, values=(
+                    totals.requests, totals.errors,
+                    *(f"{value:.0f}" if totals.requests else '-' for value in (totals.p50, totals.p95, totals.p99))))
+        except tk.TclError:
+            return
+        
+        if generator.running:
+            error = generator.stats.last_error
+            self.load_status_var.set(f"{interval.users} users, {interval.rps:.0f} req/s"
+                                     + (f"; last error: {error}" if error else ""))
+            self.root.after(1000, self.poll_load_test, generator)
+        else:
+            self.load_status_var.set(f"Stopped at {interval.users} users")
     
     def update_monitoring_display(self, cpu, memory, disk):
         """Update monitoring display"""
@@ -1057,6 +1489,43 @@ Configuration File: {self.config_file}
         except Exception:
             pass
     
+    def health_url(self):
+        """Base URL the health poller checks"""
+        host = self.config["server"]["host"]
+        if host == "0.0.0.0":
+            host = "localhost"
+        return f"http://{host}:{self.config['server']['port']}"
+    
+    def apply_health(self, status):
+        """Show a health poller result on the dashboard cards; runs on the Tk thread"""
+        try:
+            previous, self.last_health = self.last_health, status
+            readiness = status.readiness or {}
+            if status.ready:
+                self.stat_database_value.config(text=f"Schema v{readiness.get('schema_version')}",
+                                                fg=self.colors['success'])
+                self.stat_system_health_value.config(text="Good", fg=self.colors['success'])
+            elif status.alive:
+                database = "Outdated Schema" if readiness.get('status') == 'schema_outdated' else "Unreachable"
+                self.stat_database_value.config(text=database, fg=self.colors['danger'])
+                self.stat_system_health_value.config(text="Degraded", fg=self.colors['warning'])
+            else:
+                self.stat_database_value.config(text="Not Connected", fg=self.colors['warning'])
+                self.stat_system_health_value.config(text="Down" if self.is_server_running else "Idle",
+                                                     fg=self.colors['danger'] if self.is_server_running
+                                                     else self.colors['gray_500'])
+            
+            # Report changes only, and only while the server is supposed to be up
+            if self.is_server_running and previous is not None and (previous.alive, previous.ready) != (status.alive, status.ready):
+                if status.ready:
+                    self._append_server_output(f"✅ Server is ready ({status.response_ms:.0f} ms)")
+                elif status.alive:
+                    self._append_server_output(f"⚠️ Server is up but not ready: {status.error}")
+                else:
+                    self._append_server_output(f"❌ Server stopped responding: {status.error}")
+        except Exception:
+            pass
+    
     def update_time(self):
         """Update time display"""
         try:
@@ -1109,14 +1578,20 @@ Configuration File: {self.config_file}
                 result = "✅ PostgreSQL connection successful!"
                 
             elif db_type == "mysql":
-                import mysql.connector
-                config = {key: var.get() for key, var in self.mysql_vars.items()}
-                conn = mysql.connector.connect(
+                # Same driver and connect options as the server's engine, so a server
+                # that rejects the init_command fails here rather than at startup
+                import pymysql
+                config = dict(self.config["database"]["mysql"])
+                config.update((key, var.get()) for key, var in self.mysql_vars.items())
+                db_config = {"type": "mysql", "mysql": config}
+                options = engine_profiles.engine_options(engine_profiles.build_database_uri(db_config), db_config)
+                conn = pymysql.connect(
                     host=config['host'],
-                    port=config['port'],
+                    port=int(config['port'] or 3306),
                     database=config['database'],
                     user=config['username'],
-                    password=config['password']
+                    password=config['password'],
+                    **options['connect_args']
                 )
                 conn.close()
                 result = "✅ MySQL connection successful!"
@@ -1155,6 +1630,142 @@ Configuration File: {self.config_file}
             # Add database initialization logic here
             self.db_status_text.insert(tk.END, "✅ Database initialized successfully!\n")
     
+    def migrate_database(self):
+        """Copy the SQLite database into the PostgreSQL or MySQL server selected above"""
+        db_type = self.db_type_var.get()
+        if db_type not in ("postgresql", "mysql"):
+            messagebox.showinfo("Migrate Data", "Select PostgreSQL or MySQL as the target first")
+            return
+        if self.is_server_running:
+            messagebox.showwarning("Server Running", "Stop the server before migrating its data")
+            return
+        source = backups.sqlite_database_path(self.config["database"], self.app_directory())
+        if not os.path.exists(source):
+            messagebox.showerror("Error", f"SQLite database not found: {source}")
+            return
+        variables = self.pg_vars if db_type == "postgresql" else self.mysql_vars
+        target = self.selected_database_uri()
+        if not messagebox.askyesno("Confirm", f"Copy all data from {source} into the {db_type} database "
+                                              f"'{variables['database'].get()}'? An interrupted copy "
+                                              f"resumes where it stopped."):
+            return
+        
+        self.db_status_text.delete(1.0, tk.END)
+        self.db_status_text.insert(tk.END, "Migrating data...\n")
+        self.run_database_command(
+            ["transfer-database"], f"sqlite:///{source}", self.migrate_button,
+            "✅ Data migrated and verified. Save the configuration to switch the server over.",
+            "❌ Migration failed; run it again to resume",
+            extra_env={'HELPDESK_TRANSFER_TARGET': target})
+    
+    def selected_database_uri(self):
+        """SQLAlchemy URI of the database selected in the Database tab"""
+        db_type = self.db_type_var.get()
+        if db_type == "sqlite":
+            path = backups.sqlite_database_path({"sqlite_path": self.sqlite_path_var.get()}, self.app_directory())
+            return f"sqlite:///{path}"
+        variables = self.pg_vars if db_type == "postgresql" else self.mysql_vars
+        return engine_profiles.build_database_uri(
+            {"type": db_type, db_type: {key: var.get() for key, var in variables.items()}})
+    
+    def run_database_command(self, args, database_uri, button, success, failure, extra_env=None, on_success=None,
+                             log=None):
+        """Run a flask command against a database in the background, streaming its output"""
+        log = log or self._update_db_status
+        env = os.environ.copy()
+        if database_uri:
+            env['DATABASE_URL'] = database_uri
+        for flag in ('HELPDESK_SLA_SCHEDULER', 'HELPDESK_ROLLUP_JOB', 'HELPDESK_NOTIFICATIONS'):
+            env[flag] = '0'
+        env.update(extra_env or {})
+        button.config(state='disabled')
+        
+        def run():
+            ok = False
+            try:
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "flask", "--app", "main"] + args,
+                    env=env, cwd=self.app_directory(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, encoding='utf-8', errors='replace')
+                for line in process.stdout:
+                    self.root.after(0, log, line.rstrip())
+                ok = process.wait() == 0
+                result = success if ok else failure
+            except OSError as e:
+                result = f"{failure}: {e}"
+            self.root.after(0, log, result)
+            self.root.after(0, lambda: button.config(state='normal'))
+            if ok and on_success:
+                self.root.after(0, on_success)
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def benchmark_history_path(self):
+        return os.path.join(self.app_directory(), 'instance', 'db_benchmarks.json')
+    
+    def benchmark_database(self):
+        """Measure latency and throughput of the database selected above"""
+        try:
+            uri = self.selected_database_uri()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if not messagebox.askyesno("Benchmark", "Run the benchmark against this database? It creates and "
+                                                "drops a scratch table and takes up to a minute."):
+            return
+        label = f"{self.db_type_var.get()} on {socket.gethostname()}"
+        self.db_status_text.delete(1.0, tk.END)
+        self.db_status_text.insert(tk.END, "Benchmarking database...\n")
+        self.run_database_command(
+            ["benchmark-database", "--label", label, "--output", self.benchmark_history_path()], uri,
+            self.benchmark_button, "✅ Benchmark complete", "❌ Benchmark failed",
+            on_success=self.show_benchmark_results)
+    
+    def show_benchmark_results(self):
+        """Compare the latest benchmark runs side by side"""
+        try:
+            with open(self.benchmark_history_path(), encoding='utf-8') as f:
+                runs = json.load(f)[-BENCHMARK_RUNS_SHOWN:]
+        except (OSError, ValueError):
+            runs = []
+        if not runs:
+            messagebox.showinfo("Benchmark Results", "No benchmark has been run yet")
+            return
+        
+        if self.benchmark_window is None or not self.benchmark_window.winfo_exists():
+            self.benchmark_window = tk.Toplevel(self.root)
+            self.benchmark_window.title("Database Benchmark Results")
+            self.benchmark_window.geometry("1000x420")
+            self.benchmark_tree = ttk.Treeview(self.benchmark_window, show='headings')
+            scrollbar = ttk.Scrollbar(self.benchmark_window, orient=tk.VERTICAL, command=self.benchmark_tree.yview)
+            self.benchmark_tree.configure(yscrollcommand=scrollbar.set)
+            self.benchmark_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0), pady=10)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+        tree = self.benchmark_tree
+        tree.delete(*tree.get_children())
+        
+        # One row per measurement, one column per run, newest on the right
+        columns = ['measurement'] + [f"run{index}" for index in range(len(runs))]
+        tree.configure(columns=columns)
+        tree.heading('measurement', text="Measurement (p50 / p95 ms)")
+        tree.column('measurement', width=260, anchor=tk.W)
+        for column, run in zip(columns[1:], runs):
+            tree.heading(column, text=f"{run.get('label') or run['dialect']} · {run['time'][5:16].replace('T', ' ')}")
+            tree.column(column, width=180, anchor=tk.E)
+        
+        rows = {}
+        for index, run in enumerate(runs):
+            for result in run['results']:
+                key = f"{result['section']}: {result['name']}"
+                if result['p50'] is None:
+                    cell = f"{result['rate']:,.0f} rows/s" if result['rate'] else f"{result['max']:.1f} ms"
+                else:
+                    cell = f"{result['p50']:.2f} / {result['p95']:.2f}"
+                rows.setdefault(key, [''] * len(runs))[index] = cell
+        for key, cells in rows.items():
+            tree.insert('', tk.END, values=[key] + cells)
+        self.benchmark_window.lift()
+    
     # Server methods
     def start_server(self):
         """Start the helpdesk server"""
@@ -1185,8 +1796,8 @@ Configuration File: {self.config_file}
             self.server_status_var.set("Running")
             self.server_status_label.config(fg=self.colors['success'])
             
-            self.server_output.insert(tk.END, f"🚀 Starting server on {host}:{port}\n")
-            self.server_output.see(tk.END)
+            self._append_server_output(f"🚀 Starting server on {host}:{port}")
+            self.root.after(2000, self.health.poll_now)
             
         except Exception as e:
             messagebox.showerror("Server Error", f"Failed to start server: {e}")
@@ -1229,9 +1840,16 @@ Configuration File: {self.config_file}
                     if debug:
                         cmd.append("--debug")
             
+            # Point the server at the configuration saved by this console
+            env = os.environ.copy()
+            env['HELPDESK_CONFIG'] = os.path.abspath(self.config_file)
+            env['HELPDESK_LOG_LEVEL'] = self.config["enterprise"]["log_level"]
+            env['HELPDESK_LOG_DIR'] = os.path.dirname(self.log_file_path())
+            
             # Start the server process
             self.server_process = subprocess.Popen(
                 cmd,
+                env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 universal_newlines=True,
@@ -1254,33 +1872,32 @@ Configuration File: {self.config_file}
                         try:
                             clean_line = line.strip()
                             if clean_line:
-                                self.root.after(0, self._append_server_output, clean_line)
+                                self._append_server_output(clean_line)
                         except UnicodeDecodeError:
                             # Skip lines that can't be decoded
                             continue
                         except Exception as line_error:
                             # Log line processing errors but continue
-                            self.root.after(0, self._append_server_output, f"⚠️ Line processing warning: {line_error}")
+                            self._append_server_output(f"⚠️ Line processing warning: {line_error}")
                             continue
                     
                     # Process has ended
                     self.root.after(0, self._server_stopped)
                 except Exception as e:
-                    self.root.after(0, self._append_server_output, f"❌ Output reading error: {e}")
+                    self._append_server_output(f"❌ Output reading error: {e}")
                     self.root.after(0, self._server_stopped)
             
             output_thread = threading.Thread(target=read_output, daemon=True)
             output_thread.start()
                 
         except Exception as e:
-            self.root.after(0, self._append_server_output, f"❌ Server error: {e}")
+            self._append_server_output(f"❌ Server error: {e}")
             self.root.after(0, self._server_stopped)
     
     def _append_server_output(self, text):
-        """Append text to server output"""
+        """Append text to server output; safe to call from any thread"""
         if text:
-            self.server_output.insert(tk.END, f"{text}\n")
-            self.server_output.see(tk.END)
+            self.server_console.write(text)
     
     def _server_stopped(self):
         """Handle server stopped"""
@@ -1318,11 +1935,10 @@ Configuration File: {self.config_file}
                 except subprocess.TimeoutExpired:
                     self.server_process.kill()
             
-            self.server_output.insert(tk.END, "🛑 Server stopped\n")
-            self.server_output.see(tk.END)
+            self._append_server_output("🛑 Server stopped")
             
         except Exception as e:
-            self.server_output.insert(tk.END, f"❌ Error stopping server: {e}\n")
+            self._append_server_output(f"❌ Error stopping server: {e}")
         
         self._server_stopped()
     
@@ -1364,64 +1980,120 @@ Configuration File: {self.config_file}
     
     # Other methods
     def refresh_process_list(self):
-        """Refresh process list"""
-        # Clear existing items
-        for item in self.process_tree.get_children():
-            self.process_tree.delete(item)
+        """Sample the processes now instead of at the next interval"""
+        self.process_sampler.poll_now()
+    
+    def apply_process_filter(self):
+        self.process_sampler.set_filter(self.process_scope_var.get(), self.process_name_var.get())
+    
+    def server_pids(self):
+        """Top-level server process started by this console; called from the sampler thread"""
+        process = self.server_process
+        return [process.pid] if process else []
+    
+    def apply_process_rows(self, rows):
+        """Insert, update and delete only the Treeview rows that changed"""
+        tree = self.process_tree
+        nested = self.process_sampler.mode == process_monitor.SERVER
+        
+        for pid in set(self.process_rows) - set(rows):
+            # Deleting a master also deletes its workers; survivors are re-inserted below
+            if tree.exists(str(pid)):
+                tree.delete(str(pid))
+        
+        pending = []
+        for pid, row in rows.items():
+            iid = str(pid)
+            parent = str(row.ppid) if nested and row.ppid in rows else ''
+            values = (pid, '…' if row.cpu is None else f"{row.cpu:.1f}%",
+                      f"{row.rss / 1024 / 1024:.1f} MB", row.threads, row.status)
+            if not tree.exists(iid):
+                pending.append((iid, parent, row.name, values))
+                continue
+            shown = self.process_rows.get(pid)
+            if shown is None or shown[1:] != (parent, row.name, values):
+                tree.item(iid, text=row.name, values=values)
+                if tree.parent(iid) != parent:
+                    tree.move(iid, parent, 'end')
+            self.process_rows[pid] = (iid, parent, row.name, values)
+        
+        # Parents go in before their workers
+        while pending:
+            waiting = []
+            for iid, parent, name, values in pending:
+                if parent and not tree.exists(parent):
+                    waiting.append((iid, parent, name, values))
+                    continue
+                tree.insert(parent, 'end', iid=iid, text=name, values=values, open=True)
+                self.process_rows[int(iid)] = (iid, parent, name, values)
+            if len(waiting) == len(pending):
+                # Reused pids can make parent links loop; show the rest at the top level
+                for iid, parent, name, values in waiting:
+                    tree.insert('', 'end', iid=iid, text=name, values=values, open=True)
+                    self.process_rows[int(iid)] = (iid, '', name, values)
+                break
+            pending = waiting
         
-        # Add current processes
+        for pid in set(self.process_rows) - set(rows):
+            del self.process_rows[pid]
+        
+        if nested and not rows:
+            self.process_summary_var.set("Server not running")
+        else:
+            rss = sum(row.rss for row in rows.values()) / 1024 / 1024
+            threads = sum(row.threads for row in rows.values())
+            self.process_summary_var.set(f"{len(rows)} processes, {rss:.0f} MB RSS, {threads} threads")
+    
+    def log_file_path(self):
+        """Server log file written by log_files.py"""
+        log_dir = self.config["enterprise"].get("log_dir") or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "instance", "logs")
+        return os.path.join(log_dir, log_files.LOG_FILENAME)
+    
+    def apply_log_filter(self):
+        """Show only lines at the chosen level or above that contain the search text"""
+        self.log_viewer.set_filter(self.log_level_var.get(), self.log_search_var.get())
+    
+    def toggle_log_tailing(self):
+        """Start or stop following the log file"""
+        self.log_viewer.enabled = self.auto_refresh_var.get()
+    
+    def jump_logs(self):
+        """Show the log from the entered time onwards"""
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
-                try:
-                    info = proc.info
-                    self.process_tree.insert('', 'end', 
-                                           text=info['name'],
-                                           values=(info['pid'],
-                                                  f"{info['cpu_percent']:.1f}%",
-                                                  f"{info['memory_percent']:.1f}%",
-                                                  info['status']))
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-        except Exception as e:
-            messagebox.showerror("Process Error", f"Failed to refresh process list: {e}")
+            when = log_tail.parse_time(self.log_jump_var.get())
+        except ValueError as e:
+            messagebox.showwarning("Jump to Time", str(e))
+            return
+        self.log_console.follow.set(False)
+        self.log_viewer.jump_to(when)
     
     def refresh_logs(self):
-        """Refresh log display"""
-        self.log_text.delete(1.0, tk.END)
-        
-        # Add sample log entries
-        log_entries = [
-            "[INFO] System initialized successfully",
-            "[INFO] Database connection established",
-            "[DEBUG] Configuration loaded from file",
-            "[INFO] Server ready to accept connections",
-            "[WARNING] High CPU usage detected",
-            "[INFO] Backup completed successfully"
-        ]
-        
-        for entry in log_entries:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.log_text.insert(tk.END, f"{timestamp} {entry}\n")
+        """Return to the live tail of the log file"""
+        self.log_console.follow.set(True)
+        self.log_viewer.live()
     
     def export_logs(self):
-        """Export logs to file"""
+        """Export the lines of all log files that match the current filter"""
         filename = filedialog.asksaveasfilename(
             title="Export Logs",
             defaultextension=".txt",
             filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
         )
         if filename:
-            try:
-                with open(filename, 'w') as f:
-                    f.write(self.log_text.get(1.0, tk.END))
-                messagebox.showinfo("Success", "Logs exported successfully!")
-            except Exception as e:
-                messagebox.showerror("Export Error", f"Failed to export logs: {e}")
+            log_filter = log_tail.LogFilter(self.log_level_var.get(), self.log_search_var.get())
+            threading.Thread(target=self._export_logs, args=(filename, log_filter), daemon=True).start()
+    
+    def _export_logs(self, filename, log_filter):
+        try:
+            written = log_tail.export(self.log_file_path(), filename, log_filter)
+            self.root.after(0, messagebox.showinfo, "Success", f"Exported {written} log lines.")
+        except Exception as e:
+            self.root.after(0, messagebox.showerror, "Export Error", f"Failed to export logs: {e}")
     
     def clear_logs(self):
-        """Clear log display"""
-        if messagebox.askyesno("Confirm", "Clear all logs?"):
-            self.log_text.delete(1.0, tk.END)
+        """Clear log display; the log files are kept"""
+        self.log_console.clear()
     
     # Backup methods
     def browse_backup_dir(self):
@@ -1430,41 +2102,134 @@ Configuration File: {self.config_file}
         if directory:
             self.backup_dir_var.set(directory)
     
+    def backup_directory(self):
+        return os.path.abspath(self.backup_dir_var.get())
+    
+    def app_directory(self):
+        return os.path.dirname(os.path.abspath(__file__))
+    
+    def save_backup_settings(self):
+        """Save the backup settings to the enterprise configuration"""
+        try:
+            keep, max_age = int(self.backup_keep_var.get()), int(self.backup_max_age_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Retention values must be whole numbers")
+            return
+        self.config["enterprise"].update(backup_dir=self.backup_dir_var.get(), backup_keep=keep,
+                                         backup_max_age_days=max_age,
+                                         backup_enabled=self.auto_backup_var.get(),
+                                         backup_interval=self.backup_interval_var.get())
+        self.save_config()
+    
+    def refresh_backup_list(self):
+        """Show the backup sets found in the backup directory"""
+        self.backup_tree.delete(*self.backup_tree.get_children())
+        for manifest in backups.list_backups(self.backup_directory()):
+            database = manifest.get('database', {})
+            uploads = manifest.get('uploads', {})
+            size = (database.get('size', 0) + uploads.get('size', 0)) / 1024 / 1024
+            kind = f"{database.get('type', '?')} + {uploads.get('count', 0)} uploads ({uploads.get('copied', 0)} new)"
+            status = manifest['status'].capitalize()
+            if manifest.get('error'):
+                status += f": {manifest['error']}"
+            self.backup_tree.insert('', 'end', iid=manifest['name'], values=(
+                manifest['created'].replace('T', ' '), f"{size:.1f} MB", kind, status))
+    
+    def selected_backup(self, action):
+        selection = self.backup_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", f"Please select a backup to {action}")
+            return None
+        return selection[0]
+    
+    def show_backup_progress(self, fraction, message):
+        if fraction is not None:
+            self.backup_progress['value'] = fraction * 100
+        self.backup_status_var.set(message)
+    
+    def backup_done(self, title, result, error):
+        """A backup job finished on the worker thread"""
+        self.refresh_backup_list()
+        if error and title == "Automatic backup":
+            # Retry in an hour rather than leaving a failed set every minute
+            self.auto_backup_retry_at = time.time() + 3600
+            self.backup_status_var.set(f"{title} failed: {error}")
+        elif error:
+            self.backup_status_var.set(f"{title} failed: {error}")
+            messagebox.showerror("Backup Error", f"{title} failed: {error}")
+        elif title == "Automatic backup":
+            self.backup_status_var.set(f"Automatic backup {result['name']} completed")
+        else:
+            messagebox.showinfo("Success", f"{title} completed. {self.backup_status_var.get()}")
+    
+    def submit_backup_job(self, title, function, *args):
+        if self.backup_worker.busy:
+            messagebox.showwarning("Backup Busy", "Another backup job is still running")
+            return
+        self.backup_progress['value'] = 0
+        self.backup_status_var.set(f"{title}...")
+        self.backup_worker.submit(title, function, *args)
+    
     def create_backup(self):
-        """Create system backup"""
-        backup_dir = self.backup_dir_var.get()
-        if not backup_dir:
+        """Back up the database and uploads, then apply retention"""
+        if not self.backup_dir_var.get():
             messagebox.showerror("Error", "Please specify backup directory")
             return
-        
-        os.makedirs(backup_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"helpdesk_backup_{timestamp}"
-        
-        # Add backup to history
-        self.backup_tree.insert('', 0, values=(
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "15.2 MB",
-            "Full",
-            "Completed"
-        ))
-        
-        messagebox.showinfo("Success", f"Backup created: {backup_name}")
+        os.makedirs(self.backup_directory(), exist_ok=True)
+        self.submit_backup_job("Backup", self._backup_and_prune, *self.backup_job_args())
+    
+    def backup_job_args(self):
+        """Settings of a backup job, read here on the Tk thread"""
+        return (self.backup_directory(), dict(self.config["database"]), self.app_directory(),
+                self.config["enterprise"]["backup_keep"], self.config["enterprise"]["backup_max_age_days"])
+    
+    @staticmethod
+    def _backup_and_prune(directory, db_config, app_directory, keep, max_age_days, progress):
+        # Runs on the backup worker thread, so everything it needs is passed in
+        manifest = backups.create_backup(directory, db_config, app_directory, progress)
+        backups.apply_retention(directory, keep, max_age_days)
+        return manifest
+    
+    def check_auto_backup(self):
+        """Start a backup when automatic backups are on and the interval has passed"""
+        try:
+            if self.auto_backup_var.get() and not self.backup_worker.busy \
+                    and time.time() >= self.auto_backup_retry_at \
+                    and backups.is_due(self.backup_directory(), self.backup_interval_var.get()):
+                os.makedirs(self.backup_directory(), exist_ok=True)
+                self.backup_worker.submit("Automatic backup", self._backup_and_prune, *self.backup_job_args())
+        except OSError as e:
+            self.backup_status_var.set(f"Automatic backup skipped: {e}")
+        self.root.after(60000, self.check_auto_backup)
     
     def restore_backup(self):
-        """Restore from backup"""
-        selection = self.backup_tree.selection()
-        if not selection:
-            messagebox.showwarning("Warning", "Please select a backup to restore")
+        """Restore the selected backup over the current database and uploads"""
+        name = self.selected_backup("restore")
+        if not name:
             return
-        
-        if messagebox.askyesno("Confirm", "Restore from selected backup? This will overwrite current data."):
-            messagebox.showinfo("Success", "Backup restored successfully!")
+        if self.is_server_running:
+            messagebox.showwarning("Server Running", "Stop the server before restoring a backup")
+            return
+        if messagebox.askyesno("Confirm", f"Restore {name}? This will overwrite current data."):
+            self.submit_backup_job("Restore", backups.restore_backup, self.backup_directory(), name,
+                                   dict(self.config["database"]), self.app_directory())
+    
+    def verify_backup(self):
+        """Recheck the selected backup's checksums and database integrity"""
+        name = self.selected_backup("verify")
+        if name:
+            self.submit_backup_job("Verification", backups.verify_backup, self.backup_directory(), name)
     
     def clean_backups(self):
-        """Clean old backups"""
-        if messagebox.askyesno("Confirm", "Delete old backups (older than 30 days)?"):
-            messagebox.showinfo("Success", "Old backups cleaned successfully!")
+        """Apply the retention settings now"""
+        try:
+            keep, max_age = int(self.backup_keep_var.get()), int(self.backup_max_age_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Retention values must be whole numbers")
+            return
+        if messagebox.askyesno("Confirm", f"Delete backups older than {max_age} days, "
+                                          f"keeping at least the newest {keep}?"):
+            self.submit_backup_job("Cleanup", backups.apply_retention, self.backup_directory(), keep, max_age)
     
     # Security methods
     def browse_ssl_cert(self):
@@ -1507,7 +2272,13 @@ Configuration File: {self.config_file}
         except KeyboardInterrupt:
             pass
         finally:
-            self.stop_monitoring = True
+            self.resource_sampler.stop()
+            self.health.stop()
+            self.log_viewer.stop()
+            self.backup_worker.stop()
+            self.process_sampler.stop()
+            if self.load_generator:
+                self.load_generator.stop()
             if self.server_process:
                 self.server_process.terminate()
 
@@ -0,0 +1,87 @@
+"""
+Background health polling for the GUI launchers
+A daemon thread asks the server's /healthz and /readyz endpoints for its state
+every few seconds over one keep-alive requests.Session, and hands each result
+to a callback. The Tk main thread never waits on the network: launchers read
+the latest result or schedule their widget updates from the callback with
+root.after().
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_INTERVAL = 5
+DEFAULT_TIMEOUT = 2
+
+# alive: /healthz answered; ready: /readyz answered 200. readiness is the
+# /readyz JSON body (schema version, DB ping, pool statistics) when there is one
+HealthStatus = namedtuple('HealthStatus', 'alive ready response_ms readiness error checked_at')
+
+
+class HealthPoller:
+    """Polls a server's health endpoints from a background thread"""
+
+    def __init__(self, base_url, callback=None, interval=DEFAULT_INTERVAL, timeout=DEFAULT_TIMEOUT):
+        # base_url is a callable so a changed port in the settings is picked up
+        self.base_url = base_url
+        self.callback = callback
+        self.interval = interval
+        self.timeout = timeout
+        self.latest = None
+        self._session = requests.Session()
+        self._session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='health-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        self._session.close()
+
+    def poll_now(self):
+        """Check again without waiting for the next interval"""
+        self._wake.set()
+
+    def check(self):
+        """One liveness and readiness probe"""
+        url = self.base_url().rstrip('/')
+        started = time.perf_counter()
+        try:
+            response = self._session.get(f"{url}/healthz", timeout=self.timeout)
+            response_ms = round((time.perf_counter() - started) * 1000, 1)
+            if response.status_code != 200:
+                return HealthStatus(False, False, response_ms, None, f"HTTP {response.status_code}", datetime.now())
+        except requests.RequestException as e:
+            return HealthStatus(False, False, None, None, type(e).__name__, datetime.now())
+
+        try:
+            response = self._session.get(f"{url}/readyz", timeout=self.timeout)
+            readiness = response.json()
+        except (requests.RequestException, ValueError) as e:
+            return HealthStatus(True, False, response_ms, None, type(e).__name__, datetime.now())
+        error = None if response.status_code == 200 else readiness.get('error') or readiness.get('status')
+        return HealthStatus(True, response.status_code == 200, response_ms, readiness, error, datetime.now())
+
+    def _run(self):
+        while not self._stopped.is_set():
+            status = self.check()
+            self.latest = status
+            if self.callback and not self._stopped.is_set():
+                try:
+                    self.callback(status)
+                except Exception:
+                    # The window may be closing; keep polling until stopped
+                    pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
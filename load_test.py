@@ -0,0 +1,268 @@
+"""
+Load generator for the professional launcher's Load Test tab
+Virtual users log in with the accounts written by `flask seed-load-users` and
+then loop over a weighted mix of actions: view the dashboard, search it,
+create a ticket, comment on one of their tickets and log in again. Each
+virtual user runs on its own thread with a keep-alive requests.Session, the
+way a browser reuses its connection. Concurrency ramps up in steps: a few
+users start, more join every step until the maximum is reached.
+
+Every HTTP request is timed into LoadStats. The launcher calls snapshot()
+once a second for the live requests/s, error rate and p50/p95/p99 latency of
+the last interval, and totals() for the per-action summary. Nothing here
+touches Tk.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+import requests
+
+# (name, label, default weight)
+ACTIONS = (
+    ('dashboard', 'Dashboard', 4),
+    ('search', 'Search', 2),
+    ('create_ticket', 'Create ticket', 1),
+    ('comment', 'Comment', 2),
+    ('login', 'Log in', 1),
+)
+ACTION_LABELS = {name: label for name, label, _ in ACTIONS}
+
+DEFAULT_START_USERS = 5
+DEFAULT_STEP_USERS = 5
+DEFAULT_STEP_SECONDS = 15
+DEFAULT_MAX_USERS = 50
+DEFAULT_THINK_TIME = 1.0
+REQUEST_TIMEOUT = 30
+TOTAL_LATENCIES = 10000  # per action, for the summary percentiles
+
+SEARCH_WORDS = ('printer', 'vpn', 'laptop', 'email', 'password', 'network', 'monitor', 'sap')
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+TICKET_LINK_PATTERN = re.compile(r'/ticket/(\d+)"')
+
+# Statistics of the last snapshot interval; latencies in milliseconds
+Interval = namedtuple('Interval', 'time users requests rps error_rate p50 p95 p99')
+ActionTotals = namedtuple('ActionTotals', 'action requests errors p50 p95 p99')
+
+
+def load_accounts(path):
+    """(usernames, password) from the file written by seed-load-users"""
+    with open(path, encoding='utf-8') as f:
+        accounts = json.load(f)
+    return accounts['usernames'], accounts['password']
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+
+class LoadStats:
+    """Request timings of the current interval plus running totals per action"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._interval = []
+        self._interval_errors = 0
+        self._interval_started = time.monotonic()
+        self._totals = {name: [0, 0, deque(maxlen=TOTAL_LATENCIES)] for name, _, _ in ACTIONS}
+        self.last_error = None
+
+    def record(self, action, seconds, ok, error=None):
+        with self._lock:
+            self._interval.append(seconds)
+            totals = self._totals[action]
+            totals[0] += 1
+            totals[2].append(seconds)
+            if not ok:
+                self._interval_errors += 1
+                totals[1] += 1
+                self.last_error = error
+
+    def snapshot(self, users):
+        """Interval since the previous snapshot, then start a new one"""
+        now = time.monotonic()
+        with self._lock:
+            durations, errors = self._interval, self._interval_errors
+            elapsed = max(now - self._interval_started, 1e-6)
+            self._interval, self._interval_errors, self._interval_started = [], 0, now
+        durations.sort()
+        return Interval(time.time(), users, len(durations), len(durations) / elapsed,
+                        errors / len(durations) * 100 if durations else 0.0,
+                        _percentile(durations, 0.5), _percentile(durations, 0.95), _percentile(durations, 0.99))
+
+    def totals(self):
+        with self._lock:
+            rows = [(name, count, errors, sorted(latencies)) for name, (count, errors, latencies) in self._totals.items()]
+        return [ActionTotals(name, count, errors, _percentile(ordered, 0.5), _percentile(ordered, 0.95),
+                             _percentile(ordered, 0.99))
+                for name, count, errors, ordered in rows]
+
+
+class VirtualUser:
+    """One logged-in user running the action mix over a keep-alive session"""
+
+    def __init__(self, base_url, username, password, stats, mix, think_time, stopped):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.stats = stats
+        self.actions = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.actions]
+        self.think_time = think_time
+        self.stopped = stopped
+        self.session = requests.Session()
+        self.ticket_ids = []
+        self.random = random.Random()
+
+    def request(self, action, method, path, expect_redirect=False, **kwargs):
+        """Timed request; the response, or None when it failed"""
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=REQUEST_TIMEOUT,
+                                            allow_redirects=False, **kwargs)
+        except requests.RequestException as e:
+            self.stats.record(action, time.perf_counter() - started, False, f"{action}: {e}")
+            return None
+        elapsed = time.perf_counter() - started
+        # Pages answer 200; a redirect there means the session was lost. Form posts redirect on success
+        ok = response.is_redirect if expect_redirect else response.status_code == 200
+        self.stats.record(action, elapsed, ok, None if ok else f"{action}: {method} {path} -> {response.status_code}")
+        return response if ok else None
+
+    def form_token(self, action, path):
+        response = self.request(action, 'GET', path)
+        match = CSRF_PATTERN.search(response.text) if response is not None else None
+        return match.group(1) if match else None
+
+    def login(self):
+        self.session.cookies.clear()
+        token = self.form_token('login', '/user-login')
+        if token is None:
+            return False
+        # A successful login redirects to the dashboard; a failed one renders the form again
+        return self.request('login', 'POST', '/user-login', expect_redirect=True,
+                            data={'csrf_token': token, 'username': self.username,
+                                  'password': self.password}) is not None
+
+    def dashboard(self, search=''):
+        response = self.request('search' if search else 'dashboard', 'GET', '/user-dashboard',
+                                params={'search': search} if search else None)
+        if response is not None and not search:
+            self.ticket_ids = [int(ticket_id) for ticket_id in TICKET_LINK_PATTERN.findall(response.text)]
+
+    def create_ticket(self):
+        token = self.form_token('create_ticket', '/create-ticket')
+        if token is None:
+            return
+        word = self.random.choice(SEARCH_WORDS)
+        self.request('create_ticket', 'POST', '/create-ticket', expect_redirect=True, data={
+            'csrf_token': token,
+            'title': f"Load test: {word} issue",
+            'description': f"Generated by the launcher load test for {self.username}.",
+            'category': self.random.choice(('Hardware', 'Software')),
+            'priority': self.random.choice(('Low', 'Medium', 'High', 'Critical')),
+            'system_name': 'load-test',
+        })
+
+    def comment(self):
+        if not self.ticket_ids:
+            self.dashboard()
+        if not self.ticket_ids:
+            return self.create_ticket()
+        ticket_id = self.random.choice(self.ticket_ids)
+        token = self.form_token('comment', f"/ticket/{ticket_id}")
+        if token is not None:
+            self.request('comment', 'POST', f"/ticket/{ticket_id}/comment", expect_redirect=True,
+                         data={'csrf_token': token, 'comment': 'Load test follow-up comment.'})
+
+    def run_action(self, action):
+        if action == 'dashboard':
+            self.dashboard()
+        elif action == 'search':
+            self.dashboard(self.random.choice(SEARCH_WORDS))
+        elif action == 'create_ticket':
+            self.create_ticket()
+        elif action == 'comment':
+            self.comment()
+
+    def run(self):
+        try:
+            # Spread the first requests of a step over the think time
+            if self.stopped.wait(self.random.uniform(0, self.think_time)):
+                return
+            logged_in = self.login()
+            while not self.stopped.is_set():
+                if not logged_in:
+                    # Retry after a pause rather than hammering a failing login
+                    self.stopped.wait(max(self.think_time, 1.0))
+                    logged_in = self.login()
+                    continue
+                action = self.random.choices(self.actions, self.weights)[0]
+                if action == 'login':
+                    logged_in = self.login()
+                else:
+                    self.run_action(action)
+                self.stopped.wait(self.random.uniform(0.5, 1.5) * self.think_time)
+        finally:
+            self.session.close()
+
+
+class LoadGenerator:
+    """Ramps virtual users up in steps until the maximum, then holds until stopped"""
+
+    def __init__(self, base_url, usernames, password, mix=None, start_users=DEFAULT_START_USERS,
+                 step_users=DEFAULT_STEP_USERS, step_seconds=DEFAULT_STEP_SECONDS,
+                 max_users=DEFAULT_MAX_USERS, think_time=DEFAULT_THINK_TIME):
+        if not usernames:
+            raise ValueError("No test accounts; run seed-load-users first")
+        self.base_url = base_url
+        self.usernames = usernames
+        self.password = password
+        self.mix = mix or {name: weight for name, _, weight in ACTIONS}
+        if not any(weight > 0 for weight in self.mix.values()):
+            raise ValueError("Give at least one action a weight above zero")
+        self.start_users = start_users
+        self.step_users = step_users
+        self.step_seconds = step_seconds
+        self.max_users = max_users
+        self.think_time = think_time
+        self.stats = LoadStats()
+        self.users = []
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._stopped.is_set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._ramp, name='load-ramp', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def snapshot(self):
+        return self.stats.snapshot(len(self.users))
+
+    def _add_users(self, count):
+        for _ in range(min(count, self.max_users - len(self.users))):
+            # Accounts are shared round robin when there are more users than accounts
+            username = self.usernames[len(self.users) % len(self.usernames)]
+            user = VirtualUser(self.base_url, username, self.password, self.stats, self.mix,
+                               self.think_time, self._stopped)
+            threading.Thread(target=user.run, name=f'load-user-{len(self.users) + 1}', daemon=True).start()
+            self.users.append(user)
+
+    def _ramp(self):
+        self._add_users(self.start_users)
+        while len(self.users) < self.max_users and not self._stopped.wait(self.step_seconds):
+            self._add_users(self.step_users)
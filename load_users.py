@@ -0,0 +1,57 @@
+"""
+Test accounts for load testing
+  flask --app main seed-load-users [--count 50] [--output instance/load_test_users.json]
+
+Creates regular user accounts named loadtest001, loadtest002, ... that all
+share one password, and writes the usernames and password to a JSON file the
+professional launcher's Load Test tab reads. Running it again reuses the
+existing accounts, adds any missing ones and resets their password, so the
+file always matches the database.
+"""
+
+import json
+import os
+import secrets
+
+import click
+
+from app import app, db
+from models import User
+
+DEFAULT_COUNT = 50
+DEFAULT_PREFIX = 'loadtest'
+
+
+def seed_accounts(count=DEFAULT_COUNT, prefix=DEFAULT_PREFIX, password=None):
+    """Create or reset count test users; returns (usernames, password, created)"""
+    password = password or secrets.token_urlsafe(12)
+    usernames = [f"{prefix}{number:03d}" for number in range(1, count + 1)]
+    existing = {user.username: user for user in User.query.filter(User.username.in_(usernames))}
+    created = 0
+    for username in usernames:
+        user = existing.get(username)
+        if user is None:
+            user = User(username=username, email=f"{username}@loadtest.invalid", first_name='Load',
+                        last_name=f"Test {username[len(prefix):]}", department='Load Test', role='user',
+                        is_admin=False)
+            db.session.add(user)
+            created += 1
+        user.set_password(password)
+    db.session.commit()
+    return usernames, password, created
+
+
+@app.cli.command('seed-load-users')
+@click.option('--count', default=DEFAULT_COUNT, show_default=True, help='Number of test accounts.')
+@click.option('--prefix', default=DEFAULT_PREFIX, show_default=True, help='Username prefix.')
+@click.option('--password', default=None, help='Shared password (random by default).')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='JSON file for the launcher (default: instance/load_test_users.json).')
+def seed_load_users_command(count, prefix, password, output):
+    """Create the accounts the launcher's load test logs in with"""
+    usernames, password, created = seed_accounts(count, prefix, password)
+    output = output or os.path.join(app.instance_path, 'load_test_users.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'usernames': usernames, 'password': password}, f, indent=1)
+    click.echo(f"{created} test accounts created, {len(usernames) - created} reset; written to {output}")
@@ -0,0 +1,118 @@
+"""
+Batched, bounded text console for the GUI launchers
+Reader threads write lines into a LogPipe (a locked deque) and never touch
+Tk. Every FLUSH_MS the Tk thread drains the pipe, inserts the whole batch
+with one Text.insert and trims the widget to max_lines. However much the
+server logs, the event loop sees ten small jobs a second instead of one
+callback per line, and memory stays bounded by max_lines in the widget plus
+max_lines pending.
+
+Pause stops the draining: lines keep arriving, the oldest are dropped once
+the pipe is full, and a marker shows how many were skipped. Follow keeps the
+view on the newest line.
+"""
+
+import threading
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+
+DEFAULT_MAX_LINES = 5000
+MIN_LINES = 100
+FLUSH_MS = 100
+
+
+class LogPipe:
+    """Thread-safe buffer of the lines not shown yet"""
+
+    def __init__(self, max_lines):
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._reset = False
+        self.dropped = 0
+
+    def write(self, line):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+
+    def reset(self):
+        """Forget pending lines and have the console cleared"""
+        with self._lock:
+            self._lines.clear()
+            self._reset = True
+            self.dropped = 0
+
+    def drain(self):
+        """(pending lines, number dropped since the last drain, clear first)"""
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self.dropped = self.dropped, 0
+            reset, self._reset = self._reset, False
+        return lines, dropped, reset
+
+
+class LogConsole:
+    """Feeds a Text/ScrolledText widget from a LogPipe in batches"""
+
+    def __init__(self, root, widget, max_lines=DEFAULT_MAX_LINES, flush_ms=FLUSH_MS):
+        self.root = root
+        self.widget = widget
+        self.max_lines = max(int(max_lines), MIN_LINES)
+        self.flush_ms = flush_ms
+        self.pipe = LogPipe(self.max_lines)
+        self.paused = tk.BooleanVar(value=False)
+        self.follow = tk.BooleanVar(value=True)
+        self.root.after(self.flush_ms, self._tick)
+
+    def write(self, text):
+        """Queue text for display; safe to call from any thread"""
+        for line in str(text).splitlines():
+            self.pipe.write(line)
+
+    def reset(self):
+        """Clear the console before the next batch; safe to call from any thread"""
+        self.pipe.reset()
+
+    def clear(self):
+        self.pipe.drain()
+        self.widget.delete('1.0', tk.END)
+
+    def create_controls(self, parent):
+        """Pause and Follow checkbuttons, packed to the left of parent"""
+        ttk.Checkbutton(parent, text="⏸️ Pause", variable=self.paused).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(parent, text="⬇️ Follow", variable=self.follow,
+                        command=self._follow_changed).pack(side=tk.LEFT, padx=(0, 10))
+
+    def flush(self):
+        """Show everything pending; runs on the Tk thread"""
+        lines, dropped, reset = self.pipe.drain()
+        if reset:
+            self.widget.delete('1.0', tk.END)
+        if not lines and not dropped:
+            return
+        text = f"... {dropped} lines skipped ...\n" if dropped else ""
+        text += "\n".join(lines) + "\n"
+        self.widget.insert(tk.END, text)
+
+        # The text ends with a newline, so the last line of the widget is empty
+        shown = int(self.widget.index('end-1c').split('.')[0]) - 1
+        if shown > self.max_lines:
+            self.widget.delete('1.0', f"{shown - self.max_lines + 1}.0")
+        if self.follow.get():
+            self.widget.see(tk.END)
+
+    def _follow_changed(self):
+        if self.follow.get():
+            self.widget.see(tk.END)
+
+    def _tick(self):
+        try:
+            if not self.paused.get():
+                self.flush()
+        except tk.TclError:
+            # The widget is gone; the window is closing
+            return
+        self.root.after(self.flush_ms, self._tick)
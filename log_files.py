@@ -0,0 +1,107 @@
+"""
+Server log files
+Besides the console, the server writes its log to helpdesk.log in
+HELPDESK_LOG_DIR (default instance/logs). The file is rotated at
+HELPDESK_LOG_MAX_MB, keeping HELPDESK_LOG_BACKUPS old files, and
+HELPDESK_LOG_LEVEL sets its level (default INFO). Every record starts with a
+timestamp and level, which the launcher's log viewer filters and seeks on.
+
+All gunicorn workers append to the same file. Before each write a worker
+reopens the file if another worker has rotated it, and rollovers are
+serialised with a lock file where fcntl is available.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+try:
+    import fcntl
+except ImportError:  # Windows runs a single server process
+    fcntl = None
+
+LOG_FILENAME = 'helpdesk.log'
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+DEFAULT_LEVEL = 'INFO'
+DEFAULT_MAX_MB = 20
+DEFAULT_BACKUPS = 5
+
+
+@contextmanager
+def _locked(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that several processes can write and rotate"""
+
+    _identity = None
+
+    def _open(self):
+        stream = super()._open()
+        stat = os.fstat(stream.fileno())
+        self._identity = (stat.st_dev, stat.st_ino)
+        return stream
+
+    def _rotated_elsewhere(self):
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        return (stat.st_dev, stat.st_ino) != self._identity
+
+    def _reopen(self):
+        if self.stream:
+            self.stream.close()
+        self.stream = self._open()
+
+    def emit(self, record):
+        if self.stream is not None and self._rotated_elsewhere():
+            self.acquire()
+            try:
+                self._reopen()
+            finally:
+                self.release()
+        super().emit(record)
+
+    def doRollover(self):
+        with _locked(self.baseFilename + '.lock'):
+            # Another worker may have rotated while we waited for the lock
+            if self.stream is not None and self._rotated_elsewhere():
+                self._reopen()
+                return
+            super().doRollover()
+
+
+def log_path(app):
+    directory = os.environ.get("HELPDESK_LOG_DIR") or os.path.join(app.instance_path, 'logs')
+    return os.path.join(directory, LOG_FILENAME)
+
+
+def configure(app):
+    """Add the log file handler to the root logger, once per process"""
+    root = logging.getLogger()
+    if any(isinstance(handler, SharedRotatingFileHandler) for handler in root.handlers):
+        return
+    path = log_path(app)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = SharedRotatingFileHandler(
+            path, encoding='utf-8',
+            maxBytes=int(float(os.environ.get("HELPDESK_LOG_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+            backupCount=int(os.environ.get("HELPDESK_LOG_BACKUPS", DEFAULT_BACKUPS)))
+    except OSError as e:
+        logging.error(f"Cannot write log file {path}: {e}")
+        return
+    handler.setLevel(os.environ.get("HELPDESK_LOG_LEVEL", DEFAULT_LEVEL).upper())
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
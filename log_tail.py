@@ -0,0 +1,352 @@
+"""
+Incremental viewer for the server's rotating log files
+Used by the professional launcher's Logs tab; nothing here touches Tk.
+
+LogTailer follows helpdesk.log by seeking to the last offset and reading only
+the new bytes. It notices rotation by the file's inode and finishes the old
+file before switching. On open it starts TAIL_START_BYTES from the end, so a
+multi-GB log is never read whole.
+
+Jump-to-time binary-searches the file by byte offset: each probe seeks, skips
+to the next line and parses its timestamp. Probes are kept in a sparse
+per-file TimeIndex, so later jumps start from a narrower range. Older times
+are looked up in the rotated files (helpdesk.log.1, .2, ...).
+
+LogViewer runs tailing, filtering and jumps on a background thread and
+writes the matching lines to a sink: a log_console.LogConsole with write()
+and reset().
+"""
+
+import bisect
+import os
+import queue
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+
+# log_files.LOG_FORMAT: "2026-01-31 14:05:09,123 INFO [4242] root: message"
+RECORD_RE = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)[,.]\d+ (DEBUG|INFO|WARNING|ERROR|CRITICAL) ')
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+TAIL_START_BYTES = 256 * 1024
+MAX_READ_BYTES = 4 * 1024 * 1024
+SCAN_BYTES = 64 * 1024
+HISTORY_LINES = 20000
+WINDOW_LINES = 5000
+POLL_SECONDS = 0.5
+
+
+def parse_record(line):
+    """(timestamp, level) of a record's first line, or (None, None) for continuations"""
+    match = RECORD_RE.match(line)
+    if not match:
+        return None, None
+    return datetime.strptime(match.group(1), TIMESTAMP_FORMAT), match.group(2)
+
+
+def _timestamp(raw):
+    match = RECORD_RE.match(raw.decode('utf-8', 'replace'))
+    return datetime.strptime(match.group(1), TIMESTAMP_FORMAT) if match else None
+
+
+def parse_time(text, today=None):
+    """Datetime from "YYYY-MM-DD HH:MM[:SS]" or "HH:MM[:SS]" (today)"""
+    text = text.strip()
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            clock = datetime.strptime(text, fmt).time()
+            return datetime.combine(today or datetime.now().date(), clock)
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised time: {text}")
+
+
+def log_files(path):
+    """The current log file and its rotated predecessors, newest first"""
+    files = [path] if os.path.exists(path) else []
+    number = 1
+    while os.path.exists(f"{path}.{number}"):
+        files.append(f"{path}.{number}")
+        number += 1
+    return files
+
+
+class LogFilter:
+    """Minimum level and case-insensitive text match"""
+
+    def __init__(self, level='DEBUG', text=''):
+        self.min_level = LEVELS.get(level, 0)
+        self.text = text.strip().lower()
+
+    def matches(self, line, level):
+        if LEVELS.get(level, 0) < self.min_level:
+            return False
+        return not self.text or self.text in line.lower()
+
+
+class LogTailer:
+    """Returns the complete lines appended to a log file since the last call"""
+
+    def __init__(self, path, start_bytes=TAIL_START_BYTES):
+        self.path = path
+        self.start_bytes = start_bytes
+        self._file = None
+        self._identity = None
+        self._partial = b''
+
+    def _open(self, from_end):
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(self._file.fileno())
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._partial = b''
+        if from_end and stat.st_size > self.start_bytes:
+            self._file.seek(stat.st_size - self.start_bytes)
+            self._file.readline()  # drop the partial first line
+        return True
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        self._file = None
+
+    def read_new(self):
+        if self._file is None and not self._open(from_end=True):
+            return []
+        data = self._file.read(MAX_READ_BYTES)
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if not data and stat is not None:
+            if (stat.st_dev, stat.st_ino) != self._identity:
+                # Rotated: the old file is finished, continue with the new one from its start
+                self.close()
+                self._open(from_end=False)
+                data = self._file.read(MAX_READ_BYTES)
+            elif stat.st_size < self._file.tell():
+                # Truncated in place
+                self._file.seek(0)
+                self._partial = b''
+                data = self._file.read(MAX_READ_BYTES)
+
+        if not data:
+            return []
+        chunks = (self._partial + data).split(b'\n')
+        self._partial = chunks.pop()
+        return [chunk.decode('utf-8', 'replace').rstrip('\r') for chunk in chunks]
+
+
+def next_record(f, start, end):
+    """(offset, timestamp) of the first record starting in [start, end), or None"""
+    f.seek(start)
+    if start:
+        f.readline()  # start is probably mid-line
+    while True:
+        offset = f.tell()
+        if offset >= end:
+            return None
+        raw = f.readline()
+        if not raw:
+            return None
+        timestamp = _timestamp(raw)
+        if timestamp is not None:
+            return offset, timestamp
+
+
+class TimeIndex:
+    """Sparse (timestamp, offset) points of one log file, filled in by searches"""
+
+    def __init__(self):
+        self.offsets = []
+        self.times = []
+
+    def add(self, offset, timestamp):
+        position = bisect.bisect_left(self.offsets, offset)
+        if position < len(self.offsets) and self.offsets[position] == offset:
+            return
+        self.offsets.insert(position, offset)
+        self.times.insert(position, timestamp)
+
+    def _probe(self, f, start, end):
+        probe = next_record(f, start, end)
+        if probe is not None:
+            self.add(*probe)
+        return probe
+
+    def find(self, f, size, when):
+        """Offset of the first record at or after when"""
+        # Known points bound the search: records before lo are older, from hi on newer
+        position = bisect.bisect_left(self.times, when)
+        lo = self.offsets[position - 1] if position else 0
+        hi = self.offsets[position] if position < len(self.offsets) else size
+
+        while hi - lo > SCAN_BYTES:
+            mid = (lo + hi) // 2
+            probe = self._probe(f, mid, hi)
+            if probe is None:
+                hi = mid
+            elif probe[1] < when:
+                lo = probe[0]
+            else:
+                hi = probe[0]
+
+        f.seek(lo)
+        while f.tell() < hi:
+            offset = f.tell()
+            raw = f.readline()
+            if not raw:
+                break
+            timestamp = _timestamp(raw)
+            if timestamp is not None and timestamp >= when:
+                return offset
+        return hi
+
+
+class LogViewer:
+    """Background tail, filter and jump-to-time over a log file, feeding a sink"""
+
+    def __init__(self, path, sink, on_status=None):
+        self.path = path
+        self.sink = sink
+        self.on_status = on_status
+        self.enabled = True
+        self.filter = LogFilter()
+        self.history = deque(maxlen=HISTORY_LINES)  # (level, line) of the live tail
+        self._tailer = LogTailer(path)
+        self._indexes = {}
+        self._jump = None
+        self._last_level = None
+        self._commands = queue.Queue()
+        self._thread = None
+
+    # Called from the Tk thread
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='log-viewer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._commands.put(('stop', None))
+
+    def set_filter(self, level, text):
+        self._commands.put(('filter', LogFilter(level, text)))
+
+    def jump_to(self, when):
+        self._commands.put(('jump', when))
+
+    def live(self):
+        self._commands.put(('live', None))
+
+    # Background thread
+    def _status(self, text):
+        if self.on_status:
+            self.on_status(text)
+
+    def _run(self):
+        while True:
+            try:
+                command, value = self._commands.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                command = None
+            try:
+                if command == 'stop':
+                    self._tailer.close()
+                    return
+                elif command == 'filter':
+                    self.filter = value
+                    if self._jump:
+                        self._show_jump()
+                    else:
+                        self._replay()
+                elif command == 'jump':
+                    self._jump = value
+                    self._show_jump()
+                elif command == 'live':
+                    self._jump = None
+                    self._replay()
+                if self.enabled:
+                    self._tail()
+            except OSError as e:
+                self._status(f"Log read error: {e}")
+
+    def _tail(self):
+        for line in self._tailer.read_new():
+            timestamp, level = parse_record(line)
+            if level is None:
+                level = self._last_level  # traceback and other continuation lines
+            self._last_level = level
+            self.history.append((level, line))
+            if self._jump is None and self.filter.matches(line, level):
+                self.sink.write(line)
+
+    def _replay(self):
+        self.sink.reset()
+        shown = 0
+        for level, line in self.history:
+            if self.filter.matches(line, level):
+                self.sink.write(line)
+                shown += 1
+        self._status(f"Live: {shown} of the last {len(self.history)} lines")
+
+    def _locate(self, when):
+        """Log file holding when: the newest one that starts at or before it"""
+        files = log_files(self.path)
+        for path in files:
+            with open(path, 'rb') as f:
+                first = next_record(f, 0, os.fstat(f.fileno()).st_size)
+            if first is not None and first[1] <= when:
+                return path
+        return files[-1] if files else None
+
+    def _show_jump(self):
+        when = self._jump
+        path = self._locate(when)
+        self.sink.reset()
+        if path is None:
+            self._status("No log file yet")
+            return
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            index = self._indexes.setdefault((stat.st_dev, stat.st_ino), TimeIndex())
+            f.seek(index.find(f, stat.st_size, when))
+            shown = read = 0
+            level = None
+            while read < WINDOW_LINES:
+                raw = f.readline()
+                if not raw:
+                    break
+                read += 1
+                line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+                level = parse_record(line)[1] or level
+                if self.filter.matches(line, level):
+                    self.sink.write(line)
+                    shown += 1
+        self._status(f"From {when:%Y-%m-%d %H:%M:%S} in {os.path.basename(path)}: "
+                     f"{shown} of {read} lines (Live to resume tailing)")
+
+
+def export(path, destination, log_filter):
+    """Copy the matching lines of every log file, oldest first; returns the count"""
+    written = 0
+    level = None
+    with open(destination, 'w', encoding='utf-8') as out:
+        for source in reversed(log_files(path)):
+            with open(source, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    level = parse_record(line)[1] or level
+                    if log_filter.matches(line, level):
+                        out.write(line)
+                        written += 1
+    return written
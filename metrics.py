@@ -0,0 +1,53 @@
+"""
+In-process metrics registry for the IT Helpdesk server
+Counters are incremented by application code; collectors are called on demand
+and return a dict of gauges (pool statistics, cache sizes, ...)
+"""
+
+import threading
+import time
+
+_lock = threading.Lock()
+_counters = {}
+_collectors = {}
+_started_at = time.time()
+
+
+def incr(name, amount=1):
+    """Increment a named counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def register_collector(name, func):
+    """Register a callable returning a dict of gauges under the given name"""
+    with _lock:
+        _collectors[name] = func
+
+
+def unregister_collector(name):
+    """Remove a previously registered collector"""
+    with _lock:
+        _collectors.pop(name, None)
+
+
+def uptime_seconds():
+    return round(time.time() - _started_at, 1)
+
+
+def snapshot():
+    """Return all counters and the current output of every collector"""
+    with _lock:
+        counters = dict(_counters)
+        collectors = list(_collectors.items())
+
+    data = {
+        'uptime_seconds': uptime_seconds(),
+        'counters': counters,
+    }
+    for name, func in collectors:
+        try:
+            data[name] = func()
+        except Exception as e:
+            data[name] = {'error': str(e)}
+    return data
@@ -0,0 +1,247 @@
+"""
+Schema migrations for the IT Helpdesk database
+db.create_all() only creates tables that are missing; changes to existing
+tables are applied here, in order, at startup. The version reached is kept in
+the schema_version table. A database created from scratch already has the
+current schema and is stamped with the latest version.
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import (Integer, MetaData, Table, bindparam, case, delete, func, insert, inspect, null,
+                        select, update)
+from sqlalchemy.schema import AddConstraint, CreateColumn
+
+from coded_enums import ENUMS, lookup_rows
+from models import EnumCode, SchemaVersion
+
+# Coded columns per table, with the enum each one holds
+CODED_COLUMNS = {
+    'users': {'role': 'user_role'},
+    'tickets': {'status': 'ticket_status', 'priority': 'ticket_priority', 'category': 'ticket_category'},
+    'tickets_archive': {'status': 'ticket_status', 'priority': 'ticket_priority',
+                        'category': 'ticket_category'},
+}
+
+
+def migrate_coded_enums(conn, metadata):
+    """Convert string status/priority/category/role columns to SMALLINT codes"""
+    inspector = inspect(conn)
+    for table_name, columns in CODED_COLUMNS.items():
+        if not inspector.has_table(table_name):
+            continue
+        types = {column['name']: column['type'] for column in inspector.get_columns(table_name)}
+        pending = {name: ENUMS[enum_name] for name, enum_name in columns.items()
+                   if not isinstance(types[name], Integer)}
+        if not pending:
+            continue
+
+        old = Table(table_name, MetaData(), autoload_with=conn)
+        _log_unknown_values(conn, old, pending)
+        if conn.dialect.name == 'sqlite':
+            _rebuild_sqlite_table(conn, metadata.tables[table_name], old, pending)
+        else:
+            _alter_columns(conn, metadata.tables[table_name], old, pending)
+        logging.info(f"Converted {', '.join(pending)} of {table_name} to coded columns")
+
+
+SLA_COLUMNS = ('first_response_at', 'response_due_at', 'resolution_due_at',
+               'response_breached', 'resolution_breached')
+
+
+def add_sla_deadlines(conn, metadata):
+    """Add SLA deadline columns to tickets and the archive, filled in from created_at"""
+    import sla
+
+    for table_name in ('tickets', 'tickets_archive'):
+        table = metadata.tables[table_name]
+        _add_missing_columns(conn, table, SLA_COLUMNS)
+
+        rows = conn.execute(select(table.c.id, table.c.priority, table.c.created_at)
+                            .where(table.c.response_due_at.is_(None), table.c.created_at.is_not(None))).all()
+        updates = []
+        for row in rows:
+            response_due_at, resolution_due_at = sla.deadlines_for(row.priority, row.created_at)
+            updates.append({'ticket_id': row.id, 'response_due_at': response_due_at,
+                            'resolution_due_at': resolution_due_at})
+        if updates:
+            conn.execute(update(table).where(table.c.id == bindparam('ticket_id'))
+                         .values(response_due_at=bindparam('response_due_at'),
+                                 resolution_due_at=bindparam('resolution_due_at')), updates)
+        logging.info(f"Computed SLA deadlines for {len(updates)} rows of {table_name}")
+
+    _create_missing_indexes(conn, metadata.tables['tickets'])
+
+
+def add_updated_at_index(conn, metadata):
+    """Index tickets.updated_at for the rollup job's watermark scans"""
+    _create_missing_indexes(conn, metadata.tables['tickets'])
+
+
+def add_comment_page_indexes(conn, metadata):
+    """Index comments by (ticket_id, created_at, id) for paginated threads"""
+    for table_name in ('ticket_comments', 'ticket_comments_archive'):
+        _create_missing_indexes(conn, metadata.tables[table_name])
+
+
+def build_resolution_sketches(conn, metadata):
+    """Fill resolution_sketches from what the rollup job has already counted"""
+    import rollups
+    import sketches
+
+    states = metadata.tables['ticket_rollup_state']
+    deltas = {}
+    for row in conn.execute(select(states).where(states.c.closed_at.is_not(None))):
+        rollups.add_sketch_deltas(deltas, (row.created_at, row.closed_at, row.category, row.priority,
+                                           row.assigned_to or 0), 1)
+    sketches.apply_sketch_deltas(conn, deltas)
+    logging.info(f"Built {len(deltas)} resolution-time sketches")
+
+
+def start_ticket_history(conn, metadata):
+    """Give existing tickets time-in-status stats, starting from their last update"""
+    stats = metadata.tables['ticket_state_stats']
+    for table_name in ('tickets', 'tickets_archive'):
+        tickets = metadata.tables[table_name]
+        known = select(stats.c.ticket_id)
+        conn.execute(insert(stats).from_select(
+            ['ticket_id', 'status', 'status_since', 'assignments'],
+            select(tickets.c.id, tickets.c.status,
+                   func.coalesce(tickets.c.updated_at, tickets.c.created_at, datetime.utcnow()),
+                   case((tickets.c.assigned_to.is_not(None), 1), else_=0))
+            .where(tickets.c.id.not_in(known))))
+
+
+# Applied in order; each function receives a connection inside a transaction
+MIGRATIONS = [
+    (1, "Store status, priority, category and role as coded SMALLINTs", migrate_coded_enums),
+    (2, "Add SLA deadlines to tickets", add_sla_deadlines),
+    (3, "Index tickets.updated_at", add_updated_at_index),
+    (4, "Build resolution-time sketches", build_resolution_sketches),
+    (5, "Index comments for paginated threads", add_comment_page_indexes),
+    (6, "Start time-in-status stats for existing tickets", start_ticket_history),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _add_missing_columns(conn, table, names):
+    """ALTER TABLE ... ADD COLUMN for the named columns the database lacks"""
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    quote = conn.dialect.identifier_preparer.quote
+    for name in names:
+        if name not in existing:
+            ddl = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {quote(table.name)} ADD COLUMN {ddl}")
+
+
+def _create_missing_indexes(conn, table):
+    existing = {index['name'] for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(conn)
+
+
+def _code_case(column, coded, fallback, as_text=False):
+    """CASE expression turning the stored names into codes"""
+    whens = [(column.is_(None), null())]
+    for name in coded.names:
+        code = coded.code_for(name)
+        whens.append((column == name, str(code) if as_text else code))
+    fallback_code = coded.code_for(fallback)
+    return case(*whens, else_=str(fallback_code) if as_text else fallback_code)
+
+
+def _log_unknown_values(conn, old, pending):
+    for name, (coded, fallback) in pending.items():
+        column = old.c[name]
+        rows = conn.execute(select(column, func.count()).where(column.is_not(None),
+                                                               column.not_in(coded.names))
+                            .group_by(column)).all()
+        for value, count in rows:
+            logging.warning(f"{old.name}.{name}: {count} rows hold unknown value {value!r}, "
+                            f"stored as {fallback!r}")
+
+
+def _rebuild_sqlite_table(conn, table, old, pending):
+    """SQLite cannot change a column type: copy into a new table and swap it in"""
+    for index in inspect(conn).get_indexes(table.name):
+        conn.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+
+    # Copy every table so foreign keys of the new one still resolve
+    scratch = MetaData()
+    for existing in table.metadata.sorted_tables:
+        existing.to_metadata(scratch)
+    new = table.to_metadata(scratch, name=f"{table.name}_migrating")
+    new.create(conn)
+
+    names = [column.name for column in new.columns if column.name in old.c]
+    values = [_code_case(old.c[name], *pending[name]) if name in pending else old.c[name]
+              for name in names]
+    conn.execute(insert(new).from_select(names, select(*values)))
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{new.name}" RENAME TO "{table.name}"')
+
+
+def _alter_columns(conn, table, old, pending):
+    """Rewrite names as code digits, then change the column type in place"""
+    if conn.dialect.name not in ('postgresql', 'mysql'):
+        raise RuntimeError(f"No coded column migration for {conn.dialect.name}")
+
+    quote = conn.dialect.identifier_preparer.quote
+    for name, (coded, fallback) in pending.items():
+        conn.execute(update(old).values({name: _code_case(old.c[name], coded, fallback, as_text=True)}))
+        if conn.dialect.name == 'postgresql':
+            conn.exec_driver_sql(f"ALTER TABLE {quote(table.name)} ALTER COLUMN {quote(name)} "
+                                 f"TYPE SMALLINT USING {quote(name)}::smallint")
+        else:
+            nullable = "NULL" if table.c[name].nullable else "NOT NULL"
+            conn.exec_driver_sql(f"ALTER TABLE {quote(table.name)} MODIFY {quote(name)} SMALLINT {nullable}")
+        constraint_name = f"ck_{table.name}_{name}"
+        conn.execute(AddConstraint(next(constraint for constraint in table.constraints
+                                        if constraint.name == constraint_name)))
+
+
+def sync_enum_codes(conn):
+    """Make the enum_codes lookup table match coded_enums"""
+    lookup = EnumCode.__table__
+    existing = {(row.enum_name, row.code): row.name for row in conn.execute(select(lookup))}
+    for row in lookup_rows():
+        key = (row['enum_name'], row['code'])
+        if key not in existing:
+            conn.execute(insert(lookup).values(row))
+        elif existing[key] != row['name']:
+            conn.execute(update(lookup).where(lookup.c.enum_name == row['enum_name'],
+                                              lookup.c.code == row['code']).values(name=row['name']))
+
+
+def current_version(conn):
+    """Schema version recorded in the database, or None"""
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return conn.execute(select(func.max(SchemaVersion.__table__.c.version))).scalar()
+
+
+def upgrade(db):
+    """Create missing tables and apply pending migrations on the primary database"""
+    engine = db.engine
+    fresh = not inspect(engine).has_table('tickets')
+    db.create_all(bind_key=None)
+
+    with engine.begin() as conn:
+        version = current_version(conn)
+        if version is None:
+            version = LATEST_VERSION if fresh else 0
+
+        for number, description, migration in MIGRATIONS:
+            if number > version:
+                logging.info(f"Applying migration {number}: {description}")
+                migration(conn, db.metadata)
+                version = number
+
+        versions = SchemaVersion.__table__
+        conn.execute(delete(versions))
+        conn.execute(insert(versions).values(version=version, applied_at=datetime.utcnow()))
+        sync_enum_codes(conn)
+
+    return version
@@ -1,9 +1,11 @@
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from coded_enums import Category, Priority, Role, Status, ticket_constraints
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (Role.check_constraint('role', 'users'),)
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -12,7 +14,7 @@ class User(db.Model):
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     department = db.Column(db.String(100), nullable=True)
-    role = db.Column(db.String(20), default='user')  # user, admin, super_admin
+    role = db.Column(Role, default='user')  # user, admin, super_admin
     is_admin = db.Column(db.Boolean, default=False)
     ip_address = db.Column(db.String(45), nullable=True)  # IPv4/IPv6
     system_name = db.Column(db.String(100), nullable=True)
@@ -48,13 +50,21 @@ class User(db.Model):
 
 class Ticket(db.Model):
     __tablename__ = 'tickets'
+    __table_args__ = (
+        # Lets the archive mover find old closed tickets without a full scan
+        db.Index('ix_tickets_status_updated_at', 'status', 'updated_at'),
+        # Lets the SLA scheduler load the deadlines of active tickets at startup
+        db.Index('ix_tickets_status_resolution_due_at', 'status', 'resolution_due_at'),
+        # Lets the rollup job find tickets changed since its watermark
+        db.Index('ix_tickets_updated_at', 'updated_at'),
+    ) + ticket_constraints('tickets')
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(50), nullable=False)  # Hardware, Software, Network, Other
-    priority = db.Column(db.String(20), nullable=False)  # Low, Medium, High, Critical
-    status = db.Column(db.String(20), nullable=False, default='Open')  # Open, In Progress, Resolved, Closed
+    category = db.Column(Category, nullable=False)  # Hardware, Software, Other
+    priority = db.Column(Priority, nullable=False)  # Low, Medium, High, Critical
+    status = db.Column(Status, nullable=False, default='Open')  # Open, In Progress, Resolved, Closed
     
     # User system information captured at ticket creation
     user_name = db.Column(db.String(100), nullable=False)  # Full name of user who created ticket
@@ -73,8 +83,19 @@ class Ticket(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime, nullable=True)
     
-    # Relationship with comments
-    comments = db.relationship('TicketComment', backref='ticket', lazy=True, cascade='all, delete-orphan')
+    # SLA deadlines, computed from created_at and priority by sla.py
+    first_response_at = db.Column(db.DateTime, nullable=True)
+    response_due_at = db.Column(db.DateTime, nullable=True)
+    resolution_due_at = db.Column(db.DateTime, nullable=True)
+    response_breached = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    resolution_breached = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    
+    # Relationship with comments; write-only so a long thread is never loaded
+    # in full, read pages through comment_threads.py
+    comments = db.relationship('TicketComment', backref='ticket', lazy='write_only',
+                               cascade='all, delete-orphan', passive_deletes=True)
+    
+    is_archived = False
     
     @property
     def ticket_number(self):
@@ -85,6 +106,10 @@ class Ticket(db.Model):
 
 class TicketComment(db.Model):
     __tablename__ = 'ticket_comments'
+    __table_args__ = (
+        # Keyset pagination of a ticket's comments
+        db.Index('ix_ticket_comments_ticket_created_id', 'ticket_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
@@ -93,7 +118,213 @@ class TicketComment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship
-    user = db.relationship('User', backref='comments')
+    user = db.relationship('User', backref=db.backref('comments', lazy='write_only'))
     
     def __repr__(self):
         return f'<Comment {self.id} on Ticket {self.ticket_id}>'
+
+class TicketArchive(db.Model):
+    """Closed tickets moved out of the hot tickets table by archive.py"""
+    __tablename__ = 'tickets_archive'
+    __table_args__ = ticket_constraints('tickets_archive')
+    
+    # Keeps the original ticket id so ticket numbers stay valid
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    category = db.Column(Category, nullable=False)
+    priority = db.Column(Priority, nullable=False)
+    status = db.Column(Status, nullable=False)
+    
+    user_name = db.Column(db.String(100), nullable=False)
+    user_ip_address = db.Column(db.String(45), nullable=True)
+    user_system_name = db.Column(db.String(100), nullable=True)
+    image_filename = db.Column(db.String(255), nullable=True)
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    first_response_at = db.Column(db.DateTime, nullable=True)
+    response_due_at = db.Column(db.DateTime, nullable=True)
+    resolution_due_at = db.Column(db.DateTime, nullable=True)
+    response_breached = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    resolution_breached = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    archived_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    
+    # Read-only views of the same users the live ticket pointed at
+    user = db.relationship('User', foreign_keys=[user_id], viewonly=True)
+    assignee = db.relationship('User', foreign_keys=[assigned_to], viewonly=True)
+    comments = db.relationship('TicketCommentArchive', backref='ticket', lazy='write_only')
+    
+    is_archived = True
+    
+    @property
+    def ticket_number(self):
+        return f"IT-{self.id:06d}"
+    
+    def __repr__(self):
+        return f'<TicketArchive {self.ticket_number}: {self.title}>'
+
+class TicketCommentArchive(db.Model):
+    __tablename__ = 'ticket_comments_archive'
+    __table_args__ = (
+        db.Index('ix_ticket_comments_archive_ticket_created_id', 'ticket_id', 'created_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets_archive.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    comment = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime)
+    
+    user = db.relationship('User', viewonly=True)
+    
+    def __repr__(self):
+        return f'<ArchivedComment {self.id} on Ticket {self.ticket_id}>'
+
+class CategoryTeam(db.Model):
+    """Which admin department handles each ticket category, used by auto_assign.py"""
+    __tablename__ = 'category_teams'
+    __table_args__ = (Category.check_constraint('category', 'category_teams'),)
+    
+    category = db.Column(Category, primary_key=True, autoincrement=False)
+    department = db.Column(db.String(100), nullable=False)
+    
+    def __repr__(self):
+        return f'<CategoryTeam {self.category} -> {self.department}>'
+
+class TicketRollup(db.Model):
+    """Created/resolved counts per time bucket and dimension, maintained by rollups.py"""
+    __tablename__ = 'ticket_rollups'
+    
+    grain = db.Column(db.String(5), primary_key=True)  # day, week, month
+    bucket = db.Column(db.Date, primary_key=True)  # first day of the bucket
+    dimension = db.Column(db.String(10), primary_key=True)  # all, category, priority, assignee
+    value = db.Column(db.String(100), primary_key=True)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    resolved = db.Column(db.Integer, nullable=False, default=0)
+    # Sum of created_at -> resolution times of the tickets resolved in the bucket
+    resolution_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+
+class TicketRollupState(db.Model):
+    """What each ticket last contributed to ticket_rollups, so changes apply as deltas"""
+    __tablename__ = 'ticket_rollup_state'
+    
+    ticket_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    created_at = db.Column(db.DateTime)
+    closed_at = db.Column(db.DateTime)
+    category = db.Column(db.String(50))
+    priority = db.Column(db.String(20))
+    assigned_to = db.Column(db.Integer)
+
+class ResolutionSketch(db.Model):
+    """Monthly resolution-time quantile sketch per dimension value, maintained by rollups.py"""
+    __tablename__ = 'resolution_sketches'
+    
+    bucket = db.Column(db.Date, primary_key=True)  # first day of the month resolved
+    dimension = db.Column(db.String(10), primary_key=True)  # category, priority, assignee
+    value = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)  # sketches.DDSketch.to_bytes()
+
+class JobWatermark(db.Model):
+    """High-water mark of a background job, e.g. the last updated_at rolled up"""
+    __tablename__ = 'job_watermarks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.DateTime, nullable=False)
+    # Id of the last row processed at that timestamp, for keyset scans
+    position = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TicketEvent(db.Model):
+    """Append-only record of a ticket field change, written by ticket_history.py"""
+    __tablename__ = 'ticket_events'
+    __table_args__ = (
+        db.Index('ix_ticket_events_ticket_created_id', 'ticket_id', 'created_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_id = db.Column(db.Integer, nullable=False)  # no foreign key: tickets move to the archive
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # None for system changes
+    field = db.Column(db.String(30), nullable=False)  # created, status, priority, category, assigned_to, title
+    old_value = db.Column(db.String(255), nullable=True)
+    new_value = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class TicketStateStats(db.Model):
+    """Per-ticket time-in-status and reassignment totals, kept up to date with ticket_events"""
+    __tablename__ = 'ticket_state_stats'
+    
+    ticket_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(Status, nullable=False)  # current status
+    status_since = db.Column(db.DateTime, nullable=False)
+    # Seconds spent in each status before the current stretch
+    seconds_open = db.Column(db.BigInteger, nullable=False, default=0)
+    seconds_in_progress = db.Column(db.BigInteger, nullable=False, default=0)
+    seconds_resolved = db.Column(db.BigInteger, nullable=False, default=0)
+    seconds_closed = db.Column(db.BigInteger, nullable=False, default=0)
+    assignments = db.Column(db.Integer, nullable=False, default=0)  # times given an assignee
+    reassignments = db.Column(db.Integer, nullable=False, default=0)  # times taken from an assignee
+
+class OutboxMessage(db.Model):
+    """Notification waiting to be sent, written in the same transaction as its change (notifications.py)"""
+    __tablename__ = 'outbox'
+    __table_args__ = (
+        # Lets the dispatcher find due messages without a full scan
+        db.Index('ix_outbox_sent_at_available_at', 'sent_at', 'available_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    event = db.Column(db.String(30), nullable=False)  # assigned, status_changed, comment, sla_breach
+    ticket_id = db.Column(db.Integer, nullable=True)  # no foreign key: tickets move to the archive
+    payload = db.Column(db.Text, nullable=False)  # JSON details of the event
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # next attempt
+    claim_token = db.Column(db.String(32), nullable=True)  # dispatcher currently sending it
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(500), nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    failed_at = db.Column(db.DateTime, nullable=True)  # gave up after MAX_ATTEMPTS
+
+class Blob(db.Model):
+    """Stored upload: size and SHA-256 of the content under a key (blob_storage.py)"""
+    __tablename__ = 'blobs'
+    
+    key = db.Column(db.String(255), primary_key=True)  # e.g. 20250101_120000_photo.png, archive/...
+    backend = db.Column(db.String(20), nullable=False)  # local, shared, database
+    size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    content_type = db.Column(db.String(100), nullable=True)
+    chunk_count = db.Column(db.Integer, nullable=False, default=0)  # database backend only
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BlobChunk(db.Model):
+    """Piece of an upload kept by the database blob backend"""
+    __tablename__ = 'blob_chunks'
+    
+    key = db.Column(db.String(255), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    data = db.Column(db.LargeBinary(length=256 * 1024), nullable=False)
+
+class EnumCode(db.Model):
+    """Lookup table naming the codes stored in coded columns, for SQL reporting"""
+    __tablename__ = 'enum_codes'
+    
+    enum_name = db.Column(db.String(30), primary_key=True)
+    code = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(50), nullable=False)
+    
+    def __repr__(self):
+        return f'<EnumCode {self.enum_name}.{self.code}={self.name}>'
+
+class SchemaVersion(db.Model):
+    """Single row holding the schema version reached by migrations.py"""
+    __tablename__ = 'schema_version'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
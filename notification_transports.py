@@ -0,0 +1,102 @@
+"""
+Delivery transports for notification digests
+A transport takes a Digest and delivers it, raising on failure so the
+dispatcher retries later. Choose one with HELPDESK_NOTIFY_TRANSPORT:
+  smtp     HELPDESK_SMTP_HOST, HELPDESK_SMTP_PORT, HELPDESK_SMTP_USER,
+           HELPDESK_SMTP_PASSWORD, HELPDESK_SMTP_STARTTLS, HELPDESK_MAIL_FROM
+  maildir  writes each digest into HELPDESK_MAILDIR (default instance/mail);
+           the default, handy for testing
+  webhook  POSTs the digest as JSON to HELPDESK_WEBHOOK_URL
+Other transports can be added with register_transport().
+"""
+
+import mailbox
+import os
+import smtplib
+from collections import namedtuple
+from email.message import EmailMessage
+
+import requests
+
+from app import app
+
+DEFAULT_TRANSPORT = 'maildir'
+DEFAULT_SENDER = 'helpdesk@localhost'
+
+# One message to one recipient, covering one or more outbox events
+Digest = namedtuple('Digest', 'recipient_email recipient_name subject body events')
+
+
+def _sender():
+    return os.environ.get("HELPDESK_MAIL_FROM", DEFAULT_SENDER)
+
+
+def to_email(digest, sender):
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = f"{digest.recipient_name} <{digest.recipient_email}>"
+    message['Subject'] = digest.subject
+    message.set_content(digest.body)
+    return message
+
+
+class SmtpTransport:
+    """Sends digests through an SMTP relay"""
+
+    def __init__(self):
+        self.host = os.environ.get("HELPDESK_SMTP_HOST", "localhost")
+        self.port = int(os.environ.get("HELPDESK_SMTP_PORT", "25"))
+        self.user = os.environ.get("HELPDESK_SMTP_USER")
+        self.password = os.environ.get("HELPDESK_SMTP_PASSWORD")
+        self.starttls = os.environ.get("HELPDESK_SMTP_STARTTLS", "0") == "1"
+
+    def send(self, digest):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password or '')
+            smtp.send_message(to_email(digest, _sender()))
+
+
+class MaildirTransport:
+    """Writes digests into a local Maildir instead of sending them"""
+
+    def __init__(self):
+        self.path = os.environ.get("HELPDESK_MAILDIR") or os.path.join(app.instance_path, 'mail')
+        self.maildir = mailbox.Maildir(self.path, create=True)
+
+    def send(self, digest):
+        self.maildir.add(to_email(digest, _sender()))
+
+
+class WebhookTransport:
+    """POSTs digests as JSON, e.g. to a chat or ticketing integration"""
+
+    def __init__(self):
+        self.url = os.environ.get("HELPDESK_WEBHOOK_URL")
+        if not self.url:
+            raise RuntimeError("HELPDESK_WEBHOOK_URL is not set")
+
+    def send(self, digest):
+        response = requests.post(self.url, json=digest._asdict(), timeout=10)
+        response.raise_for_status()
+
+
+TRANSPORTS = {
+    'smtp': SmtpTransport,
+    'maildir': MaildirTransport,
+    'webhook': WebhookTransport,
+}
+
+
+def register_transport(name, factory):
+    """Make a transport available to HELPDESK_NOTIFY_TRANSPORT"""
+    TRANSPORTS[name] = factory
+
+
+def get_transport(name=None):
+    name = name or os.environ.get("HELPDESK_NOTIFY_TRANSPORT", DEFAULT_TRANSPORT)
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown notification transport: {name}")
+    return TRANSPORTS[name]()
@@ -0,0 +1,331 @@
+"""
+Ticket notifications through a transactional outbox
+Assignments, status changes and comments add rows to the outbox table from
+session events, inside the same transaction as the change itself, so a
+notification exists exactly when its change was committed and no request
+waits on SMTP. SLA breaches are added by a listener on sla.on_breach.
+
+A background dispatcher drains the outbox in batches. Messages wait
+DIGEST_DELAY_SECONDS first, and all due messages of one recipient go out
+as a single digest. Failed deliveries are retried with exponential backoff
+and given up after MAX_ATTEMPTS. Dispatchers in several workers claim
+batches with a token, so each message is sent by one of them.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask import has_request_context, session as user_session
+from sqlalchemy import bindparam, delete, event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app import app, db
+from models import OutboxMessage, Ticket, TicketComment, User
+import admin_roster
+import metrics
+import notification_transports
+import sla
+import write_queue
+
+# Messages wait this long so a burst of changes goes out as one digest
+DIGEST_DELAY_SECONDS = 60
+DISPATCH_INTERVAL_SECONDS = 15
+BATCH_SIZE = 200
+# A claimed batch is handed to another dispatcher if not finished in time
+CLAIM_SECONDS = 300
+
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 6 * 3600
+
+RETENTION_DAYS = 7
+COMMENT_EXCERPT_LENGTH = 300
+
+_thread = None
+
+
+def is_enabled():
+    return os.environ.get("HELPDESK_NOTIFICATIONS", "1") != "0"
+
+
+def current_actor():
+    """Id of the user making the current request, or None"""
+    return user_session.get('user_id') if has_request_context() else None
+
+
+def _row(recipient_id, event_name, ticket_id, payload, now):
+    return {'recipient_id': recipient_id, 'event': event_name, 'ticket_id': ticket_id,
+            'payload': json.dumps(payload), 'created_at': now,
+            'available_at': now + timedelta(seconds=DIGEST_DELAY_SECONDS), 'attempts': 0}
+
+
+def ticket_change_rows(ticket_id, title, owner_id, old_status, new_status, old_assignee, new_assignee,
+                       actor_id, now):
+    """Outbox rows for a ticket's status and assignee change; nobody is told of their own change"""
+    rows = []
+    details = {'title': title, 'actor_id': actor_id}
+    if new_assignee and new_assignee != old_assignee and new_assignee != actor_id:
+        rows.append(_row(new_assignee, 'assigned', ticket_id, details, now))
+    if old_status is not None and new_status != old_status:
+        for recipient_id in {owner_id, new_assignee} - {None, actor_id}:
+            rows.append(_row(recipient_id, 'status_changed', ticket_id,
+                             dict(details, old=old_status, new=new_status), now))
+    return rows
+
+
+def record_bulk_changes(session, before, status, assigned_to, actor_id):
+    """Outbox rows for a set-based update, from the (id, title, user_id, status, assigned_to) rows before it"""
+    if not is_enabled():
+        return
+    now = datetime.utcnow()
+    rows = []
+    for ticket in before:
+        new_assignee = ticket.assigned_to if assigned_to is None else (assigned_to or None)
+        if status is not None:
+            new_status = status
+        elif assigned_to and ticket.status == 'Open':
+            new_status = 'In Progress'
+        else:
+            new_status = ticket.status
+        rows += ticket_change_rows(ticket.id, ticket.title, ticket.user_id, ticket.status, new_status,
+                                   ticket.assigned_to, new_assignee, actor_id, now)
+    if rows:
+        session.execute(insert(OutboxMessage.__table__), rows)
+        metrics.incr('notifications.recorded', len(rows))
+
+
+def _history(obj, key):
+    """(old, new) value of an attribute in the current flush; old is None if it was not loaded"""
+    attribute = inspect(obj).attrs[key]
+    history = attribute.history
+    if history.deleted:
+        return history.deleted[0], attribute.value
+    if history.added:
+        return None, history.added[0]
+    return attribute.value, attribute.value
+
+
+@event.listens_for(Session, "after_flush")
+def _record_notifications(session, flush_context):
+    if not is_enabled():
+        return
+    now = datetime.utcnow()
+    actor_id = current_actor()
+    rows = []
+
+    for obj in session.new:
+        if isinstance(obj, Ticket):
+            rows += ticket_change_rows(obj.id, obj.title, obj.user_id, None, obj.status, None, obj.assigned_to,
+                                       actor_id or obj.user_id, now)
+        elif isinstance(obj, TicketComment):
+            ticket = session.get(Ticket, obj.ticket_id)
+            if ticket is None:
+                continue
+            details = {'title': ticket.title, 'actor_id': obj.user_id,
+                       'excerpt': (obj.comment or '')[:COMMENT_EXCERPT_LENGTH]}
+            for recipient_id in {ticket.user_id, ticket.assigned_to} - {None, obj.user_id}:
+                rows.append(_row(recipient_id, 'comment', ticket.id, details, now))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Ticket) or not session.is_modified(obj):
+            continue
+        old_status, new_status = _history(obj, 'status')
+        old_assignee, new_assignee = _history(obj, 'assigned_to')
+        rows += ticket_change_rows(obj.id, obj.title, obj.user_id, old_status, new_status,
+                                   old_assignee, new_assignee, actor_id, now)
+
+    if rows:
+        session.execute(insert(OutboxMessage.__table__), rows)
+        metrics.incr('notifications.recorded', len(rows))
+
+
+@sla.on_breach
+def _record_breach(ticket_id, kind, due_at):
+    if not is_enabled():
+        return
+    with app.app_context():
+        try:
+            ticket = db.session.get(Ticket, ticket_id)
+            if ticket is None:
+                return
+            if ticket.assigned_to:
+                recipients = [ticket.assigned_to]
+            else:
+                recipients = [entry.id for entry in admin_roster.admins() if entry.role == 'super_admin']
+            now = datetime.utcnow()
+            details = {'title': ticket.title, 'kind': kind, 'due_at': due_at.strftime('%Y-%m-%d %H:%M')}
+            rows = [_row(recipient_id, 'sla_breach', ticket_id, details, now) for recipient_id in recipients]
+            if rows:
+                write_queue.run_write(db.session, lambda session: session.execute(
+                    insert(OutboxMessage.__table__), rows))
+                metrics.incr('notifications.recorded', len(rows))
+        finally:
+            db.session.remove()
+
+
+def _describe(message, payload, names):
+    ticket = f"IT-{message.ticket_id:06d}" if message.ticket_id else "Ticket"
+    title = payload.get('title', '')
+    actor = names.get(payload.get('actor_id'))
+    by = f" by {actor}" if actor else ""
+    if message.event == 'assigned':
+        return f"{ticket} {title}: assigned to you{by}"
+    if message.event == 'status_changed':
+        return f"{ticket} {title}: status changed from {payload.get('old')} to {payload.get('new')}{by}"
+    if message.event == 'comment':
+        return f"{ticket} {title}: new comment{by}\n    {payload.get('excerpt', '')}"
+    if message.event == 'sla_breach':
+        return f"{ticket} {title}: SLA {payload.get('kind')} deadline missed (due {payload.get('due_at')} UTC)"
+    return f"{ticket} {title}: {message.event}"
+
+
+def build_digest(recipient, messages, names):
+    """One Digest covering all of a recipient's messages"""
+    base_url = os.environ.get("HELPDESK_BASE_URL", "").rstrip('/')
+    lines = []
+    events = []
+    for message in messages:
+        payload = json.loads(message.payload)
+        line = _describe(message, payload, names)
+        if base_url and message.ticket_id:
+            line += f"\n    {base_url}/ticket/{message.ticket_id}"
+        lines.append(f"- {line}")
+        events.append({'event': message.event, 'ticket_id': message.ticket_id, 'details': payload})
+
+    if len(lines) == 1:
+        subject = f"IT Helpdesk: {lines[0][2:].splitlines()[0]}"
+    else:
+        subject = f"IT Helpdesk: {len(lines)} ticket updates"
+    body = (f"Hello {recipient.first_name},\n\n" + "\n".join(lines)
+            + "\n\nThis is an automated message from the IT Helpdesk.\n")
+    return notification_transports.Digest(recipient.email, f"{recipient.first_name} {recipient.last_name}",
+                                          subject, body, events)
+
+
+def _claim_batch(session, token, now):
+    outbox = OutboxMessage.__table__
+    due = (outbox.c.sent_at.is_(None), outbox.c.failed_at.is_(None), outbox.c.available_at <= now)
+    ids = session.execute(select(outbox.c.id).where(*due).order_by(outbox.c.id).limit(BATCH_SIZE)).scalars().all()
+    if not ids:
+        return []
+    session.execute(update(outbox).where(outbox.c.id.in_(ids), *due)
+                    .values(claim_token=token, available_at=now + timedelta(seconds=CLAIM_SECONDS)))
+    return session.execute(select(outbox).where(outbox.c.claim_token == token)
+                           .order_by(outbox.c.id)).all()
+
+
+def _retry_delay(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def _finish_batch(session, sent_ids, failures, now):
+    outbox = OutboxMessage.__table__
+    if sent_ids:
+        session.execute(update(outbox).where(outbox.c.id.in_(sent_ids))
+                        .values(sent_at=now, claim_token=None))
+    if failures:
+        session.execute(
+            update(outbox).where(outbox.c.id == bindparam('message_id'))
+            .values(attempts=bindparam('attempts'), available_at=bindparam('retry_at'),
+                    failed_at=bindparam('gave_up_at'), last_error=bindparam('error'), claim_token=None),
+            failures)
+
+
+def dispatch_batch(transport):
+    """Send one batch of due messages as per-recipient digests; returns messages handled"""
+    token = uuid.uuid4().hex
+    now = datetime.utcnow()
+    messages = write_queue.run_write(db.session, lambda session: _claim_batch(session, token, now))
+    if not messages:
+        return 0
+
+    by_recipient = defaultdict(list)
+    for message in messages:
+        by_recipient[message.recipient_id].append(message)
+    user_ids = set(by_recipient) | {json.loads(message.payload).get('actor_id') for message in messages}
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids - {None}))}
+    names = {user_id: user.full_name for user_id, user in users.items()}
+
+    sent_ids = []
+    failures = []
+    for recipient_id, recipient_messages in by_recipient.items():
+        recipient = users.get(recipient_id)
+        try:
+            if recipient is None or not recipient.email:
+                raise ValueError("recipient has no email address")
+            transport.send(build_digest(recipient, recipient_messages, names))
+            sent_ids += [message.id for message in recipient_messages]
+            metrics.incr('notifications.digests')
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+            logging.warning(f"Notification digest to user {recipient_id} failed: {error}")
+            for message in recipient_messages:
+                attempts = message.attempts + 1
+                gave_up = attempts >= MAX_ATTEMPTS or recipient is None or not recipient.email
+                failures.append({'message_id': message.id, 'attempts': attempts, 'error': error,
+                                 'retry_at': now + timedelta(seconds=_retry_delay(attempts)),
+                                 'gave_up_at': now if gave_up else None})
+                metrics.incr('notifications.failed' if gave_up else 'notifications.retries')
+
+    finished = datetime.utcnow()
+    write_queue.run_write(db.session, lambda session: _finish_batch(session, sent_ids, failures, finished))
+    metrics.incr('notifications.sent', len(sent_ids))
+    return len(messages)
+
+
+def purge_sent():
+    """Delete messages sent more than RETENTION_DAYS ago"""
+    outbox = OutboxMessage.__table__
+    cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+    return write_queue.run_write(db.session, lambda session: session.execute(
+        delete(outbox).where(outbox.c.sent_at < cutoff)).rowcount)
+
+
+def dispatch_pending(transport=None):
+    """Drain every due message; returns messages handled"""
+    transport = transport or notification_transports.get_transport()
+    handled = 0
+    while True:
+        count = dispatch_batch(transport)
+        handled += count
+        if count < BATCH_SIZE:
+            return handled
+
+
+def _run_periodically():
+    transport = None
+    while True:
+        time.sleep(DISPATCH_INTERVAL_SECONDS)
+        with app.app_context():
+            try:
+                transport = transport or notification_transports.get_transport()
+                dispatch_pending(transport)
+                purge_sent()
+            except Exception as e:
+                logging.warning(f"Notification dispatch failed: {e}")
+            finally:
+                db.session.remove()
+
+
+def start():
+    """Start the outbox dispatcher for this process"""
+    global _thread
+    if _thread is not None or not is_enabled():
+        return
+    _thread = threading.Thread(target=_run_periodically, name='notification-dispatcher', daemon=True)
+    _thread.start()
+
+
+@app.cli.command('dispatch-notifications')
+@click.option('--transport', default=None, help='Override HELPDESK_NOTIFY_TRANSPORT.')
+def dispatch_notifications_command(transport):
+    """Send every due notification in the outbox now"""
+    handled = dispatch_pending(notification_transports.get_transport(transport))
+    click.echo(f"Handled {handled} outbox messages.")
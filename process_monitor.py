@@ -0,0 +1,118 @@
+"""
+Process sampling for the professional launcher's Process Monitor
+A daemon thread samples processes every few seconds and hands the rows to a
+callback; the launcher applies them to its Treeview as a diff. By default
+only the helpdesk server and its worker tree are sampled. 'all' covers every
+process on the machine, optionally narrowed by a name filter.
+
+psutil.Process objects are kept between samples because cpu_percent() is
+measured since the previous call on the same object. A new process is primed
+when first seen and shows no CPU figure until the next sample.
+"""
+
+import threading
+from collections import namedtuple
+
+import psutil
+
+DEFAULT_INTERVAL = 2.0
+
+SERVER = 'server'
+ALL = 'all'
+
+# cpu is None until the process has been sampled twice
+ProcessRow = namedtuple('ProcessRow', 'pid ppid name cpu rss threads status')
+
+
+class ProcessSampler:
+    """Samples the server's process tree, or all processes, on a background thread"""
+
+    def __init__(self, server_pids, callback, interval=DEFAULT_INTERVAL):
+        # server_pids returns the pids of the server's top-level processes
+        self.server_pids = server_pids
+        self.callback = callback
+        self.interval = interval
+        self.mode = SERVER
+        self.name_filter = ''
+        self._processes = {}
+        self._primed = set()  # pids first seen in the current sample
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='process-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def poll_now(self):
+        self._wake.set()
+
+    def set_filter(self, mode, name_filter=''):
+        self.mode = mode
+        self.name_filter = name_filter.strip().lower()
+        self.poll_now()
+
+    def _process(self, pid):
+        """Cached psutil.Process for pid; a new one is primed for cpu_percent()"""
+        process = self._processes.get(pid)
+        if process is not None and process.is_running():
+            return process
+        process = psutil.Process(pid)
+        process.cpu_percent(None)  # the first call only sets the baseline
+        self._processes[pid] = process
+        self._primed.add(pid)
+        return process
+
+    def _candidates(self):
+        if self.mode != SERVER:
+            return set(psutil.pids())
+        pids = set()
+        for pid in self.server_pids():
+            try:
+                process = self._process(pid)
+                pids.add(pid)
+                pids.update(child.pid for child in process.children(recursive=True))
+            except psutil.Error:
+                continue
+        return pids
+
+    def sample(self):
+        """{pid: ProcessRow} of the processes currently selected"""
+        self._primed.clear()
+        pids = self._candidates()
+        rows = {}
+        for pid in pids:
+            try:
+                process = self._process(pid)
+                with process.oneshot():
+                    name = process.name()
+                    if self.name_filter and self.name_filter not in name.lower():
+                        continue
+                    rows[pid] = ProcessRow(pid, process.ppid(), name, None if pid in self._primed else process.cpu_percent(None),
+                                           process.memory_info().rss, process.num_threads(), process.status())
+            except psutil.Error:
+                continue
+        for pid in list(self._processes):
+            if pid not in pids:
+                del self._processes[pid]
+        return rows
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                rows = self.sample()
+            except psutil.Error:
+                rows = {}
+            if not self._stopped.is_set():
+                try:
+                    self.callback(rows)
+                except Exception:
+                    # The window may be closing; keep sampling until stopped
+                    pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,260 @@
+"""
+Resource history for the professional launcher's Monitoring tab
+ResourceSampler records machine and server-process metrics every few seconds
+on a background thread. Each series is a RingBuffer over an array, so an hour
+of samples is a few kilobytes and no per-sample objects are kept. Nothing
+here touches Tk: each new Sample goes to a callback, which hands it to the
+launcher's sparklines through root.after.
+
+With a history file, every sample is also written to a fixed-size ring of
+binary records on disk (HistoryFile). The most recent samples are loaded back
+on start, so slowdowns can be lined up with resource spikes after a restart,
+and the whole file can be exported to CSV.
+"""
+
+import csv
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import namedtuple
+from datetime import datetime
+
+import psutil
+
+import process_monitor
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_CAPACITY = 1800  # one hour at the default interval
+
+# (name, label, unit); the order is the record layout of the history file
+SERIES = (
+    ('cpu', 'CPU', '%'),
+    ('memory', 'Memory', '%'),
+    ('disk', 'Disk usage', '%'),
+    ('disk_read', 'Disk read', 'MB/s'),
+    ('disk_write', 'Disk write', 'MB/s'),
+    ('net_recv', 'Network in', 'MB/s'),
+    ('net_sent', 'Network out', 'MB/s'),
+    ('server_cpu', 'Server CPU', '%'),
+    ('server_rss', 'Server RSS', 'MB'),
+)
+SERIES_NAMES = tuple(name for name, _, _ in SERIES)
+
+Sample = namedtuple('Sample', ('time',) + SERIES_NAMES)
+
+MB = 1024 * 1024
+
+
+class RingBuffer:
+    """The last capacity numbers appended, stored in one array"""
+
+    def __init__(self, capacity, typecode='f'):
+        self.capacity = capacity
+        self.data = array(typecode, bytes(array(typecode).itemsize * capacity))
+        self.count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self.data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def values(self, last=None):
+        """Copy of the newest last values (all by default), oldest first"""
+        count = self.count if last is None else min(last, self.count)
+        start = (self._next - count) % self.capacity
+        if start + count <= self.capacity:
+            return self.data[start:start + count]
+        return self.data[start:] + self.data[:self._next]
+
+
+class HistoryFile:
+    """Fixed-size ring of binary sample records on disk"""
+
+    MAGIC = b'HDTS'
+    HEADER = struct.Struct('<4sHIII')  # magic, series, capacity, next slot, count
+    RECORD = struct.Struct('<d' + 'f' * len(SERIES))
+
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()  # the sampler appends while an export reads
+        self._next = 0
+        self.count = 0
+        kept = []
+        if os.path.exists(path):
+            self._file = open(path, 'r+b')
+            header = self._read_header()
+            if header and header[1] == len(SERIES) and header[2] == capacity:
+                self._next, self.count = header[3], header[4]
+                return
+            if header and header[1] == len(SERIES):
+                # Capacity changed: keep the newest records that still fit
+                self.capacity, self._next, self.count = header[2], header[3], header[4]
+                kept = self.read()[-capacity:]
+                self.capacity = capacity
+            self._file.close()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'w+b')
+        self._file.truncate(self.HEADER.size + self.RECORD.size * capacity)
+        self._next = self.count = 0
+        for sample in kept:
+            self._write(sample)
+        self._write_header()
+        self._file.flush()
+
+    def _read_header(self):
+        self._file.seek(0)
+        raw = self._file.read(self.HEADER.size)
+        if len(raw) < self.HEADER.size:
+            return None
+        header = self.HEADER.unpack(raw)
+        return header if header[0] == self.MAGIC else None
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(self.HEADER.pack(self.MAGIC, len(SERIES), self.capacity, self._next, self.count))
+
+    def _write(self, sample):
+        self._file.seek(self.HEADER.size + self.RECORD.size * self._next)
+        self._file.write(self.RECORD.pack(*sample))
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def append(self, sample):
+        with self._lock:
+            self._write(sample)
+            self._write_header()
+            self._file.flush()
+
+    def read(self, last=None):
+        """Newest last samples (all by default), oldest first"""
+        with self._lock:
+            count = self.count if last is None else min(last, self.count)
+            start = (self._next - count) % self.capacity
+            self._file.seek(self.HEADER.size + self.RECORD.size * start)
+            raw = self._file.read(self.RECORD.size * min(count, self.capacity - start))
+            if start + count > self.capacity:
+                self._file.seek(self.HEADER.size)
+                raw += self._file.read(self.RECORD.size * (start + count - self.capacity))
+        return [Sample(*values) for values in self.RECORD.iter_unpack(raw)]
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class ResourceSampler:
+    """Samples system and server metrics into ring buffers on a background thread"""
+
+    def __init__(self, server_pids, callback, interval=DEFAULT_INTERVAL, capacity=DEFAULT_CAPACITY,
+                 path=None, file_capacity=None):
+        self.callback = callback
+        self.interval = interval
+        self.times = RingBuffer(capacity, 'd')
+        self.series = {name: RingBuffer(capacity) for name in SERIES_NAMES}
+        self.error = None
+        self._lock = threading.Lock()
+        self._server = process_monitor.ProcessSampler(server_pids, None)
+        self._counters = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.file = None
+        if path:
+            try:
+                self.file = HistoryFile(path, file_capacity or capacity)
+            except (OSError, struct.error) as e:
+                self.error = f"History file unavailable: {e}"
+            else:
+                for sample in self.file.read(capacity):
+                    self._record(sample)
+
+    def start(self):
+        if self._thread is None:
+            psutil.cpu_percent(None)  # prime: the first call always returns 0.0
+            self._counters = self._read_counters()
+            self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    @staticmethod
+    def _read_counters():
+        # Either may be None where the platform or container hides them
+        return time.monotonic(), psutil.disk_io_counters(), psutil.net_io_counters()
+
+    def sample(self):
+        now, disk_io, net_io = counters = self._read_counters()
+        started, last_disk, last_net = self._counters
+        self._counters = counters
+        elapsed = max(now - started, 1e-6)
+
+        def rate(current, last, field):
+            if current is None or last is None:
+                return 0.0
+            return max(getattr(current, field) - getattr(last, field), 0) / MB / elapsed
+
+        server = self._server.sample().values()
+        return Sample(
+            time.time(),
+            psutil.cpu_percent(None),
+            psutil.virtual_memory().percent,
+            psutil.disk_usage(os.path.abspath(os.sep)).percent,
+            rate(disk_io, last_disk, 'read_bytes'),
+            rate(disk_io, last_disk, 'write_bytes'),
+            rate(net_io, last_net, 'bytes_recv'),
+            rate(net_io, last_net, 'bytes_sent'),
+            sum(row.cpu or 0.0 for row in server),
+            sum(row.rss for row in server) / MB,
+        )
+
+    def _record(self, sample):
+        with self._lock:
+            self.times.append(sample.time)
+            for name in SERIES_NAMES:
+                self.series[name].append(getattr(sample, name))
+
+    def history(self, last=None):
+        """Samples held in memory, oldest first"""
+        with self._lock:
+            columns = [self.times.values(last)] + [self.series[name].values(last) for name in SERIES_NAMES]
+        return [Sample(*values) for values in zip(*columns)]
+
+    def export_csv(self, destination):
+        """Write the history file, or the in-memory history without one, as CSV; returns the row count"""
+        samples = self.file.read() if self.file else self.history()
+        with open(destination, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out)
+            writer.writerow(['time'] + [f"{label} ({unit})" for _, label, unit in SERIES])
+            for sample in samples:
+                writer.writerow([datetime.fromtimestamp(sample.time).isoformat(sep=' ', timespec='seconds')]
+                                + [f"{value:.2f}" for value in sample[1:]])
+        return len(samples)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                sample = self.sample()
+            except (psutil.Error, OSError):
+                continue
+            self._record(sample)
+            if self.file:
+                try:
+                    self.file.append(sample)
+                except OSError as e:
+                    self.error = f"History file unavailable: {e}"
+                    self.file = None
+            try:
+                self.callback(sample)
+            except Exception:
+                # The window may be closing; keep sampling until stopped
+                pass
+        if self.file:
+            self.file.close()
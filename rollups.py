@@ -0,0 +1,318 @@
+"""
+Time-bucketed ticket rollups for trend reporting
+ticket_rollups holds created and resolved counts and total resolution time
+per day, week (starting Monday) and month, overall and by category, priority
+and assignee. The rollup job reads only tickets whose updated_at moved past
+its watermark. It compares each ticket with what the ticket last contributed
+(ticket_rollup_state) and applies the difference to the affected buckets.
+A year of history is never recomputed. Archived tickets keep their
+contribution.
+
+A ticket counts as resolved at resolved_at. Closed tickets without
+resolved_at count at the time the job first sees them closed.
+Backlog is derived when a series is read, as cumulative created minus
+resolved. MTTR is resolution time / resolved per bucket. The same deltas keep
+the monthly resolution-time sketches of sketches.py up to date.
+
+Runs in the background every ROLLUP_INTERVAL_SECONDS, or on demand with
+  flask --app main update-rollups
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import func, insert, or_, select, update
+
+from app import app, db
+from models import JobWatermark, Ticket, TicketRollup, TicketRollupState, User
+from sketches import DDSketch, apply_sketch_deltas
+import metrics
+import write_queue
+
+GRAINS = ('day', 'week', 'month')
+DIMENSIONS = ('all', 'category', 'priority', 'assignee')
+
+WATERMARK_NAME = 'ticket_rollups'
+BATCH_SIZE = 1000
+# Each run rescans this much before the watermark to catch late commits
+OVERLAP_SECONDS = 120
+ROLLUP_INTERVAL_SECONDS = 60
+
+# Start of the first scan (datetime.min is out of range for MySQL DATETIME)
+EPOCH = datetime(1970, 1, 1)
+
+# Longest series a chart endpoint returns, in buckets
+MAX_BUCKETS = 400
+
+_thread = None
+
+
+def bucket_start(grain, moment):
+    """First day of the bucket containing a date or datetime"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if grain == 'week':
+        return day - timedelta(days=day.weekday())
+    if grain == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(grain, day):
+    if grain == 'week':
+        return day + timedelta(days=7)
+    if grain == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _contribution(ticket, previous):
+    """(created_at, closed_at, category, priority, assigned_to) a ticket adds to the rollups"""
+    closed_at = ticket.resolved_at
+    if closed_at is None and ticket.status == 'Closed':
+        # Closing leaves no timestamp; keep the first time the job saw it closed
+        closed_at = previous.closed_at if previous is not None and previous.closed_at else ticket.updated_at
+    return (ticket.created_at, closed_at, ticket.category, ticket.priority, ticket.assigned_to or 0)
+
+
+def _state_tuple(state):
+    if state is None:
+        return None
+    return (state.created_at, state.closed_at, state.category, state.priority, state.assigned_to or 0)
+
+
+def _add_deltas(deltas, contribution, sign):
+    created_at, closed_at, category, priority, assigned_to = contribution
+    dimensions = (('all', ''), ('category', category), ('priority', priority), ('assignee', str(assigned_to)))
+    for grain in GRAINS:
+        for dimension, value in dimensions:
+            if created_at is not None:
+                deltas[(grain, bucket_start(grain, created_at), dimension, value)][0] += sign
+            if closed_at is not None:
+                key = (grain, bucket_start(grain, closed_at), dimension, value)
+                deltas[key][1] += sign
+                if created_at is not None:
+                    deltas[key][2] += sign * int((closed_at - created_at).total_seconds())
+
+
+def add_sketch_deltas(sketch_deltas, contribution, sign):
+    """Add (or with sign=-1 remove) a ticket's resolution time in the monthly sketches"""
+    created_at, closed_at, category, priority, assigned_to = contribution
+    if created_at is None or closed_at is None:
+        return
+    seconds = max((closed_at - created_at).total_seconds(), 0)
+    bucket = bucket_start('month', closed_at)
+    for dimension, value in (('category', category), ('priority', priority), ('assignee', str(assigned_to))):
+        sketch_deltas.setdefault((bucket, dimension, value), DDSketch()).add(seconds, sign)
+
+
+def _apply_deltas(session, deltas):
+    rollups = TicketRollup.__table__
+    for (grain, bucket, dimension, value), (created, resolved, seconds) in deltas.items():
+        if not (created or resolved or seconds):
+            continue
+        result = session.execute(
+            update(rollups)
+            .where(rollups.c.grain == grain, rollups.c.bucket == bucket,
+                   rollups.c.dimension == dimension, rollups.c.value == value)
+            .values(created=rollups.c.created + created, resolved=rollups.c.resolved + resolved,
+                    resolution_seconds=rollups.c.resolution_seconds + seconds))
+        if result.rowcount == 0:
+            session.execute(insert(rollups).values(
+                grain=grain, bucket=bucket, dimension=dimension, value=value,
+                created=created, resolved=resolved, resolution_seconds=seconds))
+
+
+def _save_states(session, tickets, previous, contributions):
+    states = TicketRollupState.__table__
+    for ticket in tickets:
+        created_at, closed_at, category, priority, assigned_to = contributions[ticket.id]
+        values = dict(created_at=created_at, closed_at=closed_at, category=category,
+                      priority=priority, assigned_to=assigned_to)
+        if ticket.id in previous:
+            session.execute(update(states).where(states.c.ticket_id == ticket.id).values(values))
+        else:
+            session.execute(insert(states).values(ticket_id=ticket.id, **values))
+
+
+def _process_batch(session, cursor):
+    """Roll up one batch after cursor=(updated_at, id); returns (new cursor, rows, changed)"""
+    tickets = Ticket.__table__
+    marks = JobWatermark.__table__
+
+    # Claim the watermark row first: its lock keeps a second runner from
+    # applying the same batch until this one commits
+    watermark = session.execute(select(marks).where(marks.c.name == WATERMARK_NAME)).first()
+    if watermark is not None:
+        claimed = session.execute(
+            update(marks).where(marks.c.name == WATERMARK_NAME, marks.c.value == watermark.value,
+                                marks.c.position == watermark.position)
+            .values(updated_at=datetime.utcnow())
+        ).rowcount
+        if not claimed:
+            raise RuntimeError("Rollup watermark moved; another rollup job is running")
+
+    rows = session.execute(
+        select(tickets.c.id, tickets.c.status, tickets.c.category, tickets.c.priority, tickets.c.assigned_to,
+               tickets.c.created_at, tickets.c.updated_at, tickets.c.resolved_at)
+        .where(tickets.c.updated_at.is_not(None),
+               or_(tickets.c.updated_at > cursor[0],
+                   (tickets.c.updated_at == cursor[0]) & (tickets.c.id > cursor[1])))
+        .order_by(tickets.c.updated_at, tickets.c.id)
+        .limit(BATCH_SIZE)
+    ).all()
+    if not rows:
+        return None, 0, 0
+
+    ids = [row.id for row in rows]
+    previous = {state.ticket_id: state for state in session.execute(
+        select(TicketRollupState.__table__).where(TicketRollupState.__table__.c.ticket_id.in_(ids)))}
+
+    deltas = defaultdict(lambda: [0, 0, 0])
+    sketch_deltas = {}
+    contributions = {}
+    changed = []
+    for row in rows:
+        old = _state_tuple(previous.get(row.id))
+        new = _contribution(row, previous.get(row.id))
+        contributions[row.id] = new
+        if old != new:
+            if old is not None:
+                _add_deltas(deltas, old, -1)
+                add_sketch_deltas(sketch_deltas, old, -1)
+            _add_deltas(deltas, new, 1)
+            add_sketch_deltas(sketch_deltas, new, 1)
+            changed.append(row)
+
+    _apply_deltas(session, deltas)
+    apply_sketch_deltas(session, sketch_deltas)
+    _save_states(session, changed, previous, contributions)
+
+    # Never move the stored watermark backwards while rescanning the overlap
+    new_cursor = (rows[-1].updated_at, rows[-1].id)
+    if watermark is None:
+        session.execute(insert(marks).values(name=WATERMARK_NAME, value=new_cursor[0], position=new_cursor[1],
+                                             updated_at=datetime.utcnow()))
+    elif new_cursor > (watermark.value, watermark.position):
+        session.execute(update(marks).where(marks.c.name == WATERMARK_NAME)
+                        .values(value=new_cursor[0], position=new_cursor[1]))
+    return new_cursor, len(rows), len(changed)
+
+
+def update_rollups():
+    """Fold every ticket changed since the watermark into the rollups; returns tickets changed"""
+    watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+    if watermark is None:
+        cursor = (EPOCH, 0)
+    else:
+        cursor = (watermark.value - timedelta(seconds=OVERLAP_SECONDS), 0)
+    db.session.rollback()
+
+    scanned = changed = 0
+    while cursor is not None:
+        batch_cursor = cursor
+        cursor, rows, batch_changed = write_queue.run_write(
+            db.session, lambda session: _process_batch(session, batch_cursor))
+        scanned += rows
+        changed += batch_changed
+
+    metrics.incr('rollups.runs')
+    metrics.incr('rollups.tickets_changed', changed)
+    if changed:
+        logging.info(f"Rolled up {changed} changed tickets ({scanned} scanned)")
+    return changed
+
+
+def series(grain, dimension, start, end):
+    """Per-value bucket series between two dates from the rollups
+
+    Returns (bucket labels, {value: {'created', 'resolved', 'backlog', 'mttr_hours'}}).
+    """
+    rollups = TicketRollup.__table__
+    first = bucket_start(grain, start)
+    buckets = []
+    day = first
+    while day <= end and len(buckets) < MAX_BUCKETS:
+        buckets.append(day)
+        day = next_bucket(grain, day)
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+
+    # Backlog carried in from before the window
+    carried = dict(db.session.execute(
+        select(rollups.c.value, func.sum(rollups.c.created) - func.sum(rollups.c.resolved))
+        .where(rollups.c.grain == grain, rollups.c.dimension == dimension, rollups.c.bucket < first)
+        .group_by(rollups.c.value)
+    ).all())
+
+    rows = db.session.execute(
+        select(rollups.c.bucket, rollups.c.value, rollups.c.created, rollups.c.resolved,
+               rollups.c.resolution_seconds)
+        .where(rollups.c.grain == grain, rollups.c.dimension == dimension,
+               rollups.c.bucket >= first, rollups.c.bucket <= buckets[-1])
+    ).all()
+
+    values = sorted(set(carried) | {row.value for row in rows})
+    result = {value: {'created': [0] * len(buckets), 'resolved': [0] * len(buckets),
+                      'seconds': [0] * len(buckets)} for value in values}
+    for row in rows:
+        position = index.get(row.bucket)
+        if position is None:
+            continue
+        entry = result[row.value]
+        entry['created'][position] = row.created
+        entry['resolved'][position] = row.resolved
+        entry['seconds'][position] = row.resolution_seconds
+
+    for value, entry in result.items():
+        backlog = carried.get(value) or 0
+        entry['backlog'] = []
+        entry['mttr_hours'] = []
+        for created, resolved, seconds in zip(entry['created'], entry['resolved'], entry.pop('seconds')):
+            backlog += created - resolved
+            entry['backlog'].append(backlog)
+            entry['mttr_hours'].append(round(seconds / resolved / 3600, 2) if resolved else None)
+
+    return [bucket.isoformat() for bucket in buckets], result
+
+
+def value_labels(dimension, values):
+    """Display names for series values (assignee ids become names)"""
+    if dimension == 'all':
+        return {value: 'All tickets' for value in values}
+    if dimension != 'assignee':
+        return {value: value for value in values}
+    ids = [int(value) for value in values if value.isdigit() and value != '0']
+    names = {str(user.id): user.full_name for user in User.query.filter(User.id.in_(ids))} if ids else {}
+    return {value: names.get(value, 'Unassigned' if value == '0' else f'User {value}') for value in values}
+
+
+def _run_periodically():
+    while True:
+        time.sleep(ROLLUP_INTERVAL_SECONDS)
+        with app.app_context():
+            try:
+                update_rollups()
+            except Exception as e:
+                logging.warning(f"Rollup job failed: {e}")
+            finally:
+                db.session.remove()
+
+
+def start():
+    """Start the background rollup job for this process"""
+    global _thread
+    if _thread is not None or os.environ.get("HELPDESK_ROLLUP_JOB", "1") == "0":
+        return
+    _thread = threading.Thread(target=_run_periodically, name='ticket-rollups', daemon=True)
+    _thread.start()
+
+
+@app.cli.command('update-rollups')
+def update_rollups_command():
+    """Fold tickets changed since the last run into the trend rollups"""
+    changed = update_rollups()
+    click.echo(f"Rolled up {changed} changed tickets.")
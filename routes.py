@@ -1,17 +1,40 @@
-from flask import render_template, request, redirect, url_for, flash, session, abort, make_response, send_file, send_from_directory
+from flask import render_template, request, redirect, url_for, flash, session, abort, make_response, send_file, jsonify
 from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
 from app import app, db
-from models import User, Ticket, TicketComment
+from models import User, Ticket, TicketComment, TicketArchive
 from forms import LoginForm, TicketForm, UpdateTicketForm, CommentForm, UserRegistrationForm, AssignTicketForm, UserProfileForm
-from datetime import datetime
+from coded_enums import TICKET_CATEGORIES, TICKET_PRIORITIES, TICKET_STATUSES
+from datetime import datetime, timedelta
 import logging
-import os
 import socket
 import platform
+import admin_roster
+import archive
+import auto_assign
+import blob_storage
+import bulk_tickets
+import cache
+import comment_threads
+import db_benchmark
+import db_routing
+import db_transfer
+import engine_profiles
+import load_users
+import metrics
+import migrations
+import notifications
+import rollups
+import sketches
+import sla
+import ticket_history
+import write_queue
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
 import io
+import time
+from urllib.parse import urlparse
+from sqlalchemy import text
 
 # Helper function to check if user is logged in
 def is_logged_in():
@@ -20,9 +43,48 @@ def is_logged_in():
 # Helper function to get current user
 def get_current_user():
     if is_logged_in():
-        return User.query.get(session['user_id'])
+        return cache.get_instance(User, session['user_id'])
     return None
 
+# Helper function to check that a redirect target stays on this site
+def is_local_url(url):
+    if not url or not url.startswith('/') or url.startswith(('//', '/\\')):
+        return False
+    parsed = urlparse(url)
+    return not parsed.scheme and not parsed.netloc
+
+# Dashboard statistics are cached until a ticket or user changes
+STATS_TTL = 60
+
+@cache.cached(ttl=STATS_TTL, tags=('tickets', 'users'))
+def system_stats():
+    """Ticket, user and category counts for the super admin dashboard"""
+    return {
+        'total_tickets': Ticket.query.count(),
+        'open_tickets': Ticket.query.filter_by(status='Open').count(),
+        'in_progress_tickets': Ticket.query.filter_by(status='In Progress').count(),
+        'resolved_tickets': Ticket.query.filter_by(status='Resolved').count(),
+        'total_users': User.query.filter_by(role='user').count(),
+        'total_admins': User.query.filter_by(role='admin').count(),
+        'hardware_tickets': Ticket.query.filter_by(category='Hardware').count(),
+        'software_tickets': Ticket.query.filter_by(category='Software').count(),
+        # Active tickets past an SLA deadline
+        'sla_breached_tickets': Ticket.query.filter(
+            Ticket.status.in_(sla.ACTIVE_STATUSES),
+            db.or_(Ticket.response_breached, Ticket.resolution_breached)
+        ).count()
+    }
+
+@cache.cached(ttl=STATS_TTL, tags=('tickets',))
+def assigned_stats(admin_id):
+    """Counts of the tickets assigned to an admin"""
+    return {
+        'total': Ticket.query.filter_by(assigned_to=admin_id).count(),
+        'open': Ticket.query.filter_by(assigned_to=admin_id, status='Open').count(),
+        'in_progress': Ticket.query.filter_by(assigned_to=admin_id, status='In Progress').count(),
+        'resolved': Ticket.query.filter_by(assigned_to=admin_id, status='Resolved').count()
+    }
+
 # Helper function to require login
 def login_required(f):
     def decorated_function(*args, **kwargs):
@@ -129,8 +191,11 @@ def user_dashboard():
     # Build query
     query = Ticket.query.filter_by(user_id=user.id)
     
-    if status_filter != 'all':
+    # Unknown filter values match nothing rather than failing the coded column bind
+    if status_filter in TICKET_STATUSES:
         query = query.filter_by(status=status_filter)
+    elif status_filter != 'all':
+        query = query.filter(db.false())
     
     if search_query:
         query = query.filter(Ticket.title.contains(search_query))
@@ -177,35 +242,15 @@ def super_admin_dashboard():
         flash('Super Admin access required.', 'error')
         return redirect(url_for('index'))
     
-    # Get comprehensive statistics
-    total_tickets = Ticket.query.count()
-    open_tickets = Ticket.query.filter_by(status='Open').count()
-    in_progress_tickets = Ticket.query.filter_by(status='In Progress').count()
-    resolved_tickets = Ticket.query.filter_by(status='Resolved').count()
-    
-    # Get user statistics
-    total_users = User.query.filter_by(role='user').count()
-    total_admins = User.query.filter_by(role='admin').count()
+    stats = system_stats()
     
     # Get recent tickets
     recent_tickets = Ticket.query.order_by(Ticket.created_at.desc()).limit(10).all()
     
-    # Get category statistics
-    hardware_tickets = Ticket.query.filter_by(category='Hardware').count()
-    software_tickets = Ticket.query.filter_by(category='Software').count()
-    
-    stats = {
-        'total_tickets': total_tickets,
-        'open_tickets': open_tickets,
-        'in_progress_tickets': in_progress_tickets,
-        'resolved_tickets': resolved_tickets,
-        'total_users': total_users,
-        'total_admins': total_admins,
-        'hardware_tickets': hardware_tickets,
-        'software_tickets': software_tickets
-    }
+    admin_users = admin_roster.admins()
     
-    return render_template('super_admin_dashboard.html', stats=stats, recent_tickets=recent_tickets)
+    return render_template('super_admin_dashboard.html', stats=stats, recent_tickets=recent_tickets,
+                         admin_users=admin_users, statuses=TICKET_STATUSES, priorities=TICKET_PRIORITIES)
 
 @app.route('/admin-dashboard')
 @admin_required
@@ -222,32 +267,21 @@ def admin_dashboard():
     # Build query - only show tickets assigned to this admin
     query = Ticket.query.filter_by(assigned_to=user.id)
     
-    if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
-    
-    if priority_filter != 'all':
-        query = query.filter_by(priority=priority_filter)
-    
-    if category_filter != 'all':
-        query = query.filter_by(category=category_filter)
+    # Unknown filter values match nothing rather than failing the coded column bind
+    for column, value, names in ((Ticket.status, status_filter, TICKET_STATUSES),
+                                 (Ticket.priority, priority_filter, TICKET_PRIORITIES),
+                                 (Ticket.category, category_filter, TICKET_CATEGORIES)):
+        if value in names:
+            query = query.filter(column == value)
+        elif value != 'all':
+            query = query.filter(db.false())
     
     if search_query:
         query = query.filter(Ticket.title.contains(search_query))
     
     tickets = query.order_by(Ticket.created_at.desc()).all()
     
-    # Get statistics for assigned tickets
-    total_assigned = Ticket.query.filter_by(assigned_to=user.id).count()
-    open_assigned = Ticket.query.filter_by(assigned_to=user.id, status='Open').count()
-    in_progress_assigned = Ticket.query.filter_by(assigned_to=user.id, status='In Progress').count()
-    resolved_assigned = Ticket.query.filter_by(assigned_to=user.id, status='Resolved').count()
-    
-    stats = {
-        'total': total_assigned,
-        'open': open_assigned,
-        'in_progress': in_progress_assigned,
-        'resolved': resolved_assigned
-    }
+    stats = assigned_stats(user.id)
     
     return render_template('admin_dashboard.html', tickets=tickets, stats=stats,
                          status_filter=status_filter, priority_filter=priority_filter,
@@ -292,10 +326,6 @@ def create_ticket():
                 else:
                     current_system_name = f'Unknown System ({request.remote_addr})'
         
-        # Update user's profile with latest info (optional)
-        user.ip_address = current_ip
-        user.system_name = current_system_name
-        
         # Handle image upload
         image_filename = None
         if form.image.data and form.image.data.filename:
@@ -307,30 +337,44 @@ def create_ticket():
                     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
                     image_filename = timestamp + filename
                     
-                    # Ensure upload directory exists
-                    upload_dir = 'static/uploads'
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
-                    filepath = os.path.join(upload_dir, image_filename)
                     try:
-                        file.save(filepath)
+                        blob_storage.save(image_filename, file.stream, file.mimetype)
                     except Exception as e:
+                        logging.error(f"Could not store upload {image_filename}: {e}")
                         flash('Error uploading image. Ticket created without image.', 'warning')
                         image_filename = None
         
-        ticket = Ticket(
-            title=form.title.data,
-            description=form.description.data,
-            category=form.category.data,
-            priority=form.priority.data,
-            user_id=user.id,
-            user_name=user.full_name,
-            user_ip_address=current_ip,
-            user_system_name=current_system_name,
-            image_filename=image_filename
-        )
-        db.session.add(ticket)
-        db.session.commit()
+        # Least-loaded admin of the category's team takes the ticket
+        assignee_id = auto_assign.reserve_assignee(form.category.data)
+        
+        def save_ticket(session):
+            # Update user's profile with latest info (optional)
+            author = session.get(User, user.id)
+            author.ip_address = current_ip
+            author.system_name = current_system_name
+            
+            ticket = Ticket(
+                title=form.title.data,
+                description=form.description.data,
+                category=form.category.data,
+                priority=form.priority.data,
+                user_id=author.id,
+                user_name=author.full_name,
+                user_ip_address=current_ip,
+                user_system_name=current_system_name,
+                image_filename=image_filename,
+                assigned_to=assignee_id
+            )
+            ticket._workload_reserved = True
+            session.add(ticket)
+            session.flush()
+            return ticket
+        
+        try:
+            ticket = write_queue.run_write(db.session, save_ticket)
+        except Exception:
+            auto_assign.release(assignee_id)
+            raise
         
         flash(f'Ticket {ticket.ticket_number} created successfully!', 'success')
         return redirect(url_for('user_dashboard'))
@@ -341,7 +385,7 @@ def create_ticket():
 @login_required
 def view_ticket(ticket_id):
     """View ticket details"""
-    ticket = Ticket.query.get_or_404(ticket_id)
+    ticket = archive.get_ticket_or_404(ticket_id)
     user = get_current_user()
     
     # Check if user can view this ticket
@@ -349,10 +393,38 @@ def view_ticket(ticket_id):
         abort(403)
     
     form = CommentForm()
-    assign_form = AssignTicketForm() if user.is_admin else None
+    assign_form = AssignTicketForm() if user.is_admin and not ticket.is_archived else None
+    comments, comments_cursor = comment_threads.comment_page(ticket)
+    history = ticket_history.describe(ticket_history.events_for(ticket.id))
+    state_stats = ticket_history.time_in_status(ticket.id)
     
     return render_template('view_ticket.html', ticket=ticket, form=form, 
-                         assign_form=assign_form, user=user)
+                         assign_form=assign_form, user=user, comments=comments,
+                         older_comments=comment_threads.cursor_args(comments_cursor),
+                         history=history, state_stats=state_stats)
+
+@app.route('/ticket/<int:ticket_id>/comments')
+@login_required
+def ticket_comments(ticket_id):
+    """Page of older comments as JSON, for "Load older comments" on view_ticket"""
+    ticket = archive.get_ticket_or_404(ticket_id)
+    user = get_current_user()
+    
+    if not user.is_admin and ticket.user_id != user.id:
+        abort(403)
+    
+    before = comment_threads.parse_cursor(request.args.get('before'), request.args.get('before_id', type=int))
+    limit = min(max(request.args.get('limit', comment_threads.COMMENTS_PAGE_SIZE, type=int), 1),
+                comment_threads.MAX_PAGE_SIZE)
+    comments, cursor = comment_threads.comment_page(ticket, before, limit)
+    
+    return jsonify({
+        'comments': [{'id': comment.id, 'author': comment.user.full_name,
+                      'created_at': comment.created_at.isoformat() if comment.created_at else None,
+                      'comment': comment.comment} for comment in comments],
+        'html': comment_threads.render_comments(comments),
+        'next': comment_threads.cursor_args(cursor),
+    })
 
 @app.route('/ticket/<int:ticket_id>/comment', methods=['POST'])
 @login_required
@@ -367,14 +439,16 @@ def add_comment(ticket_id):
     
     form = CommentForm()
     if form.validate_on_submit():
-        comment = TicketComment(
-            ticket_id=ticket_id,
-            user_id=user.id,
-            comment=form.comment.data
-        )
-        db.session.add(comment)
-        ticket.updated_at = datetime.utcnow()
-        db.session.commit()
+        def save_comment(session):
+            comment = TicketComment(
+                ticket_id=ticket_id,
+                user_id=user.id,
+                comment=form.comment.data
+            )
+            session.add(comment)
+            session.get(Ticket, ticket_id).updated_at = datetime.utcnow()
+        
+        write_queue.run_write(db.session, save_comment)
         
         flash('Comment added successfully!', 'success')
     
@@ -424,7 +498,7 @@ def assign_ticket(ticket_id):
         ticket.updated_at = datetime.utcnow()
         db.session.commit()
         
-        assignee = User.query.get(form.assigned_to.data)
+        assignee = admin_roster.get(form.assigned_to.data)
         flash(f'Ticket assigned to {assignee.full_name}!', 'success')
     
     return redirect(url_for('view_ticket', ticket_id=ticket_id))
@@ -481,16 +555,16 @@ def assign_work(ticket_id):
     
     ticket = Ticket.query.get_or_404(ticket_id)
     
-    # Get appropriate admins based on ticket category
-    if ticket.category in ['Hardware']:
-        admins = User.query.filter_by(role='admin', department='IT Hardware').all()
-    elif ticket.category in ['Software']:
-        admins = User.query.filter_by(role='admin', department='IT Software').all()
-    else:
-        admins = User.query.filter_by(role='admin').all()
+    # Get appropriate admins based on the team handling the ticket category
+    admins = admin_roster.team(auto_assign.team_for(ticket.category))
     
     form = AssignTicketForm()
-    form.assigned_to.choices = [(admin.id, f"{admin.full_name} ({admin.department})") for admin in admins]
+    loads = auto_assign.workload.snapshot()
+    form.assigned_to.choices = [(admin.id, f"{admin.full_name} ({admin.department}, {loads.get(admin.id, 0)} active)")
+                                for admin in admins]
+    if request.method == 'GET':
+        # Suggest the least-loaded admin of the team
+        form.assigned_to.data = auto_assign.choose_assignee(ticket.category)
     
     if form.validate_on_submit():
         ticket.assigned_to = form.assigned_to.data
@@ -498,7 +572,7 @@ def assign_work(ticket_id):
         ticket.updated_at = datetime.utcnow()
         db.session.commit()
         
-        assignee = User.query.get(form.assigned_to.data)
+        assignee = admin_roster.get(form.assigned_to.data)
         flash(f'Work assigned to {assignee.full_name}!', 'success')
         return redirect(url_for('super_admin_dashboard'))
     
@@ -592,27 +666,32 @@ def reports_dashboard():
         flash('Super Admin access required.', 'error')
         return redirect(url_for('index'))
     
+    # Archived tickets are only counted when asked for
+    include_archived = request.args.get('include_archived') == '1'
+    status_counts = archive.count_by('status', include_archived)
+    category_counts = archive.count_by('category', include_archived)
+    priority_counts = archive.count_by('priority', include_archived)
+    
     # Get comprehensive statistics
-    total_tickets = Ticket.query.count()
-    open_tickets = Ticket.query.filter_by(status='Open').count()
-    in_progress_tickets = Ticket.query.filter_by(status='In Progress').count()
-    resolved_tickets = Ticket.query.filter_by(status='Resolved').count()
-    closed_tickets = Ticket.query.filter_by(status='Closed').count()
+    total_tickets = sum(status_counts.values())
+    open_tickets = status_counts.get('Open', 0)
+    in_progress_tickets = status_counts.get('In Progress', 0)
+    resolved_tickets = status_counts.get('Resolved', 0)
+    closed_tickets = status_counts.get('Closed', 0)
     
     # Category breakdown
-    hardware_tickets = Ticket.query.filter_by(category='Hardware').count()
-    software_tickets = Ticket.query.filter_by(category='Software').count()
-    network_tickets = Ticket.query.filter_by(category='Network').count()
-    other_tickets = Ticket.query.filter_by(category='Other').count()
+    hardware_tickets = category_counts.get('Hardware', 0)
+    software_tickets = category_counts.get('Software', 0)
+    other_tickets = category_counts.get('Other', 0)
     
     # Priority breakdown  
-    critical_tickets = Ticket.query.filter_by(priority='Critical').count()
-    high_tickets = Ticket.query.filter_by(priority='High').count()
-    medium_tickets = Ticket.query.filter_by(priority='Medium').count()
-    low_tickets = Ticket.query.filter_by(priority='Low').count()
+    critical_tickets = priority_counts.get('Critical', 0)
+    high_tickets = priority_counts.get('High', 0)
+    medium_tickets = priority_counts.get('Medium', 0)
+    low_tickets = priority_counts.get('Low', 0)
     
     # Get all tickets for detailed table
-    all_tickets = Ticket.query.order_by(Ticket.created_at.desc()).all()
+    all_tickets = archive.all_tickets(include_archived)
     
     stats = {
         'total_tickets': total_tickets,
@@ -622,7 +701,6 @@ def reports_dashboard():
         'closed_tickets': closed_tickets,
         'hardware_tickets': hardware_tickets,
         'software_tickets': software_tickets,
-        'network_tickets': network_tickets,
         'other_tickets': other_tickets,
         'critical_tickets': critical_tickets,
         'high_tickets': high_tickets,
@@ -632,12 +710,54 @@ def reports_dashboard():
     
     # Prepare chart data for JavaScript
     chart_data = {
-        'category': [hardware_tickets, software_tickets, network_tickets, other_tickets],
+        'category': [category_counts.get(category, 0) for category in TICKET_CATEGORIES],
+        'category_labels': list(TICKET_CATEGORIES),
         'priority': [critical_tickets, high_tickets, medium_tickets, low_tickets],
         'status': [open_tickets, in_progress_tickets, resolved_tickets, closed_tickets]
     }
     
-    return render_template('reports_dashboard.html', stats=stats, tickets=all_tickets, chart_data=chart_data)
+    # Resolution-time percentiles merged from the monthly sketches
+    resolution_percentiles = []
+    for dimension, heading in (('all', 'Overall'), ('category', 'Category'), ('priority', 'Priority'),
+                               ('assignee', 'Assignee')):
+        values = sketches.percentiles(dimension)
+        names = rollups.value_labels(dimension, list(values))
+        for value, entry in values.items():
+            resolution_percentiles.append(dict(entry, group=heading, name=names[value]))
+    
+    admin_users = admin_roster.admins()
+    history_summary = ticket_history.summary()
+    
+    return render_template('reports_dashboard.html', stats=stats, tickets=all_tickets, chart_data=chart_data,
+                         include_archived=include_archived, admin_users=admin_users,
+                         statuses=TICKET_STATUSES, priorities=TICKET_PRIORITIES,
+                         resolution_percentiles=resolution_percentiles, history_summary=history_summary)
+
+@app.route('/reports/trends')
+@admin_required
+def report_trends():
+    """Created/resolved/backlog/MTTR series from the rollup tables (Super Admin only)"""
+    current_user = get_current_user()
+    if not current_user.is_super_admin:
+        abort(403)
+    
+    grain = request.args.get('grain', 'day')
+    dimension = request.args.get('dimension', 'all')
+    if grain not in rollups.GRAINS or dimension not in rollups.DIMENSIONS:
+        return jsonify({'error': 'Unknown grain or dimension'}), 400
+    
+    default_days = {'day': 90, 'week': 365, 'month': 730}[grain]
+    days = min(request.args.get('days', default_days, type=int), 3650)
+    end = datetime.utcnow().date()
+    labels, values = rollups.series(grain, dimension, end - timedelta(days=days), end)
+    names = rollups.value_labels(dimension, list(values))
+    
+    return jsonify({
+        'grain': grain,
+        'dimension': dimension,
+        'labels': labels,
+        'series': [dict(entry, value=value, name=names[value]) for value, entry in values.items()],
+    })
 
 @app.route('/edit-assignment/<int:ticket_id>', methods=['GET', 'POST'])
 @admin_required
@@ -662,7 +782,7 @@ def edit_assignment(ticket_id):
         
         try:
             db.session.commit()
-            assignee_name = User.query.get(assigned_to).full_name if assigned_to else 'Unassigned'
+            assignee_name = admin_roster.get(assigned_to).full_name if assigned_to else 'Unassigned'
             flash(f'Ticket {ticket.ticket_number} has been assigned to {assignee_name}.', 'success')
             return redirect(url_for('super_admin_dashboard'))
         except Exception as e:
@@ -671,18 +791,101 @@ def edit_assignment(ticket_id):
             logging.error(f"Error updating ticket assignment: {e}")
     
     # Get all admin users for assignment dropdown
-    admin_users = User.query.filter_by(is_admin=True).all()
+    admin_users = admin_roster.admins()
     
     return render_template('edit_assignment.html', ticket=ticket, admin_users=admin_users)
 
+@app.route('/tickets/bulk-update', methods=['POST'])
+@admin_required
+def bulk_update_tickets():
+    """Apply one status, priority or assignee change to many tickets (Super Admin only)"""
+    current_user = get_current_user()
+    if not current_user.is_super_admin:
+        flash('Super Admin access required.', 'error')
+        return redirect(url_for('index'))
+    
+    next_url = request.form.get('next')
+    if not is_local_url(next_url):
+        next_url = url_for('super_admin_dashboard')
+    
+    ticket_ids = request.form.getlist('ticket_ids')
+    status = request.form.get('status') or None
+    priority = request.form.get('priority') or None
+    assigned_to = request.form.get('assigned_to') or None
+    if not ticket_ids:
+        flash('Select at least one ticket.', 'warning')
+        return redirect(next_url)
+    if status is None and priority is None and assigned_to is None:
+        flash('Choose a status, priority or assignee to apply.', 'warning')
+        return redirect(next_url)
+    
+    try:
+        updated = bulk_tickets.bulk_update_tickets(
+            [int(ticket_id) for ticket_id in ticket_ids],
+            status=status,
+            priority=priority,
+            assigned_to=int(assigned_to) if assigned_to is not None else None,
+        )
+    except ValueError as e:
+        flash(f'Bulk update rejected: {e}', 'error')
+        return redirect(next_url)
+    except Exception as e:
+        flash('Error applying bulk update. Please try again.', 'error')
+        logging.error(f"Error in bulk ticket update: {e}")
+        return redirect(next_url)
+    
+    flash(f'{updated} tickets updated.', 'success')
+    return redirect(next_url)
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the process answers requests; touches no database"""
+    return jsonify(status='ok', uptime_seconds=metrics.uptime_seconds())
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: database ping, schema version and pool statistics"""
+    started = time.perf_counter()
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            version = migrations.current_version(conn)
+    except Exception as e:
+        logging.warning(f"Readiness check failed: {e}")
+        return jsonify(status='unavailable', error=type(e).__name__), 503
+    ready = version == migrations.LATEST_VERSION
+    body = {
+        'status': 'ok' if ready else 'schema_outdated',
+        'db_ping_ms': round((time.perf_counter() - started) * 1000, 1),
+        'schema_version': version,
+        'latest_schema_version': migrations.LATEST_VERSION,
+        'pool': engine_profiles.pool_stats(db.engine),
+    }
+    if db_routing.REPLICA_BIND in db.engines:
+        body['replica'] = db_routing.replica_status()
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics')
+@admin_required
+def metrics_snapshot():
+    """Server metrics (counters, connection pool statistics) as JSON"""
+    return jsonify(metrics.snapshot())
+
 @app.route('/view-image/<filename>')
 @admin_required
 def view_image(filename):
     """View uploaded ticket image (Admin and Super Admin only)"""
-    try:
-        return send_from_directory('static/uploads', filename)
-    except FileNotFoundError:
-        abort(404)
+    key = secure_filename(filename)
+    # Images of archived tickets are kept under the archive prefix
+    for candidate in (key, blob_storage.ARCHIVE_PREFIX + key):
+        try:
+            response = blob_storage.send_blob(candidate)
+        except blob_storage.BlobIntegrityError as e:
+            logging.error(f"Refusing to serve upload: {e}")
+            abort(500)
+        if response is not None:
+            return response
+    abort(404)
 
 @app.route('/download-excel-report')
 @admin_required
@@ -720,6 +923,8 @@ def download_excel_report():
         
         # Get all tickets with related data
         tickets = Ticket.query.join(User, Ticket.user_id == User.id).all()
+        if request.args.get('include_archived') == '1':
+            tickets += TicketArchive.query.join(User, TicketArchive.user_id == User.id).all()
         
         # Add ticket data
         for row, ticket in enumerate(tickets, 2):
@@ -783,6 +988,10 @@ def download_excel_report():
 # Initialize default admin on first import
 with app.app_context():
     create_default_admin()
+    auto_assign.seed_category_teams()
+    sla.start()
+    rollups.start()
+    notifications.start()
 
 # Error handlers
 @app.errorhandler(404)
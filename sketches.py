@@ -0,0 +1,152 @@
+"""
+Mergeable quantile sketches for resolution-time percentiles
+A DDSketch keeps counts in logarithmic bins, so any quantile it returns is
+within RELATIVE_ACCURACY of the true value. Two sketches merge by adding
+their bins, and a value can be removed again by adding it with a negative
+count, which lets the rollup job move a ticket between buckets when it is
+reopened or reassigned.
+
+Sketches are kept per month and per category, priority and assignee in
+resolution_sketches (maintained by rollups.py). Reports merge the months and
+values they need at query time.
+"""
+
+import math
+import struct
+import zlib
+
+from sqlalchemy import select
+
+from app import db
+from models import ResolutionSketch
+
+# Quantiles are within 1% of the true value
+RELATIVE_ACCURACY = 0.01
+
+FORMAT_VERSION = 1
+
+
+class DDSketch:
+    """Counts of non-negative values in bins growing by a factor of gamma"""
+
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _log_gamma = math.log(gamma)
+
+    def __init__(self):
+        self.bins = {}
+        # Values below one second land here instead of in a bin
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value, count=1):
+        """Add count occurrences of value; a negative count removes them"""
+        if value < 1:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        total = self.bins.get(index, 0) + count
+        if total:
+            self.bins[index] = total
+        else:
+            del self.bins[index]
+
+    def merge(self, other):
+        self.zero_count += other.zero_count
+        for index, count in other.bins.items():
+            total = self.bins.get(index, 0) + count
+            if total:
+                self.bins[index] = total
+            else:
+                del self.bins[index]
+        return self
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), or None for an empty sketch"""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_bytes(self):
+        """Compact form: bin indexes delta-encoded, then zlib"""
+        parts = [struct.pack('<Bqi', FORMAT_VERSION, self.zero_count, len(self.bins))]
+        previous = 0
+        for index in sorted(self.bins):
+            parts.append(struct.pack('<iq', index - previous, self.bins[index]))
+            previous = index
+        return zlib.compress(b''.join(parts))
+
+    @classmethod
+    def from_bytes(cls, data):
+        sketch = cls()
+        if not data:
+            return sketch
+        raw = zlib.decompress(data)
+        version, sketch.zero_count, size = struct.unpack_from('<Bqi', raw)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unknown sketch format {version}")
+        offset = struct.calcsize('<Bqi')
+        index = 0
+        for _ in range(size):
+            step, count = struct.unpack_from('<iq', raw, offset)
+            offset += struct.calcsize('<iq')
+            index += step
+            sketch.bins[index] = count
+        return sketch
+
+
+def apply_sketch_deltas(session, deltas):
+    """Merge {(bucket, dimension, value): DDSketch} deltas into resolution_sketches"""
+    table = ResolutionSketch.__table__
+    for (bucket, dimension, value), delta in deltas.items():
+        if not delta.bins and not delta.zero_count:
+            continue
+        key = (table.c.bucket == bucket, table.c.dimension == dimension, table.c.value == value)
+        row = session.execute(select(table.c.data).where(*key)).first()
+        if row is None:
+            session.execute(table.insert().values(bucket=bucket, dimension=dimension, value=value,
+                                                  count=delta.count, data=delta.to_bytes()))
+            continue
+        sketch = DDSketch.from_bytes(row.data).merge(delta)
+        session.execute(table.update().where(*key).values(count=sketch.count, data=sketch.to_bytes()))
+
+
+def percentiles(dimension, start=None, end=None, quantiles=(0.5, 0.9, 0.99)):
+    """Resolution-time percentiles in hours per value of a dimension
+
+    Returns {value: {'count': n, 'p50': hours, ...}}. Sketches of the months
+    between start and end are merged; 'all' merges the category sketches.
+    """
+    table = ResolutionSketch.__table__
+    stored = 'category' if dimension == 'all' else dimension
+    query = select(table.c.value, table.c.data).where(table.c.dimension == stored, table.c.count > 0)
+    if start is not None:
+        query = query.where(table.c.bucket >= start.replace(day=1))
+    if end is not None:
+        query = query.where(table.c.bucket <= end)
+
+    merged = {}
+    for row in db.session.execute(query):
+        value = '' if dimension == 'all' else row.value
+        merged.setdefault(value, DDSketch()).merge(DDSketch.from_bytes(row.data))
+
+    result = {}
+    for value, sketch in sorted(merged.items()):
+        if sketch.count <= 0:
+            continue
+        entry = {'count': sketch.count}
+        for q in quantiles:
+            entry[f'p{round(q * 100):g}'] = round(sketch.quantile(q) / 3600, 2)
+        result[value] = entry
+    return result
@@ -0,0 +1,325 @@
+"""
+SLA deadlines for tickets
+Every ticket gets a response and a resolution deadline from its priority when
+it is created, recomputed when the priority changes. A ticket is responded to
+when it leaves Open or an admin comments on it.
+
+A background scheduler keeps the pending deadlines in a min-heap and sleeps
+until the earliest one, so each ticket event costs O(log n) and nothing scans
+the tickets table on a timer. The heap is loaded at startup from the
+(status, resolution_due_at) index. When a deadline passes with the ticket
+still waiting, its *_breached flag is set and a breach event is emitted to
+the log, the metrics layer and any listeners registered with on_breach().
+With several gunicorn workers each runs a scheduler; the flag update only
+succeeds in one of them, so every breach is reported once.
+"""
+
+import heapq
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app import app, db
+from models import Ticket, TicketComment, User
+import cache
+import metrics
+import write_queue
+
+# Response and resolution targets in hours per priority (wall-clock hours)
+SLA_TARGETS = {
+    'Critical': (1, 4),
+    'High': (4, 24),
+    'Medium': (8, 72),
+    'Low': (24, 120),
+}
+
+ACTIVE_STATUSES = ('Open', 'In Progress')
+
+# Badge turns to "Due soon" in the last fraction of the resolution window
+DUE_SOON_FRACTION = 0.2
+
+# Longest the scheduler sleeps without rechecking the clock
+MAX_SLEEP_SECONDS = 60
+
+RECENT_BREACHES = 50
+
+_scheduler = None
+_breach_listeners = []
+_recent_breaches = deque(maxlen=RECENT_BREACHES)
+
+
+class DeadlineScheduler:
+    """Background thread firing callbacks at deadlines kept in a min-heap"""
+
+    def __init__(self, on_due):
+        self._on_due = on_due
+        self._heap = []
+        # (ticket_id, kind) -> deadline; heap entries not matching it are stale
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='sla-scheduler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+
+    def load(self, entries):
+        """Replace all pending deadlines with (ticket_id, kind, due_at) entries"""
+        with self._condition:
+            self._pending = {(ticket_id, kind): due_at for ticket_id, kind, due_at in entries}
+            self._heap = [(due_at, ticket_id, kind) for (ticket_id, kind), due_at in self._pending.items()]
+            heapq.heapify(self._heap)
+            self._condition.notify()
+
+    def schedule(self, ticket_id, kind, due_at):
+        """Add or move a deadline; None cancels it"""
+        with self._condition:
+            key = (ticket_id, kind)
+            if due_at is None:
+                self._pending.pop(key, None)
+                return
+            if self._pending.get(key) == due_at:
+                return
+            self._pending[key] = due_at
+            heapq.heappush(self._heap, (due_at, ticket_id, kind))
+            if len(self._heap) > 2 * len(self._pending) + 64:
+                self._heap = [(due, tid, k) for (tid, k), due in self._pending.items()]
+                heapq.heapify(self._heap)
+            if self._heap[0] == (due_at, ticket_id, kind):
+                # New earliest deadline: wake the thread to shorten its sleep
+                self._condition.notify()
+
+    def pending_count(self):
+        with self._condition:
+            return len(self._pending)
+
+    def _next_due(self):
+        """Pop the next deadline that has passed, waiting for it if needed"""
+        with self._condition:
+            while not self._stopping:
+                while self._heap and self._pending.get(self._heap[0][1:]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due_at, ticket_id, kind = self._heap[0]
+                wait = (due_at - datetime.utcnow()).total_seconds()
+                if wait <= 0:
+                    heapq.heappop(self._heap)
+                    del self._pending[(ticket_id, kind)]
+                    return ticket_id, kind, due_at
+                self._condition.wait(min(wait, MAX_SLEEP_SECONDS))
+            return None
+
+    def _run(self):
+        while True:
+            due = self._next_due()
+            if due is None:
+                return
+            try:
+                self._on_due(*due)
+            except Exception as e:
+                logging.error(f"SLA deadline handling failed for ticket {due[0]}: {e}")
+
+
+def deadlines_for(priority, created_at):
+    """(response_due_at, resolution_due_at) for a ticket"""
+    response_hours, resolution_hours = SLA_TARGETS.get(priority, SLA_TARGETS['Medium'])
+    return created_at + timedelta(hours=response_hours), created_at + timedelta(hours=resolution_hours)
+
+
+def pending_deadlines(ticket):
+    """The deadlines the scheduler should wait for, as {kind: due_at or None}"""
+    active = ticket.status in ACTIVE_STATUSES
+    response_pending = (ticket.status == 'Open' and ticket.first_response_at is None
+                        and not ticket.response_breached)
+    return {
+        'response': ticket.response_due_at if response_pending else None,
+        'resolution': ticket.resolution_due_at if active and not ticket.resolution_breached else None,
+    }
+
+
+def on_breach(listener):
+    """Call listener(ticket_id, kind, due_at) for every SLA breach"""
+    _breach_listeners.append(listener)
+    return listener
+
+
+def _mark_breached(ticket_id, kind, due_at):
+    tickets = Ticket.__table__
+    breached = tickets.c[f'{kind}_breached']
+    conditions = [tickets.c.id == ticket_id, breached.is_(False), tickets.c.status.in_(ACTIVE_STATUSES),
+                  tickets.c[f'{kind}_due_at'] <= datetime.utcnow()]
+    if kind == 'response':
+        conditions += [tickets.c.status == 'Open', tickets.c.first_response_at.is_(None)]
+
+    def mark(session):
+        # A breach is not an edit: keep updated_at as it was
+        statement = update(tickets).where(*conditions).values(
+            {breached.name: True, 'updated_at': tickets.c.updated_at})
+        return session.execute(statement).rowcount
+
+    with app.app_context():
+        try:
+            marked = write_queue.run_write(db.session, mark)
+        finally:
+            db.session.remove()
+
+    if marked:
+        cache.invalidate('tickets', cache.row_tag(Ticket, ticket_id))
+        _recent_breaches.append({'ticket_id': ticket_id, 'kind': kind, 'due_at': due_at.isoformat()})
+        metrics.incr(f'sla.{kind}_breaches')
+        logging.warning(f"SLA {kind} deadline breached for ticket IT-{ticket_id:06d} (due {due_at})")
+        for listener in _breach_listeners:
+            try:
+                listener(ticket_id, kind, due_at)
+            except Exception as e:
+                logging.error(f"SLA breach listener failed: {e}")
+
+
+def load_pending_deadlines():
+    """Fill the scheduler from the active tickets' stored deadlines"""
+    rows = db.session.execute(
+        select(Ticket.id, Ticket.status, Ticket.first_response_at, Ticket.response_due_at,
+               Ticket.resolution_due_at, Ticket.response_breached, Ticket.resolution_breached)
+        .where(Ticket.status.in_(ACTIVE_STATUSES))
+    ).all()
+    entries = []
+    for row in rows:
+        for kind, due_at in pending_deadlines(row).items():
+            if due_at is not None:
+                entries.append((row.id, kind, due_at))
+    _scheduler.load(entries)
+    logging.info(f"SLA scheduler loaded {len(entries)} deadlines")
+
+
+def start():
+    """Start the deadline scheduler for this process"""
+    global _scheduler
+    if _scheduler is not None or os.environ.get("HELPDESK_SLA_SCHEDULER", "1") == "0":
+        return
+    _scheduler = DeadlineScheduler(_mark_breached)
+    load_pending_deadlines()
+    _scheduler.start()
+    metrics.register_collector('sla', lambda: {
+        'pending_deadlines': _scheduler.pending_count(),
+        'recent_breaches': list(_recent_breaches),
+    })
+
+
+def reschedule(ticket_ids):
+    """Reload the deadlines of tickets changed outside the session events"""
+    if _scheduler is None:
+        return
+    ticket_ids = list(ticket_ids)
+    for start in range(0, len(ticket_ids), 500):
+        rows = db.session.execute(
+            select(Ticket.id, Ticket.status, Ticket.first_response_at, Ticket.response_due_at,
+                   Ticket.resolution_due_at, Ticket.response_breached, Ticket.resolution_breached)
+            .where(Ticket.id.in_(ticket_ids[start:start + 500]))
+        ).all()
+        for row in rows:
+            for kind, due_at in pending_deadlines(row).items():
+                _scheduler.schedule(row.id, kind, due_at)
+
+
+def recompute_deadlines(session, ticket_ids):
+    """Store fresh deadlines for tickets whose priority changed in a set-based update"""
+    rows = session.execute(select(Ticket.id, Ticket.priority, Ticket.created_at)
+                           .where(Ticket.id.in_(ticket_ids))).all()
+    values = []
+    for row in rows:
+        response_due_at, resolution_due_at = deadlines_for(row.priority, row.created_at or datetime.utcnow())
+        values.append({'id': row.id, 'response_due_at': response_due_at, 'resolution_due_at': resolution_due_at,
+                       'response_breached': False, 'resolution_breached': False})
+    if values:
+        session.execute(update(Ticket), values)
+
+
+def badge(ticket):
+    """(label, bootstrap colour) of a ticket's SLA state, or None when it has no open SLA"""
+    if ticket.status not in ACTIVE_STATUSES:
+        if ticket.resolution_breached:
+            return 'SLA missed', 'secondary'
+        return None
+    if ticket.resolution_breached:
+        return 'SLA breached', 'danger'
+    if ticket.response_breached:
+        return 'Response overdue', 'danger'
+    if ticket.resolution_due_at is None or ticket.created_at is None:
+        return None
+    now = datetime.utcnow()
+    window = ticket.resolution_due_at - ticket.created_at
+    if ticket.resolution_due_at - now <= window * DUE_SOON_FRACTION:
+        return 'Due soon', 'warning'
+    return 'On track', 'success'
+
+
+app.add_template_global(badge, 'sla_badge')
+
+
+def _is_admin(session, user_id):
+    user = session.get(User, user_id)
+    return user is not None and user.is_admin
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_deadlines(session, flush_context, instances):
+    now = datetime.utcnow()
+    for obj in session.new:
+        if isinstance(obj, Ticket) and obj.response_due_at is None:
+            obj.created_at = obj.created_at or now
+            obj.response_due_at, obj.resolution_due_at = deadlines_for(obj.priority, obj.created_at)
+        elif isinstance(obj, TicketComment) and _is_admin(session, obj.user_id):
+            ticket = session.get(Ticket, obj.ticket_id)
+            if ticket is not None and ticket.first_response_at is None:
+                ticket.first_response_at = now
+
+    for obj in session.dirty:
+        if not isinstance(obj, Ticket):
+            continue
+        state = inspect(obj)
+        if state.attrs.priority.history.has_changes():
+            obj.response_due_at, obj.resolution_due_at = deadlines_for(obj.priority, obj.created_at or now)
+            obj.response_breached = obj.resolution_breached = False
+        status_history = state.attrs.status.history
+        if status_history.deleted and status_history.deleted[0] == 'Open' and obj.status != 'Open':
+            if obj.first_response_at is None:
+                obj.first_response_at = now
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deadline_changes(session, flush_context):
+    changes = session.info.setdefault('sla_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Ticket):
+            changes[obj.id] = pending_deadlines(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Ticket):
+            changes[obj.id] = {'response': None, 'resolution': None}
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_deadline_changes(session):
+    changes = session.info.pop('sla_changes', {})
+    if _scheduler is None:
+        return
+    for ticket_id, deadlines in changes.items():
+        for kind, due_at in deadlines.items():
+            _scheduler.schedule(ticket_id, kind, due_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deadline_changes(session):
+    session.info.pop('sla_changes', None)
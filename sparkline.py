@@ -0,0 +1,101 @@
+"""
+Scrolling sparkline on a Tk Canvas
+Each new value shifts the existing segments left by one step with a single
+Canvas.move, adds one line segment at the right edge and deletes the segment
+that scrolled off. The whole line is only redrawn when the vertical scale
+changes: a series without a fixed maximum grows its scale when a value goes
+over it and shrinks it when the visible peak falls well below.
+"""
+
+import tkinter as tk
+from collections import deque
+from math import ceil, log10
+
+SEGMENT_TAG = 'segment'
+STEP = 2
+
+
+def nice_ceiling(value):
+    """Smallest 1, 2 or 5 times a power of ten that is at least value"""
+    if value <= 0:
+        return 0
+    power = 10 ** int(ceil(log10(value)) - 1)
+    for factor in (1, 2, 5, 10):
+        if factor * power >= value:
+            return factor * power
+    return 10 * power
+
+
+class Sparkline:
+    """Line chart of the newest values that fit a canvas, one STEP apart"""
+
+    def __init__(self, parent, width=240, height=36, color='#2563eb', background='#ffffff',
+                 maximum=None, minimum_scale=1.0, on_hover=None):
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg=background,
+                                highlightthickness=0)
+        self.width = width
+        self.height = height
+        self.color = color
+        self.maximum = maximum
+        self.minimum_scale = minimum_scale
+        self.scale = maximum or minimum_scale
+        self.points = deque(maxlen=width // STEP + 1)  # (time, value)
+        self.segments = deque()
+        self.on_hover = on_hover
+        self.canvas.bind('<Motion>', self._motion)
+        self.canvas.bind('<Leave>', self._leave)
+
+    def _y(self, value):
+        value = min(max(value, 0), self.scale)
+        return self.height - 2 - value / self.scale * (self.height - 4)
+
+    def _rescale(self):
+        """Pick a new scale if needed; True when the line must be redrawn"""
+        if self.maximum or not self.points:
+            return False
+        peak = max(value for _, value in self.points)
+        if peak > self.scale or (self.scale > self.minimum_scale and peak < self.scale / 4):
+            self.scale = max(nice_ceiling(peak * 1.25), self.minimum_scale)
+            return True
+        return False
+
+    def redraw(self):
+        self.canvas.delete(SEGMENT_TAG)
+        self.segments.clear()
+        values = [value for _, value in self.points]
+        x = self.width - (len(values) - 1) * STEP
+        for previous, value in zip(values, values[1:]):
+            self.segments.append(self.canvas.create_line(x, self._y(previous), x + STEP, self._y(value),
+                                                         fill=self.color, tags=SEGMENT_TAG))
+            x += STEP
+
+    def load(self, points):
+        """Replace the line with (time, value) points, oldest first"""
+        self.points.clear()
+        self.points.extend(points)
+        self._rescale()
+        self.redraw()
+
+    def add(self, when, value):
+        self.points.append((when, value))
+        if self._rescale():
+            self.redraw()
+            return
+        if len(self.points) < 2:
+            return
+        self.canvas.move(SEGMENT_TAG, -STEP, 0)
+        previous = self.points[-2][1]
+        self.segments.append(self.canvas.create_line(self.width - STEP, self._y(previous), self.width,
+                                                     self._y(value), fill=self.color, tags=SEGMENT_TAG))
+        while len(self.segments) > len(self.points) - 1:
+            self.canvas.delete(self.segments.popleft())
+
+    def _motion(self, event):
+        if not self.on_hover:
+            return
+        index = len(self.points) - 1 - round((self.width - event.x) / STEP)
+        self.on_hover(self.points[index] if 0 <= index < len(self.points) else None)
+
+    def _leave(self, event):
+        if self.on_hover:
+            self.on_hover(None)
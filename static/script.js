@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeFormValidation();
     initializeSearch();
     initializeAutoRefresh();
+    initializeBulkSelection();
     
     // Custom nl2br filter for displaying text with line breaks
     applyNl2br();
@@ -134,6 +135,45 @@ function initializeSearch() {
     });
 }
 
+/**
+ * Initialize ticket checkboxes feeding the bulk actions toolbar
+ */
+function initializeBulkSelection() {
+    const form = document.getElementById('bulkTicketsForm');
+    if (!form) {
+        return;
+    }
+    
+    const checkboxes = document.querySelectorAll('.bulk-ticket-checkbox');
+    const selectAll = document.getElementById('bulkSelectAll');
+    const countBadge = document.getElementById('bulkSelectedCount');
+    const applyButton = document.getElementById('bulkApplyButton');
+    
+    function updateCount() {
+        const selected = document.querySelectorAll('.bulk-ticket-checkbox:checked').length;
+        countBadge.textContent = selected + ' selected';
+        applyButton.disabled = selected === 0;
+    }
+    
+    checkboxes.forEach(function(checkbox) {
+        checkbox.addEventListener('change', updateCount);
+    });
+    
+    if (selectAll) {
+        selectAll.addEventListener('change', function() {
+            // Only rows left visible by the table filters are selected
+            checkboxes.forEach(function(checkbox) {
+                if (checkbox.closest('tr').style.display !== 'none') {
+                    checkbox.checked = selectAll.checked;
+                }
+            });
+            updateCount();
+        });
+    }
+    
+    updateCount();
+}
+
 /**
  * Initialize auto-refresh for dashboards
  */
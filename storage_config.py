@@ -0,0 +1,35 @@
+"""
+Where uploads are stored, as configured by the environment
+  HELPDESK_STORAGE      local (default), shared or database
+  HELPDESK_UPLOAD_PATH  directory of the local or shared backend
+blob_storage builds its backend from these settings, and the launcher's
+backups read them to find the files. This module does not import Flask,
+so the launcher can use it without loading the app.
+"""
+
+import os
+
+UPLOAD_DIR = 'static/uploads'
+FILE_BACKENDS = ('local', 'shared')
+BACKENDS = FILE_BACKENDS + ('database',)
+
+
+def storage_backend():
+    """Name of the configured backend"""
+    name = os.environ.get("HELPDESK_STORAGE", "local")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    return name
+
+
+def upload_root(name=None):
+    """Directory a file backend keeps uploads in; None for the database backend"""
+    name = name or storage_backend()
+    if name == 'local':
+        return os.environ.get("HELPDESK_UPLOAD_PATH") or UPLOAD_DIR
+    if name == 'shared':
+        root = os.environ.get("HELPDESK_UPLOAD_PATH")
+        if not root:
+            raise RuntimeError("HELPDESK_UPLOAD_PATH must point at the shared upload directory")
+        return root
+    return None
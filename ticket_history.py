@@ -0,0 +1,242 @@
+"""
+Append-only ticket history
+Every change to a ticket's title, category, priority, status or assignee is
+recorded in ticket_events (who, when, from, to). The changes are taken from
+ORM attribute history in an after_flush hook and written with one bulk insert
+per flush, in the same transaction as the change. Set-based bulk updates
+record theirs through record_bulk_changes().
+
+ticket_state_stats is kept up to date in the same step: seconds spent in
+each status and assignment counts per ticket. Reports read these totals
+instead of replaying the events.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import bindparam, case, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from models import Ticket, TicketEvent, TicketStateStats, User
+import metrics
+import notifications
+
+TRACKED_FIELDS = ('title', 'category', 'priority', 'status', 'assigned_to')
+
+STATUS_COLUMNS = {
+    'Open': 'seconds_open',
+    'In Progress': 'seconds_in_progress',
+    'Resolved': 'seconds_resolved',
+    'Closed': 'seconds_closed',
+}
+
+EVENTS_SHOWN = 50
+
+
+def _text(value):
+    return None if value is None else str(value)[:255]
+
+
+def _event(ticket_id, actor_id, field, old, new, now):
+    return {'ticket_id': ticket_id, 'actor_id': actor_id, 'field': field,
+            'old_value': _text(old), 'new_value': _text(new), 'created_at': now}
+
+
+def _record(session, events, changes, created, now):
+    """Write events and fold changes into the stats
+
+    changes maps ticket id to (status after, status changed, (old assignee, new assignee)).
+    """
+    stats = TicketStateStats.__table__
+    if events:
+        session.execute(insert(TicketEvent.__table__), events)
+        metrics.incr('ticket_history.events', len(events))
+    if created:
+        session.execute(insert(stats), created)
+    if not changes:
+        return
+
+    current = {row.ticket_id: row for row in session.execute(
+        select(stats.c.ticket_id, stats.c.status, stats.c.status_since)
+        .where(stats.c.ticket_id.in_(list(changes))))}
+    updates = []
+    missing = []
+    for ticket_id, (status, status_changed, (old_assignee, new_assignee)) in changes.items():
+        assigned = 1 if new_assignee != old_assignee and new_assignee is not None else 0
+        reassigned = 1 if new_assignee != old_assignee and old_assignee is not None else 0
+        row = current.get(ticket_id)
+        if row is None:
+            # Ticket from before history was kept: start its stats now
+            missing.append({'ticket_id': ticket_id, 'status': status, 'status_since': now,
+                            'assignments': assigned, 'reassignments': reassigned})
+            continue
+        values = {'stats_ticket_id': ticket_id, 'assigned': assigned, 'reassigned': reassigned, 'elapsed': 0,
+                  'old_status': row.status, 'new_status': row.status, 'since': row.status_since}
+        if status_changed and status != row.status:
+            values.update(elapsed=max(int((now - row.status_since).total_seconds()), 0),
+                          new_status=status, since=now)
+        updates.append(values)
+
+    if missing:
+        session.execute(insert(stats), missing)
+    if updates:
+        old_status = bindparam('old_status', type_=stats.c.status.type)
+        elapsed = bindparam('elapsed')
+        seconds = {column: case((old_status == status, stats.c[column] + elapsed), else_=stats.c[column])
+                   for status, column in STATUS_COLUMNS.items()}
+        session.execute(
+            update(stats).where(stats.c.ticket_id == bindparam('stats_ticket_id'))
+            .values(status=bindparam('new_status', type_=stats.c.status.type),
+                    status_since=bindparam('since'),
+                    assignments=stats.c.assignments + bindparam('assigned'),
+                    reassignments=stats.c.reassignments + bindparam('reassigned'),
+                    **seconds),
+            updates)
+
+
+def _history(obj, key):
+    """(changed, old, new) for an attribute in the current flush"""
+    attribute = inspect(obj).attrs[key]
+    history = attribute.history
+    if not history.added and not history.deleted:
+        return False, attribute.value, attribute.value
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old != new, old, new
+
+
+@event.listens_for(Session, "after_flush")
+def _record_ticket_changes(session, flush_context):
+    now = datetime.utcnow()
+    actor_id = notifications.current_actor()
+    events = []
+    created = []
+    changes = {}
+
+    for obj in session.new:
+        if isinstance(obj, Ticket):
+            events.append(_event(obj.id, actor_id or obj.user_id, 'created', None, obj.status, now))
+            if obj.assigned_to is not None:
+                events.append(_event(obj.id, actor_id or obj.user_id, 'assigned_to', None, obj.assigned_to, now))
+            created.append({'ticket_id': obj.id, 'status': obj.status, 'status_since': obj.created_at or now,
+                            'assignments': 1 if obj.assigned_to is not None else 0})
+
+    for obj in session.dirty:
+        if not isinstance(obj, Ticket) or not session.is_modified(obj):
+            continue
+        status_changed = False
+        assignee_change = (obj.assigned_to, obj.assigned_to)
+        for field in TRACKED_FIELDS:
+            changed, old, new = _history(obj, field)
+            if not changed:
+                continue
+            events.append(_event(obj.id, actor_id, field, old, new, now))
+            if field == 'status':
+                status_changed = True
+            elif field == 'assigned_to':
+                assignee_change = (old, new)
+        if status_changed or assignee_change[0] != assignee_change[1]:
+            changes[obj.id] = (obj.status, status_changed, assignee_change)
+
+    _record(session, events, changes, created, now)
+
+
+def record_bulk_changes(session, before, status=None, priority=None, assigned_to=None, actor_id=None):
+    """History for a set-based update, from the (id, status, priority, assigned_to) rows before it
+
+    assigned_to follows bulk_tickets: 0 unassigns, None leaves it unchanged.
+    """
+    now = datetime.utcnow()
+    events = []
+    changes = {}
+    for ticket in before:
+        new_assignee = ticket.assigned_to if assigned_to is None else (assigned_to or None)
+        if status is not None:
+            new_status = status
+        elif assigned_to and ticket.status == 'Open':
+            new_status = 'In Progress'
+        else:
+            new_status = ticket.status
+        new_priority = priority if priority is not None else ticket.priority
+
+        for field, old, new in (('priority', ticket.priority, new_priority), ('status', ticket.status, new_status),
+                                ('assigned_to', ticket.assigned_to, new_assignee)):
+            if old != new:
+                events.append(_event(ticket.id, actor_id, field, old, new, now))
+        if new_status != ticket.status or new_assignee != ticket.assigned_to:
+            changes[ticket.id] = (new_status, new_status != ticket.status, (ticket.assigned_to, new_assignee))
+    _record(session, events, changes, [], now)
+
+
+def events_for(ticket_id, limit=EVENTS_SHOWN):
+    """Latest events of a ticket, oldest first"""
+    rows = (TicketEvent.query.filter_by(ticket_id=ticket_id)
+            .order_by(TicketEvent.created_at.desc(), TicketEvent.id.desc()).limit(limit).all())
+    rows.reverse()
+    return rows
+
+
+def describe(events):
+    """(icon, text, when) timeline entries for events, naming the people involved"""
+    user_ids = {event.actor_id for event in events}
+    user_ids |= {int(value) for event in events if event.field == 'assigned_to'
+                 for value in (event.old_value, event.new_value) if value}
+    names = {user.id: user.full_name for user in User.query.filter(User.id.in_(user_ids - {None}))} if user_ids else {}
+
+    entries = []
+    for event in events:
+        by = f" by {names[event.actor_id]}" if event.actor_id in names else ""
+        if event.field == 'created':
+            entries.append(('ri-add-line', f"Ticket created{by}", event.created_at))
+        elif event.field == 'assigned_to':
+            if event.new_value:
+                assignee = names.get(int(event.new_value), f"user {event.new_value}")
+                entries.append(('ri-user-add-line', f"Assigned to {assignee}{by}", event.created_at))
+            else:
+                entries.append(('ri-user-unfollow-line', f"Unassigned{by}", event.created_at))
+        elif event.field == 'status':
+            icon = 'ri-check-line' if event.new_value in ('Resolved', 'Closed') else 'ri-refresh-line'
+            entries.append((icon, f"Status {event.old_value} \u2192 {event.new_value}{by}", event.created_at))
+        else:
+            label = event.field.replace('_', ' ').capitalize()
+            entries.append(('ri-edit-line', f"{label} {event.old_value} \u2192 {event.new_value}{by}",
+                            event.created_at))
+    return entries
+
+
+def time_in_status(ticket_id, now=None):
+    """({status: seconds}, assignments, reassignments) for a ticket, or None without stats"""
+    row = db.session.get(TicketStateStats, ticket_id)
+    if row is None:
+        return None
+    now = now or datetime.utcnow()
+    seconds = {status: getattr(row, column) for status, column in STATUS_COLUMNS.items()}
+    if row.status in seconds:
+        seconds[row.status] += max(int((now - row.status_since).total_seconds()), 0)
+    return seconds, row.assignments, row.reassignments
+
+
+def summary():
+    """Average hours per status over the tickets that spent time in it, and reassignment totals
+
+    Only finished stretches are counted; a ticket's current status is not.
+    """
+    stats = TicketStateStats.__table__
+    columns = []
+    for column in STATUS_COLUMNS.values():
+        columns += [func.sum(stats.c[column]), func.count(case((stats.c[column] > 0, 1)))]
+    row = db.session.execute(select(func.count(), func.sum(stats.c.reassignments),
+                                    func.count(case((stats.c.reassignments > 0, 1))),
+                                    func.max(stats.c.reassignments), *columns)).one()
+    tickets, reassignments, reassigned, most, *totals = row
+    hours = {}
+    for index, status in enumerate(STATUS_COLUMNS):
+        total, count = totals[2 * index], totals[2 * index + 1]
+        hours[status] = round(total / count / 3600, 2) if count else None
+    return {
+        'tickets': tickets,
+        'average_hours': hours,
+        'reassignments': reassignments or 0,
+        'reassigned_tickets': reassigned,
+        'max_reassignments': most or 0,
+    }
@@ -0,0 +1,166 @@
+"""
+Single-writer group commit queue for the SQLite production mode
+Request threads hand small write jobs to one writer thread, which runs every
+job waiting in the queue inside one transaction and commits them together, so
+concurrent requests share a single fsync instead of fighting over the database
+write lock. If the shared transaction fails, each job is rerun on its own, so
+jobs must only touch the session they are given.
+
+Each gunicorn worker process owns its own writer; between processes the
+busy_timeout PRAGMA still arbitrates the write lock.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import engine_profiles
+import metrics
+
+# Largest number of jobs committed in one transaction
+DEFAULT_MAX_BATCH = 128
+# Seconds a request waits for its job before giving up
+DEFAULT_TIMEOUT = 30
+
+_writer = None
+
+
+class GroupCommitWriter:
+    """Writer thread batching queued write jobs into shared commits"""
+
+    def __init__(self, engine, max_batch=DEFAULT_MAX_BATCH):
+        self.engine = engine
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+        self._thread = threading.Thread(target=self._run, name='sqlite-group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, func):
+        """Queue func(session) for the next group commit; returns a Future"""
+        future = Future()
+        self._queue.put((func, future))
+        return future
+
+    def run(self, func, timeout=DEFAULT_TIMEOUT):
+        """Queue func(session) and wait until its batch is committed"""
+        return self.submit(func).result(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stop(self):
+        """Commit whatever is queued, then stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+        self.engine.dispose()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+            # Everything that queued up while the previous commit was syncing
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        jobs = [(func, future) for func, future in batch if future.set_running_or_notify_cancel()]
+        try:
+            results = self._run_transaction([func for func, future in jobs])
+        except Exception as e:
+            # One failing job spoils the shared transaction; rerun each on its own
+            logging.warning(f"Group commit of {len(jobs)} writes failed, retrying individually: {e}")
+            metrics.incr('write_queue.retries')
+            for func, future in jobs:
+                try:
+                    result = self._run_transaction([func])[0]
+                except Exception as job_error:
+                    future.set_exception(job_error)
+                else:
+                    future.set_result(result)
+            return
+
+        metrics.incr('write_queue.batches')
+        metrics.incr('write_queue.jobs', len(jobs))
+        for (func, future), result in zip(jobs, results):
+            future.set_result(result)
+
+    def _run_transaction(self, funcs):
+        session = self._session_factory()
+        try:
+            results = [func(session) for func in funcs]
+            session.commit()
+            return results
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+def create_writer_engine(url, pragmas):
+    """Dedicated single-connection engine for the writer thread"""
+    engine = create_engine(url, poolclass=StaticPool,
+                           connect_args={'check_same_thread': False})
+    engine_profiles.apply_sqlite_pragmas(engine, pragmas)
+
+    # Replace pysqlite's implicit deferred BEGIN: take the write lock up
+    # front so the writer never has to upgrade a read lock
+    @event.listens_for(engine, "connect")
+    def disable_implicit_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def start(url, pragmas=None, max_batch=DEFAULT_MAX_BATCH):
+    """Start the process-wide writer for the SQLite database at url"""
+    global _writer
+    if _writer is None:
+        engine = create_writer_engine(url, pragmas or engine_profiles.SQLITE_PRAGMAS)
+        _writer = GroupCommitWriter(engine, max_batch=max_batch)
+        metrics.register_collector('write_queue', lambda: {'queue_depth': _writer.queue_depth()})
+        logging.info("SQLite group commit writer started")
+    return _writer
+
+
+def is_enabled():
+    return _writer is not None
+
+
+def run_write(session, func):
+    """Run func(session) and commit, through the group commit writer when enabled
+
+    func receives the session to use and may return a value for the caller.
+    Returned ORM objects stay loaded after the commit.
+    """
+    if _writer is not None:
+        return _writer.run(func)
+
+    try:
+        result = func(session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return result